@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Random access over capture files through mmap and on-disk slot/signature indexes.
+"""
+import argparse
+import bisect
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from capture import MAGIC, RECORD_HEADER, RPC_CODES, RPC_NAMES
+from encoding import b58decode
+from raw_stub import RPC_TYPES
+from wire import find_signature
+
+
+logger = logging.getLogger(__name__)
+
+
+SLOT_INDEX_SUFFIX = ".slots"
+SIGNATURE_INDEX_SUFFIX = ".sigs"
+
+_INDEX_MAGIC = b"CCAIDX01"
+# magic, end offset of the last capture record covered, entry count
+_INDEX_HEADER = struct.Struct("<8sQQ")
+# sort key (slot or signature hash), record offset
+_INDEX_ENTRY = struct.Struct("<QQ")
+
+
+def _signature_key(signature: Union[bytes, memoryview]) -> int:
+    """Signature index key: a 64-bit hash of the full signature."""
+    return int.from_bytes(hashlib.blake2b(signature, digest_size=8).digest(), 'big')
+
+
+class _SortedIndex:
+    """
+    A memory-mapped, sorted array of (key, offset) entries.
+
+    Supports len() and indexing so bisect can search it in place; nothing is
+    loaded into memory.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.covered, self.count = _INDEX_HEADER.unpack_from(self._mmap, 0)
+        expected_size = _INDEX_HEADER.size + self.count * _INDEX_ENTRY.size
+        if magic != _INDEX_MAGIC or len(self._mmap) != expected_size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a valid archive index")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> Tuple[int, int]:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return _INDEX_ENTRY.unpack_from(self._mmap, _INDEX_HEADER.size + i * _INDEX_ENTRY.size)
+
+    def offsets(self, first_key: int, last_key: Optional[int] = None) -> Iterator[int]:
+        """Yield record offsets for keys in [first_key, last_key], in key order."""
+        last_key = first_key if last_key is None else last_key
+        i = bisect.bisect_left(self, (first_key, 0))
+        while i < self.count:
+            key, offset = self[i]
+            if key > last_key:
+                return
+            yield offset
+            i += 1
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    @staticmethod
+    def write(path: str, entries: List[Tuple[int, int]], covered: int) -> None:
+        """Sort entries and write them atomically to path."""
+        entries.sort()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, covered, len(entries)))
+            pack = _INDEX_ENTRY.pack
+            for start in range(0, len(entries), 65536):
+                f.write(b''.join([pack(key, offset) for key, offset in entries[start:start + 65536]]))
+        os.replace(tmp_path, path)
+
+
+class ArchivedMessage:
+    """
+    One message in a capture archive.
+
+    ``data`` is a zero-copy memoryview into the mapped capture file. The
+    message is parsed only when ``message`` is first accessed.
+    """
+
+    __slots__ = ("rpc_name", "timestamp_ns", "slot", "offset", "data", "_message")
+
+    def __init__(self, rpc_name: str, timestamp_ns: int, slot: int, offset: int, data: memoryview):
+        self.rpc_name = rpc_name
+        self.timestamp_ns = timestamp_ns
+        self.slot = slot
+        self.offset = offset
+        self.data = data
+        self._message = None
+
+    @property
+    def message(self):
+        """The decoded stream message (parsed on first access)."""
+        if self._message is None:
+            self._message = RPC_TYPES[self.rpc_name][1].FromString(self.data)
+        return self._message
+
+    def __repr__(self) -> str:
+        return f"ArchivedMessage({self.rpc_name}, slot={self.slot}, offset={self.offset}, {len(self.data)} bytes)"
+
+
+class CaptureArchive:
+    """
+    Random-access reader for capture files written by capture.CaptureWriter.
+
+    The capture is memory-mapped and looked up through two sorted index
+    files next to it: ``<path>.slots`` (slot -> record offset) and
+    ``<path>.sigs`` (signature hash -> record offset). Both are searched
+    in place with a binary search, so looking up a slot or a transaction
+    touches a few pages instead of reading the file. The indexes are built
+    with one scan on first open and rebuilt when the capture has grown.
+
+    Returned messages reference the mapping and should be dropped before
+    close().
+    """
+
+    def __init__(self, path: str, rebuild: bool = False):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a capture file")
+        self._view = memoryview(self._mmap)
+        self._slots: Optional[_SortedIndex] = None
+        self._signatures: Optional[_SortedIndex] = None
+        if rebuild or not self._load_indexes():
+            self.build_indexes()
+
+    def _load_indexes(self) -> bool:
+        """Open existing indexes if they cover every complete record."""
+        try:
+            slots = _SortedIndex(self.path + SLOT_INDEX_SUFFIX)
+            signatures = _SortedIndex(self.path + SIGNATURE_INDEX_SUFFIX)
+        except (OSError, ValueError):
+            return False
+        if slots.covered != signatures.covered or self._record_end(slots.covered) is not None:
+            # Stale: the capture has grown since the indexes were built
+            slots.close()
+            signatures.close()
+            return False
+        self._slots = slots
+        self._signatures = signatures
+        return True
+
+    def _record_end(self, offset: int) -> Optional[int]:
+        """End offset of the complete record starting at offset, or None."""
+        if offset + RECORD_HEADER.size > len(self._mmap):
+            return None
+        end = offset + RECORD_HEADER.size + RECORD_HEADER.unpack_from(self._mmap, offset)[0]
+        return end if end <= len(self._mmap) else None
+
+    def build_indexes(self) -> None:
+        """Scan the capture once and (re)write the slot and signature indexes."""
+        self._close_indexes()
+        mm = self._mmap
+        header_size = RECORD_HEADER.size
+        unpack_header = RECORD_HEADER.unpack_from
+        slots: List[Tuple[int, int]] = []
+        signatures: List[Tuple[int, int]] = []
+        offset = len(MAGIC)
+        while True:
+            end = self._record_end(offset)
+            if end is None:
+                break
+            slot = unpack_header(mm, offset)[3]
+            slots.append((slot, offset))
+            span = find_signature(mm, offset + header_size, end)
+            if span is not None:
+                signatures.append((_signature_key(mm[span[0]:span[1]]), offset))
+            offset = end
+        if offset != len(mm):
+            logger.warning(f"{self.path}: ignoring incomplete record at offset {offset}")
+
+        _SortedIndex.write(self.path + SLOT_INDEX_SUFFIX, slots, offset)
+        _SortedIndex.write(self.path + SIGNATURE_INDEX_SUFFIX, signatures, offset)
+        logger.info(f"Indexed {len(slots)} records ({len(signatures)} with signatures) in {self.path}")
+        self._slots = _SortedIndex(self.path + SLOT_INDEX_SUFFIX)
+        self._signatures = _SortedIndex(self.path + SIGNATURE_INDEX_SUFFIX)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def record_at(self, offset: int) -> ArchivedMessage:
+        """Return the record starting at a file offset."""
+        length, code, timestamp_ns, slot = RECORD_HEADER.unpack_from(self._mmap, offset)
+        start = offset + RECORD_HEADER.size
+        return ArchivedMessage(
+            RPC_NAMES.get(code, str(code)), timestamp_ns, slot, offset, self._view[start:start + length]
+        )
+
+    def _records(self, offsets: Iterable[int], rpc_names: Optional[Iterable[str]]) -> Iterator[ArchivedMessage]:
+        codes = None if rpc_names is None else {RPC_CODES[name] for name in rpc_names}
+        for offset in offsets:
+            if codes is not None and self._mmap[offset + 4] not in codes:
+                continue
+            yield self.record_at(offset)
+
+    def by_slot(self, slot: int, rpc_names: Optional[Iterable[str]] = None) -> List[ArchivedMessage]:
+        """All messages of a slot, in capture order."""
+        return list(self._records(self._slots.offsets(slot), rpc_names))
+
+    def slot_range(
+        self,
+        first_slot: int,
+        last_slot: int,
+        rpc_names: Optional[Iterable[str]] = None
+    ) -> Iterator[ArchivedMessage]:
+        """Messages with first_slot <= slot <= last_slot, in slot order."""
+        return self._records(self._slots.offsets(first_slot, last_slot), rpc_names)
+
+    def by_signature(self, signature: Union[bytes, str]) -> List[ArchivedMessage]:
+        """
+        All messages of a transaction, in capture order.
+
+        Args:
+            signature: The transaction signature, raw or base58-encoded
+        """
+        if isinstance(signature, str):
+            signature = b58decode(signature)
+        matches = []
+        for offset in self._signatures.offsets(_signature_key(signature)):
+            # The index key is a 64-bit hash; confirm the full signature
+            end = self._record_end(offset)
+            span = find_signature(self._mmap, offset + RECORD_HEADER.size, end)
+            if span is not None and self._view[span[0]:span[1]] == signature:
+                matches.append(self.record_at(offset))
+        matches.sort(key=lambda record: record.offset)
+        return matches
+
+    def slot_bounds(self) -> Tuple[int, int]:
+        """Lowest and highest slot in the archive."""
+        if not len(self._slots):
+            raise ValueError(f"{self.path} has no records")
+        return self._slots[0][0], self._slots[len(self._slots) - 1][0]
+
+    def _close_indexes(self) -> None:
+        for index in (self._slots, self._signatures):
+            if index is not None:
+                index.close()
+        self._slots = self._signatures = None
+
+    def close(self) -> None:
+        """Unmap the capture and its indexes."""
+        self._close_indexes()
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            # Returned messages still reference the mapping; it is unmapped
+            # once they are garbage collected
+            logger.debug(f"{self.path}: mapping still referenced, leaving it to the garbage collector")
+
+    def __enter__(self) -> "CaptureArchive":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def main():
+    """Print the messages of a slot or transaction from a capture file."""
+    parser = argparse.ArgumentParser(description='Look up messages in a CoreCast capture file')
+    parser.add_argument('capture', help='Capture file written with main.py --record')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--slot', type=int, help='Print every message of this slot')
+    group.add_argument('--signature', help='Print every message of this transaction (base58)')
+    group.add_argument('--reindex', action='store_true', help='Rebuild the slot and signature indexes')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from protobuf_utils import print_protobuf_message
+
+    with CaptureArchive(args.capture, rebuild=args.reindex) as archive:
+        if args.reindex:
+            return
+        records = archive.by_slot(args.slot) if args.slot is not None else archive.by_signature(args.signature)
+        logger.info(f"Found {len(records)} messages")
+        for record in records:
+            print(f"# {record.rpc_name} slot={record.slot} offset={record.offset}")
+            print_protobuf_message(record.message)
+
+
+if __name__ == "__main__":
+    main()
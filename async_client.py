@@ -0,0 +1,137 @@
+"""
+Asyncio CoreCast gRPC client built on grpc.aio.
+"""
+import grpc
+import logging
+from typing import AsyncIterator, Optional, Union
+
+from proto import corecast_pb2_grpc, stream_message_pb2
+from config import Config, FiltersConfig
+from client import BaseCoreCastClient, CHANNEL_OPTIONS
+from raw_stub import RawCoreCastStub
+from wire import read_slot
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCoreCastClient(BaseCoreCastClient):
+    """
+    CoreCast gRPC client for asyncio applications.
+
+    Every RPC is exposed as an async iterator, so a single event loop can
+    drive many subscriptions concurrently over one channel:
+
+        async with AsyncCoreCastClient(config) as client:
+            async for msg in client.stream_dex_trades():
+                ...
+
+    With ``raw=True`` a stream yields each message's serialized bytes as
+    received, skipping protobuf decoding, e.g. to relay them unchanged.
+    """
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self.channel: Optional[grpc.aio.Channel] = None
+        self.client: Optional[corecast_pb2_grpc.CoreCastStub] = None
+        self.raw_client: Optional[RawCoreCastStub] = None
+
+    async def connect(self) -> None:
+        """Establish gRPC connection to CoreCast server."""
+        credentials = self._channel_credentials()
+
+        logger.debug(f"Connecting to gRPC server: {self.config.server.address}")
+
+        if credentials is None:
+            self.channel = grpc.aio.insecure_channel(
+                self.config.server.address,
+                options=CHANNEL_OPTIONS
+            )
+        else:
+            self.channel = grpc.aio.secure_channel(
+                self.config.server.address,
+                credentials,
+                options=CHANNEL_OPTIONS
+            )
+        self.client = corecast_pb2_grpc.CoreCastStub(self.channel)
+        self.raw_client = RawCoreCastStub(self.channel)
+        logger.debug("gRPC connection established")
+
+    async def close(self) -> None:
+        """Close the gRPC connection, cancelling any active streams."""
+        if self.channel:
+            await self.channel.close()
+            logger.debug("gRPC connection closed")
+
+    async def __aenter__(self) -> "AsyncCoreCastClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def stream_dex_trades(
+        self, filters: Optional[FiltersConfig] = None, raw: bool = False
+    ) -> AsyncIterator[Union[stream_message_pb2.DexTradeStreamMessage, bytes]]:
+        """Stream DEX trades."""
+        req = self._dex_trades_request(filters or self.config.filters)
+        return self._stream("DexTrades", req, "DEX trades", raw=raw)
+
+    def stream_dex_orders(
+        self, filters: Optional[FiltersConfig] = None, raw: bool = False
+    ) -> AsyncIterator[Union[stream_message_pb2.DexOrderStreamMessage, bytes]]:
+        """Stream DEX orders."""
+        req = self._dex_orders_request(filters or self.config.filters)
+        return self._stream("DexOrders", req, "DEX orders", raw=raw)
+
+    def stream_dex_pools(
+        self, filters: Optional[FiltersConfig] = None, raw: bool = False
+    ) -> AsyncIterator[Union[stream_message_pb2.PoolLiquidityChangeStreamMessage, bytes]]:
+        """Stream DEX pool events."""
+        req = self._dex_pools_request(filters or self.config.filters)
+        return self._stream("DexPools", req, "DEX pools", raw=raw)
+
+    def stream_transactions(
+        self, filters: Optional[FiltersConfig] = None, raw: bool = False
+    ) -> AsyncIterator[Union[stream_message_pb2.ParsedTransactionStreamMessage, bytes]]:
+        """Stream parsed transactions."""
+        req = self._transactions_request(filters or self.config.filters)
+        return self._stream("Transactions", req, "transactions", raw=raw)
+
+    def stream_transfers(
+        self, filters: Optional[FiltersConfig] = None, raw: bool = False
+    ) -> AsyncIterator[Union[stream_message_pb2.TransferStreamMessage, bytes]]:
+        """Stream transfers."""
+        req = self._transfers_request(filters or self.config.filters)
+        return self._stream("Transfers", req, "transfers", raw=raw)
+
+    def stream_balances(
+        self, filters: Optional[FiltersConfig] = None, raw: bool = False
+    ) -> AsyncIterator[Union[stream_message_pb2.BalanceUpdateStreamMessage, bytes]]:
+        """Stream balance updates."""
+        req = self._balances_request(filters or self.config.filters)
+        return self._stream("Balances", req, "balances", raw=raw)
+
+    async def _stream(self, rpc_name: str, req, label: str, raw: bool = False) -> AsyncIterator:
+        """
+        Open a server stream and yield its messages.
+
+        The call is re-opened with backoff when it drops, and cancelled when
+        the consumer stops iterating, so breaking out of an ``async for``
+        loop releases the HTTP/2 stream immediately.
+        Messages are only read as fast as the consumer awaits them, which
+        lets slow async writers apply backpressure through gRPC flow control.
+        """
+        if not self.client:
+            raise RuntimeError("Client not connected. Call connect() first.")
+
+        logger.info(f"Subscribing to {label}: {req}")
+        rpc = getattr(self.raw_client if raw else self.client, rpc_name)
+        metadata = self._create_metadata()
+        reconnector = self._reconnector(label, slot_of=read_slot if raw else None)
+        try:
+            async for msg in reconnector.arun(lambda: rpc(req, metadata=metadata)):
+                yield msg
+        except grpc.aio.AioRpcError as e:
+            logger.error(f"{label[0].upper()}{label[1:]} subscription failed: {e}")
+            raise
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency benchmark for the CoreCast client consume paths.
+
+Runs each stream type against a local mock server (see mock_server.py) and
+reports messages/s, bytes/s, CPU time per message and handler latency
+percentiles for the corresponding ``CoreCastClient._consume_*`` loop.
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, List, Optional
+
+from client import CoreCastClient
+from config import (
+    STREAM_TYPES, Config, FiltersConfig, ReconnectConfig, ServerConfig, StreamConfig
+)
+from handlers import resolve_handler
+from sinks import BufferedOutput
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements for one stream type."""
+    stream: str
+    handler: str
+    messages: int
+    bytes: int
+    seconds: float
+    messages_per_sec: float
+    bytes_per_sec: float
+    cpu_us_per_message: float
+    p50_us: float
+    p99_us: float
+    max_us: float
+
+
+def _percentile(sorted_values: List[int], fraction: float) -> int:
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _benchmark_config(address: str, stream_type: str) -> Config:
+    """Plaintext config for one stream with reconnects off, so the run ends with the stream."""
+    return Config(
+        server=ServerConfig(address=address, authorization="benchmark", insecure=True),
+        stream=StreamConfig(type=stream_type),
+        filters=FiltersConfig([], [], [], [], [], [], [], []),
+        reconnect=ReconnectConfig(enabled=False)
+    )
+
+
+def _make_handler(spec: str, out: BufferedOutput) -> Callable:
+    """Resolve the handler under test; "print" writes to out like the client does."""
+    if spec == "noop":
+        return lambda msg: None
+    handler = resolve_handler(spec)
+    if spec == "print":
+        return lambda msg: handler(msg, out=out)
+    return handler
+
+
+def run_stream_benchmark(address: str, stream_type: str, handler_spec: str = "print") -> BenchmarkResult:
+    """
+    Stream one subscription to completion and measure the client side.
+
+    The server must end the stream after a fixed number of messages (the
+    mock's ``--count``). Formatted output goes to os.devnull so terminal
+    speed doesn't skew the numbers. Latency covers the handler call only.
+    CPU time covers the whole process (gRPC reads, decoding, the consume
+    loop and the handler), so the mock server should run in another
+    process.
+    """
+    config = _benchmark_config(address, stream_type)
+    client = CoreCastClient(config)
+    devnull = open(os.devnull, 'w')
+    client.output = BufferedOutput(devnull)
+    handler = _make_handler(handler_spec, client.output)
+
+    latencies: List[int] = []
+    received_bytes = 0
+    first_received: Optional[float] = None
+    perf_counter_ns = time.perf_counter_ns
+
+    def timed_handler(msg) -> None:
+        nonlocal received_bytes, first_received
+        if first_received is None:
+            first_received = time.perf_counter()
+        received_bytes += msg.ByteSize()
+        started = perf_counter_ns()
+        handler(msg)
+        latencies.append(perf_counter_ns() - started)
+
+    client.message_handler = timed_handler
+    try:
+        client.connect()
+        cpu_started = time.process_time()
+        getattr(client, f"stream_{stream_type}")()
+        finished = time.perf_counter()
+        cpu_seconds = time.process_time() - cpu_started
+    finally:
+        client.close()
+        devnull.close()
+
+    count = len(latencies)
+    seconds = finished - first_received if first_received is not None else 0.0
+    latencies.sort()
+    return BenchmarkResult(
+        stream=stream_type,
+        handler=handler_spec,
+        messages=count,
+        bytes=received_bytes,
+        seconds=seconds,
+        messages_per_sec=count / seconds if seconds else 0.0,
+        bytes_per_sec=received_bytes / seconds if seconds else 0.0,
+        cpu_us_per_message=cpu_seconds * 1e6 / count if count else 0.0,
+        p50_us=_percentile(latencies, 0.50) / 1000,
+        p99_us=_percentile(latencies, 0.99) / 1000,
+        max_us=(latencies[-1] if latencies else 0) / 1000,
+    )
+
+
+def start_mock_server(
+    address: str,
+    count: int,
+    rate: float,
+    repeat: int,
+    seed: int,
+    corpus: Optional[str] = None
+) -> subprocess.Popen:
+    """Start mock_server.py in a child process and wait until it accepts connections."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_server.py')
+    command = [
+        sys.executable, script,
+        '--address', address,
+        '--count', str(count),
+        '--rate', str(rate),
+        '--repeat', str(repeat),
+        '--seed', str(seed),
+        '--log-level', 'WARNING',
+    ]
+    if corpus:
+        command += ['--corpus', corpus]
+    process = subprocess.Popen(command)
+    host, port = address.rsplit(':', 1)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, int(port)), timeout=0.2):
+                return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"Mock server did not start on {address}")
+
+
+def print_results(results: List[BenchmarkResult]) -> None:
+    """Print results as a table."""
+    print(
+        f"{'stream':<14}{'handler':<10}{'messages':>10}{'msg/s':>12}{'MB/s':>9}"
+        f"{'cpu us/msg':>12}{'p50 us':>9}{'p99 us':>9}{'max us':>10}"
+    )
+    for r in results:
+        print(
+            f"{r.stream:<14}{r.handler:<10}{r.messages:>10}{r.messages_per_sec:>12.0f}"
+            f"{r.bytes_per_sec / 1e6:>9.2f}{r.cpu_us_per_message:>12.1f}"
+            f"{r.p50_us:>9.1f}{r.p99_us:>9.1f}{r.max_us:>10.1f}"
+        )
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Benchmark the CoreCast client against a mock server')
+    parser.add_argument(
+        '--streams',
+        nargs='+',
+        choices=STREAM_TYPES,
+        default=list(STREAM_TYPES),
+        help='Stream types to benchmark (default: all)'
+    )
+    parser.add_argument('--messages', type=int, default=20000, help='Messages per stream (default: 20000)')
+    parser.add_argument('--rate', type=float, default=0, help='Server send rate in msg/s; 0 = unlimited')
+    parser.add_argument('--repeat', type=int, default=2, help='Length of repeated fields in generated messages')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for generated messages')
+    parser.add_argument('--corpus', help='Serve messages from this capture file (see main.py --record)')
+    parser.add_argument(
+        '--handler',
+        default='print',
+        help='Handler under test: print, format, noop or module:function (default: print)'
+    )
+    parser.add_argument(
+        '--address',
+        help='Benchmark an already running server instead of starting mock_server.py; '
+             'it must end each stream after a fixed number of messages'
+    )
+    parser.add_argument('--json', dest='json_path', help='Also write results as JSON to this file')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    process = None
+    address = args.address
+    if address is None:
+        address = f"127.0.0.1:{_free_port()}"
+        process = start_mock_server(address, args.messages, args.rate, args.repeat, args.seed, args.corpus)
+
+    results = []
+    try:
+        for stream_type in args.streams:
+            results.append(run_stream_benchmark(address, stream_type, args.handler))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print_results(results)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
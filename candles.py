@@ -0,0 +1,355 @@
+"""
+Real-time OHLCV candle aggregation over the DEX trades stream.
+"""
+import collections
+import json
+import logging
+import sys
+import threading
+import time
+from array import array
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from currencies import decimal_scale
+from encoding import b58encode
+
+
+logger = logging.getLogger(__name__)
+
+
+# Candle intervals in seconds: 1s, 1m, 5m, 1h
+DEFAULT_INTERVALS = (1, 60, 300, 3600)
+
+# Rows (markets) added to the ring arrays at a time
+_GROW_ROWS = 1024
+
+# (market, base mint, quote mint), raw bytes
+MarketKey = Tuple[bytes, bytes, bytes]
+
+
+@dataclass
+class Candle:
+    """A closed (or in-progress) candle of one market."""
+    market: str
+    base_mint: str
+    quote_mint: str
+    interval: int  # seconds
+    start: int  # unix time of the first second covered
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float  # base currency
+    quote_volume: float
+    trades: int
+
+    @property
+    def vwap(self) -> float:
+        """Volume-weighted average price."""
+        return self.quote_volume / self.volume if self.volume else self.close
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["vwap"] = self.vwap
+        return data
+
+
+def write_candle(candle: Candle, out=None) -> None:
+    """Default candle sink: one JSON object per line to out (default stdout)."""
+    (out or sys.stdout).write(json.dumps(candle.to_dict()) + "\n")
+
+
+class _CandleRing:
+    """
+    The last ``history`` candles of one interval for every tracked market.
+
+    Candles are stored column-wise in flat typed arrays: row ``r`` owns
+    slots ``r * history`` to ``(r + 1) * history - 1`` and a candle for
+    bucket ``b`` lives in slot ``b % history``. The arrays grow in blocks
+    of rows as markets are added, up to the aggregator's market limit.
+    """
+
+    def __init__(self, interval: int, history: int):
+        self.interval = interval
+        self.history = history
+        self.rows = 0
+        self.bucket = array('q')
+        self.open = array('d')
+        self.high = array('d')
+        self.low = array('d')
+        self.close = array('d')
+        self.volume = array('d')
+        self.quote_volume = array('d')
+        self.trades = array('I')
+        # Bucket of each row's open candle, -1 if none is open
+        self.current = array('q')
+        # Bucket -> rows that opened a candle in it, for closing on time
+        self.opened: Dict[int, List[int]] = collections.defaultdict(list)
+
+    def ensure_rows(self, rows: int) -> None:
+        while self.rows < rows:
+            slots = _GROW_ROWS * self.history
+            self.bucket.extend(array('q', [-1]) * slots)
+            for column in (self.open, self.high, self.low, self.close, self.volume, self.quote_volume):
+                column.extend(array('d', [0.0]) * slots)
+            self.trades.extend(array('I', [0]) * slots)
+            self.current.extend(array('q', [-1]) * _GROW_ROWS)
+            self.rows += _GROW_ROWS
+
+    def reset_row(self, row: int) -> None:
+        start = row * self.history
+        self.bucket[start:start + self.history] = array('q', [-1]) * self.history
+        self.current[row] = -1
+
+    def slot(self, row: int, bucket: int) -> int:
+        return row * self.history + bucket % self.history
+
+    def open_candle(self, row: int, bucket: int, price: float, volume: float, quote_volume: float) -> None:
+        i = self.slot(row, bucket)
+        self.bucket[i] = bucket
+        self.open[i] = self.high[i] = self.low[i] = self.close[i] = price
+        self.volume[i] = volume
+        self.quote_volume[i] = quote_volume
+        self.trades[i] = 1
+        self.current[row] = bucket
+        self.opened[bucket].append(row)
+
+    def update_candle(self, row: int, bucket: int, price: float, volume: float, quote_volume: float) -> None:
+        i = self.slot(row, bucket)
+        if price > self.high[i]:
+            self.high[i] = price
+        elif price < self.low[i]:
+            self.low[i] = price
+        self.close[i] = price
+        self.volume[i] += volume
+        self.quote_volume[i] += quote_volume
+        self.trades[i] += 1
+
+
+class CandleAggregator:
+    """
+    Builds rolling OHLCV candles per market from DexTradeStreamMessages.
+
+    Each trade is priced in quote currency per unit of base currency, using
+    ``Buy.Amount``/``Sell.Amount`` scaled by their ``Currency.Decimals``.
+    The side whose mint is ``Market.BaseCurrency.MintAddress`` is the base.
+    Without market currencies, the side with the lower mint address (as
+    bytes) is, so trades in both directions share one orientation and a
+    trade with the sides reversed is priced inverted. Candles are keyed by
+    ``Market.MarketAddress``, or additionally by the mint pair with
+    ``by_mint_pair``.
+
+    Stream messages carry no block time, so trades are bucketed by receive
+    time (``clock``, default time.time).
+
+    When a market's candle for an interval ends, it is passed to
+    ``on_candle``. That happens on the market's next trade or on the
+    periodic tick, whichever comes first. Each interval keeps the last
+    ``history`` candles per market for queries. At most ``max_markets``
+    markets are tracked. Beyond that, the least recently traded market is
+    evicted after its open candles are emitted. Memory is bounded by about
+    max_markets * history * len(intervals) * 64 bytes.
+    """
+
+    def __init__(
+        self,
+        on_candle: Callable[[Candle], None] = write_candle,
+        intervals: Iterable[int] = DEFAULT_INTERVALS,
+        history: int = 16,
+        max_markets: int = 20000,
+        by_mint_pair: bool = False,
+        tick_interval: float = 1.0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.on_candle = on_candle
+        self.rings = [_CandleRing(int(interval), history) for interval in sorted(set(intervals))]
+        self.history = history
+        self.max_markets = max_markets
+        self.by_mint_pair = by_mint_pair
+        self.clock = clock
+        # Lookup key -> row, least recently traded first
+        self._rows: "collections.OrderedDict" = collections.OrderedDict()
+        self._keys: List[Optional[MarketKey]] = []
+        self._free_rows: List[int] = []
+        self._lock = threading.Lock()
+        self.trades = 0
+        self.skipped = 0
+        self.evicted = 0
+
+        self._closed = threading.Event()
+        self._ticker: Optional[threading.Thread] = None
+        if tick_interval > 0:
+            self._ticker = threading.Thread(
+                target=self._tick_periodically, args=(tick_interval,), name="candle-ticker", daemon=True
+            )
+            self._ticker.start()
+
+    def add_trade(self, msg) -> None:
+        """Add one DexTradeStreamMessage."""
+        if not msg.Transaction.Status.Success:
+            self.skipped += 1
+            return
+        trade = msg.Trade
+        buy = trade.Buy
+        sell = trade.Sell
+        if not buy.Amount or not sell.Amount:
+            self.skipped += 1
+            return
+        market = trade.Market
+        base_mint = market.BaseCurrency.MintAddress
+        if base_mint:
+            reverse = sell.Currency.MintAddress == base_mint
+        else:
+            reverse = sell.Currency.MintAddress < buy.Currency.MintAddress
+        base, quote = (sell, buy) if reverse else (buy, sell)
+        volume = base.Amount * decimal_scale(base.Currency.Decimals)
+        quote_volume = quote.Amount * decimal_scale(quote.Currency.Decimals)
+        if not volume:
+            # Decimals so large that the amount underflows
+            self.skipped += 1
+            return
+        key = (market.MarketAddress, base.Currency.MintAddress, quote.Currency.MintAddress)
+        self.add(key, quote_volume / volume, volume, quote_volume)
+
+    def add(self, key: MarketKey, price: float, volume: float, quote_volume: float, now: Optional[float] = None) -> None:
+        """Add one priced trade for a market key of (market, base mint, quote mint)."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            row = self._row_for(key)
+            for ring in self.rings:
+                bucket = int(now // ring.interval)
+                current = ring.current[row]
+                if current == bucket or current > bucket:
+                    # A clock step backwards still lands in the open candle
+                    ring.update_candle(row, current, price, volume, quote_volume)
+                    continue
+                if current >= 0:
+                    self._emit(ring, row, current)
+                ring.open_candle(row, bucket, price, volume, quote_volume)
+            self.trades += 1
+
+    def _lookup_key(self, key: MarketKey):
+        return key if self.by_mint_pair else key[0]
+
+    def _row_for(self, key: MarketKey) -> int:
+        lookup = self._lookup_key(key)
+        row = self._rows.get(lookup)
+        if row is not None:
+            self._rows.move_to_end(lookup)
+            return row
+        if len(self._rows) >= self.max_markets:
+            self._evict_oldest()
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._keys[row] = key
+        else:
+            row = len(self._keys)
+            self._keys.append(key)
+            for ring in self.rings:
+                ring.ensure_rows(row + 1)
+        self._rows[lookup] = row
+        return row
+
+    def _evict_oldest(self) -> None:
+        _, row = self._rows.popitem(last=False)
+        for ring in self.rings:
+            current = ring.current[row]
+            if current >= 0:
+                self._emit(ring, row, current)
+            ring.reset_row(row)
+        self._keys[row] = None
+        self._free_rows.append(row)
+        self.evicted += 1
+
+    def _candle(self, ring: _CandleRing, row: int, bucket: int) -> Candle:
+        i = ring.slot(row, bucket)
+        market, base_mint, quote_mint = self._keys[row]
+        return Candle(
+            market=b58encode(market),
+            base_mint=b58encode(base_mint),
+            quote_mint=b58encode(quote_mint),
+            interval=ring.interval,
+            start=bucket * ring.interval,
+            open=ring.open[i],
+            high=ring.high[i],
+            low=ring.low[i],
+            close=ring.close[i],
+            volume=ring.volume[i],
+            quote_volume=ring.quote_volume[i],
+            trades=ring.trades[i],
+        )
+
+    def _emit(self, ring: _CandleRing, row: int, bucket: int) -> None:
+        ring.current[row] = -1
+        try:
+            self.on_candle(self._candle(ring, row, bucket))
+        except Exception as e:
+            logger.error(f"Error in candle sink: {e}")
+
+    def tick(self, now: Optional[float] = None) -> None:
+        """Emit every open candle whose interval has ended."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            for ring in self.rings:
+                now_bucket = int(now // ring.interval)
+                for bucket in [b for b in ring.opened if b < now_bucket]:
+                    for row in ring.opened.pop(bucket):
+                        # Skip rows whose candle already closed on a newer trade
+                        if ring.current[row] == bucket:
+                            self._emit(ring, row, bucket)
+
+    def candles(self, market: bytes, interval: int, count: Optional[int] = None, mints: Optional[Tuple[bytes, bytes]] = None) -> List[Candle]:
+        """
+        Recent candles of a market, newest first, including the open one.
+
+        Args:
+            market: Market address (raw bytes)
+            interval: One of the configured intervals, in seconds
+            count: Maximum number of candles (default: all kept)
+            mints: (base mint, quote mint), required with by_mint_pair
+        """
+        lookup = (market,) + tuple(mints) if self.by_mint_pair else market
+        ring = next((r for r in self.rings if r.interval == interval), None)
+        if ring is None:
+            raise ValueError(f"Interval {interval}s is not aggregated")
+        with self._lock:
+            row = self._rows.get(lookup)
+            if row is None:
+                return []
+            start = row * ring.history
+            buckets = sorted(
+                (b for b in ring.bucket[start:start + ring.history] if b >= 0), reverse=True
+            )
+            return [self._candle(ring, row, b) for b in buckets[:count]]
+
+    @property
+    def markets(self) -> int:
+        """Number of markets currently tracked."""
+        return len(self._rows)
+
+    def _tick_periodically(self, tick_interval: float) -> None:
+        while not self._closed.wait(tick_interval):
+            self.tick()
+
+    def close(self) -> None:
+        """Stop the ticker and emit every open candle."""
+        self._closed.set()
+        if self._ticker is not None:
+            self._ticker.join()
+        with self._lock:
+            for ring in self.rings:
+                for row in range(len(self._keys)):
+                    if self._keys[row] is not None and ring.current[row] >= 0:
+                        self._emit(ring, row, ring.current[row])
+                ring.opened.clear()
+        logger.info(
+            f"Candle aggregator: {self.trades} trades in {self.markets} markets "
+            f"({self.skipped} skipped, {self.evicted} markets evicted)"
+        )
+
+    def __enter__(self) -> "CandleAggregator":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,242 @@
+"""
+Append-only capture files of raw stream messages, for record and replay.
+
+A capture file starts with an 8-byte magic followed by records::
+
+    uint32 payload length | uint8 RPC code | int64 receive time (ns since epoch)
+    | uint64 slot | payload (the serialized stream message)
+
+All integers are little-endian. A sidecar ``<path>.idx`` file holds a
+sparse slot index of ``uint64 slot | uint64 file offset`` entries, so a
+replay can start at a slot without scanning the whole capture.
+"""
+import bisect
+import logging
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from wire import read_slot
+
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b"CCCAPT01"
+INDEX_SUFFIX = ".idx"
+
+# payload length, RPC code, receive timestamp (ns), slot
+RECORD_HEADER = struct.Struct("<IBqQ")
+# slot, offset of the record in the capture file
+_INDEX_ENTRY = struct.Struct("<QQ")
+
+# Stable on-disk codes for the CoreCast RPCs; never renumber
+RPC_CODES = {
+    "DexTrades": 1,
+    "DexOrders": 2,
+    "DexPools": 3,
+    "Transactions": 4,
+    "Transfers": 5,
+    "Balances": 6,
+}
+RPC_NAMES = {code: name for name, code in RPC_CODES.items()}
+
+
+@dataclass
+class CaptureRecord:
+    """One captured stream message."""
+    rpc_name: str
+    timestamp_ns: int
+    slot: int
+    data: bytes
+    offset: int
+
+
+class CaptureWriter:
+    """
+    Appends raw stream messages to a capture file.
+
+    An existing capture is appended to, never rewritten. An index entry is
+    written for the first record of a slot once at least ``index_interval``
+    bytes have been written since the previous entry, which keeps the
+    sidecar small while bounding how far a seek has to scan.
+    """
+
+    def __init__(self, path: str, index_interval: int = 1024 * 1024, buffer_size: int = 1024 * 1024):
+        self.path = path
+        self.index_interval = index_interval
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{path} is not a capture file")
+            self._offset = os.path.getsize(path)
+            self._file = open(path, "ab", buffering=buffer_size)
+            logger.info(f"Appending to capture file {path}")
+        else:
+            self._file = open(path, "ab", buffering=buffer_size)
+            self._file.write(MAGIC)
+            self._offset = len(MAGIC)
+        self._index = open(path + INDEX_SUFFIX, "ab")
+        self._last_indexed_offset: Optional[int] = None
+        self._last_indexed_slot: Optional[int] = None
+        self._lock = threading.Lock()
+        self.records = 0
+        self.bytes = 0
+
+    def write(self, rpc_name: str, data: bytes, slot: Optional[int] = None, timestamp_ns: Optional[int] = None) -> None:
+        """Append one serialized message; slot is read from the message if omitted."""
+        if slot is None:
+            slot = read_slot(data)
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        header = RECORD_HEADER.pack(len(data), RPC_CODES[rpc_name], timestamp_ns, slot)
+        with self._lock:
+            offset = self._offset
+            if self._last_indexed_offset is None or (
+                slot != self._last_indexed_slot
+                and offset - self._last_indexed_offset >= self.index_interval
+            ):
+                self._index.write(_INDEX_ENTRY.pack(slot, offset))
+                self._last_indexed_offset = offset
+                self._last_indexed_slot = slot
+            self._file.write(header)
+            self._file.write(data)
+            self._offset = offset + len(header) + len(data)
+            self.records += 1
+            self.bytes += len(data)
+
+    def tap(self, rpc_name: str, stream: Iterable[bytes]) -> Iterator[bytes]:
+        """Record every message of a raw stream while passing it through."""
+        for data in stream:
+            self.write(rpc_name, data)
+            yield data
+
+    def flush(self) -> None:
+        """Flush buffered records and index entries to disk."""
+        with self._lock:
+            self._file.flush()
+            self._index.flush()
+
+    def close(self) -> None:
+        """Flush and close the capture and its index."""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+            self._index.close()
+        logger.info(f"Recorded {self.records} messages ({self.bytes} bytes) to {self.path}")
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class CaptureReader:
+    """Reads records back from a capture file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a capture file")
+        self.index = self._load_index()
+
+    def _load_index(self) -> List[Tuple[int, int]]:
+        index_path = self.path + INDEX_SUFFIX
+        if not os.path.exists(index_path):
+            return []
+        with open(index_path, "rb") as f:
+            data = f.read()
+        # A torn trailing entry is ignored
+        usable = len(data) - len(data) % _INDEX_ENTRY.size
+        return list(_INDEX_ENTRY.iter_unpack(data[:usable]))
+
+    def _start_offset(self, from_slot: int) -> int:
+        """Offset of the last indexed record before from_slot (or the first record)."""
+        slots = [slot for slot, _ in self.index]
+        if any(a > b for a, b in zip(slots, slots[1:])):
+            # Appended sessions can restart at lower slots; seeking is unsafe
+            return len(MAGIC)
+        position = bisect.bisect_left(slots, from_slot)
+        if position == 0:
+            return len(MAGIC)
+        return self.index[position - 1][1]
+
+    def records(self, rpc_names: Optional[Iterable[str]] = None, from_slot: int = 0) -> Iterator[CaptureRecord]:
+        """
+        Iterate records in file order.
+
+        Args:
+            rpc_names: Only yield records of these RPCs (default: all)
+            from_slot: Skip records before this slot, seeking via the index
+        """
+        codes = None if rpc_names is None else {RPC_CODES[name] for name in rpc_names}
+        header_size = RECORD_HEADER.size
+        with open(self.path, "rb", buffering=1024 * 1024) as f:
+            offset = self._start_offset(from_slot) if from_slot else len(MAGIC)
+            f.seek(offset)
+            while True:
+                header = f.read(header_size)
+                if not header:
+                    return
+                if len(header) < header_size:
+                    logger.warning(f"{self.path}: truncated record at offset {offset}, stopping")
+                    return
+                length, code, timestamp_ns, slot = RECORD_HEADER.unpack(header)
+                data = f.read(length)
+                if len(data) < length:
+                    logger.warning(f"{self.path}: truncated record at offset {offset}, stopping")
+                    return
+                record_offset = offset
+                offset += header_size + length
+                if slot < from_slot or (codes is not None and code not in codes):
+                    continue
+                yield CaptureRecord(RPC_NAMES.get(code, str(code)), timestamp_ns, slot, data, record_offset)
+
+
+def paced(records: Iterable[CaptureRecord], speed: float = 1.0) -> Iterator[CaptureRecord]:
+    """
+    Yield records on the schedule of their receive timestamps.
+
+    Args:
+        records: Records in capture order
+        speed: Playback speed multiplier (2.0 is twice as fast); 0 yields
+            records as fast as possible
+    """
+    if speed <= 0:
+        yield from records
+        return
+    first_timestamp = None
+    started = 0.0
+    for record in records:
+        if first_timestamp is None:
+            first_timestamp = record.timestamp_ns
+            started = time.monotonic()
+        else:
+            delay = started + (record.timestamp_ns - first_timestamp) / 1e9 / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield record
+
+
+class CaptureReplay:
+    """Feeds a capture back to the client as raw per-RPC message streams."""
+
+    def __init__(self, path: str, speed: float = 1.0, from_slot: int = 0):
+        self.reader = CaptureReader(path)
+        self.speed = speed
+        self.from_slot = from_slot
+
+    def stream(self, rpc_name: str) -> Iterator[bytes]:
+        """Yield the captured payloads of one RPC, paced by the replay speed."""
+        records = self.reader.records(rpc_names=(rpc_name,), from_slot=self.from_slot)
+        count = 0
+        for record in paced(records, self.speed):
+            count += 1
+            yield record.data
+        logger.info(f"Replayed {count} {rpc_name} messages from {self.reader.path}")
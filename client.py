@@ -1,18 +1,37 @@
 """
 CoreCast gRPC client for streaming Solana blockchain data.
 """
+import functools
 import grpc
 import ssl
 import signal
 import sys
+import threading
+import time
 import logging
 import base58
-from typing import Optional, List
-from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, List
+from contextlib import ExitStack, contextmanager
 
 from proto import corecast_pb2_grpc, corecast_pb2, request_pb2
-from config import Config, load_config
-from protobuf_utils import print_protobuf_message
+from candles import CandleAggregator, write_candle
+from capture import CaptureReplay, CaptureWriter
+from client_filters import MessageFilter
+from config import ClientFiltersConfig, Config, FiltersConfig, load_config
+from currencies import CurrencyRegistry
+from ledger import BalanceLedger, write_delta
+from metrics import ClientMetrics, MetricsServer
+from protobuf_utils import MessageRenderers, print_protobuf_message
+from pipeline import MessagePipeline
+from profiling import StageProfiler
+from pool_state import PoolStateStore
+from orderbook import OrderBookEngine, write_snapshots
+from procpool import ProcessPoolFanout, write_result
+from raw_stub import RPC_TYPES, RawCoreCastStub
+from reconnect import StreamReconnector
+from sharding import SlotMerger, shard_request
+from sinks import BufferedOutput, DelimitedOutput, DexTradeParquetSink
+from wire import Buffer, read_slot
 
 
 # Configure logging
@@ -23,56 +42,52 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class CoreCastClient:
-    """CoreCast gRPC client for streaming Solana data."""
+# RPC name -> stream type, as used in configs and metric labels
+RPC_STREAM_TYPES = {
+    "DexTrades": "dex_trades",
+    "DexOrders": "dex_orders",
+    "DexPools": "dex_pools",
+    "Transactions": "transactions",
+    "Transfers": "transfers",
+    "Balances": "balances",
+}
+
+# gRPC channel options shared by the sync and asyncio clients
+CHANNEL_OPTIONS = [
+    ('grpc.initial_window_size', 16 * 1024 * 1024),  # 16MB
+    ('grpc.initial_conn_window_size', 128 * 1024 * 1024),  # 128MB
+    ('grpc.max_receive_message_length', 64 * 1024 * 1024),  # 64MB
+    ('grpc.max_send_message_length', 64 * 1024 * 1024),  # 64MB
+    ('grpc.keepalive_time_ms', 15000),  # 15 seconds
+    ('grpc.keepalive_timeout_ms', 5000),  # 5 seconds
+    ('grpc.keepalive_permit_without_calls', True),
+    ('grpc.http2.max_pings_without_data', 0),
+    ('grpc.http2.min_time_between_pings_ms', 10000),
+    ('grpc.http2.min_ping_interval_without_data_ms', 300000),
+]
+
+
+class BaseCoreCastClient:
+    """Connection settings and request builders shared by the CoreCast clients."""
     
     def __init__(self, config: Config):
         self.config = config
-        self.channel: Optional[grpc.Channel] = None
-        self.client: Optional[corecast_pb2_grpc.CoreCastStub] = None
-        
-    def connect(self) -> None:
-        """Establish gRPC connection to CoreCast server."""
-        # Create credentials
+        # One reconnector per opened stream, keyed by label, for gap stats
+        self.reconnectors: Dict[str, StreamReconnector] = {}
+    
+    def _reconnector(self, label: str, slot_of: Callable = None) -> StreamReconnector:
+        """Create and register the reconnect engine for a stream."""
+        reconnector = StreamReconnector(label, self.config.reconnect, slot_of=slot_of)
+        self.reconnectors[label] = reconnector
+        return reconnector
+    
+    def _channel_credentials(self) -> Optional[grpc.ChannelCredentials]:
+        """Create channel credentials, or None for a plaintext channel."""
         if self.config.server.insecure:
-            credentials = grpc.insecure_channel_credentials()
             logger.debug("Using insecure gRPC transport")
-        else:
-            credentials = grpc.ssl_channel_credentials()
-            logger.debug("Using TLS gRPC transport")
-        
-        # Create channel options
-        options = [
-            ('grpc.initial_window_size', 16 * 1024 * 1024),  # 16MB
-            ('grpc.initial_conn_window_size', 128 * 1024 * 1024),  # 128MB
-            ('grpc.max_receive_message_length', 64 * 1024 * 1024),  # 64MB
-            ('grpc.max_send_message_length', 64 * 1024 * 1024),  # 64MB
-            ('grpc.keepalive_time_ms', 15000),  # 15 seconds
-            ('grpc.keepalive_timeout_ms', 5000),  # 5 seconds
-            ('grpc.keepalive_permit_without_calls', True),
-            ('grpc.http2.max_pings_without_data', 0),
-            ('grpc.http2.min_time_between_pings_ms', 10000),
-            ('grpc.http2.min_ping_interval_without_data_ms', 300000),
-        ]
-        
-        logger.debug(f"Connecting to gRPC server: {self.config.server.address}")
-        
-        # Create channel
-        self.channel = grpc.secure_channel(
-            self.config.server.address,
-            credentials,
-            options=options
-        )
-        
-        # Create client stub
-        self.client = corecast_pb2_grpc.CoreCastStub(self.channel)
-        logger.debug("gRPC connection established")
-    
-    def close(self) -> None:
-        """Close the gRPC connection."""
-        if self.channel:
-            self.channel.close()
-            logger.debug("gRPC connection closed")
+            return None
+        logger.debug("Using TLS gRPC transport")
+        return grpc.ssl_channel_credentials()
     
     def _create_metadata(self) -> List[tuple]:
         """Create metadata for gRPC calls."""
@@ -90,128 +105,578 @@ class CoreCastClient:
             return None
         return request_pb2.AddressFilter(addresses=addresses)
     
+    def _dex_trades_request(self, filters: FiltersConfig) -> request_pb2.SubscribeTradesRequest:
+        """Build a DexTrades subscription request."""
+        return request_pb2.SubscribeTradesRequest(
+            program=self._addr_filter_from_slice(filters.programs),
+            pool=self._addr_filter_from_slice(filters.pools),
+            token=self._addr_filter_from_slice(filters.tokens),
+            trader=self._addr_filter_from_slice(filters.traders)
+        )
+    
+    def _dex_orders_request(self, filters: FiltersConfig) -> request_pb2.SubscribeOrdersRequest:
+        """Build a DexOrders subscription request."""
+        return request_pb2.SubscribeOrdersRequest(
+            program=self._addr_filter_from_slice(filters.programs),
+            pool=self._addr_filter_from_slice(filters.pools),
+            token=self._addr_filter_from_slice(filters.tokens),
+            trader=self._addr_filter_from_slice(filters.traders)
+        )
+    
+    def _dex_pools_request(self, filters: FiltersConfig) -> request_pb2.SubscribePoolsRequest:
+        """Build a DexPools subscription request."""
+        return request_pb2.SubscribePoolsRequest(
+            program=self._addr_filter_from_slice(filters.programs),
+            pool=self._addr_filter_from_slice(filters.pools),
+            token=self._addr_filter_from_slice(filters.tokens)
+        )
+    
+    def _transactions_request(self, filters: FiltersConfig) -> request_pb2.SubscribeTransactionsRequest:
+        """Build a Transactions subscription request."""
+        return request_pb2.SubscribeTransactionsRequest(
+            program=self._addr_filter_from_slice(filters.programs),
+            signer=self._addr_filter_from_slice(filters.signers)
+        )
+    
+    def _transfers_request(self, filters: FiltersConfig) -> request_pb2.SubscribeTransfersRequest:
+        """Build a Transfers subscription request."""
+        return request_pb2.SubscribeTransfersRequest(
+            sender=self._addr_filter_from_slice(filters.senders),
+            receiver=self._addr_filter_from_slice(filters.receivers),
+            token=self._addr_filter_from_slice(filters.tokens)
+        )
+    
+    def _balances_request(self, filters: FiltersConfig) -> request_pb2.SubscribeBalanceUpdateRequest:
+        """Build a Balances subscription request."""
+        return request_pb2.SubscribeBalanceUpdateRequest(
+            address=self._addr_filter_from_slice(filters.addresses),
+            token=self._addr_filter_from_slice(filters.tokens)
+        )
+
+
+class CoreCastClient(BaseCoreCastClient):
+    """CoreCast gRPC client for streaming Solana data."""
+    
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self.channel: Optional[grpc.Channel] = None
+        self.client: Optional[corecast_pb2_grpc.CoreCastStub] = None
+        self.raw_client: Optional[RawCoreCastStub] = None
+        # Block-buffered stdout, created on first use (see the output property)
+        self._output: Optional[BufferedOutput] = None
+        # Called with every received message
+        self.message_handler: Callable = self._print_message
+        # Called with every serialized message in raw mode; None writes them length-delimited to raw.output
+        self.raw_handler: Optional[Callable[[Buffer], None]] = None
+        self.pipelines: Dict[str, MessagePipeline] = {}
+        # Set by start_recording() / start_replay()
+        self.recorder: Optional[CaptureWriter] = None
+        self.replay_source: Optional[CaptureReplay] = None
+        # Live order books while streaming DEX orders with order_book enabled
+        self.order_books: Optional[OrderBookEngine] = None
+        # Latest pool reserves while streaming DEX pools with pool_state enabled
+        self.pool_states: Optional[PoolStateStore] = None
+        # Running balances while streaming balances with ledger enabled
+        self.ledger: Optional[BalanceLedger] = None
+        # Shared Currency metadata; also used when printing messages
+        self.currencies: Optional[CurrencyRegistry] = None
+        self._renderers: Optional[MessageRenderers] = None
+        if config.currencies.enabled:
+            self.currencies = CurrencyRegistry(
+                max_entries=config.currencies.max_entries,
+                path=config.currencies.path
+            )
+            self._renderers = self.currencies.renderers
+        # Prometheus metrics, served over HTTP while the client runs
+        self.metrics: Optional[ClientMetrics] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        if config.metrics.enabled:
+            self._start_metrics()
+        # Profile captures; stage_profiler is also set when stages are timed per message
+        self.profiler: Optional[StageProfiler] = None
+        self.stage_profiler: Optional[StageProfiler] = None
+        if config.profiling.enabled:
+            profiling_config = config.profiling
+            self.profiler = StageProfiler(
+                directory=profiling_config.directory,
+                window=profiling_config.window,
+                sample_interval=profiling_config.sample_interval,
+                cprofile_every=profiling_config.cprofile_every,
+                tracemalloc_frames=profiling_config.tracemalloc_frames
+            )
+            if profiling_config.stage_timing:
+                self.stage_profiler = self.profiler
+            if profiling_config.signal:
+                self.profiler.install_signal(profiling_config.signal)
+        
+    @property
+    def output(self) -> BufferedOutput:
+        """
+        Formatted output, block-buffered instead of written line by line.
+        
+        Created when first used, so clients that never print (raw mode,
+        process pool, custom handlers) run no flusher thread.
+        """
+        if self._output is None:
+            self._output = BufferedOutput(
+                sys.stdout,
+                buffer_size=self.config.output.buffer_size,
+                flush_interval=self.config.output.flush_interval
+            )
+        return self._output
+    
+    @output.setter
+    def output(self, output: BufferedOutput) -> None:
+        self._output = output
+    
+    def _print_message(self, msg) -> None:
+        """The default message handler: format msg to the buffered output."""
+        print_protobuf_message(msg, out=self.output, renderers=self._renderers)
+    
+    def _start_metrics(self) -> None:
+        """Create the metrics, including scrape-time pipeline and reconnect figures, and serve them."""
+        metrics_config = self.config.metrics
+        metrics = self.metrics = ClientMetrics(
+            slot_duration=metrics_config.slot_duration,
+            reference_slot=metrics_config.reference_slot,
+            reference_time=metrics_config.reference_time
+        )
+        metrics.registry.callback(
+            "corecast_queue_depth", "Messages waiting in the pipeline queue", "gauge", ["stream"],
+            lambda: [((name,), pipeline.stats().depth) for name, pipeline in list(self.pipelines.items())]
+        )
+        metrics.registry.callback(
+            "corecast_reconnects_total", "Stream reconnects", "counter", ["subscription"],
+            lambda: [((label,), r.reconnects) for label, r in list(self.reconnectors.items())]
+        )
+        self.metrics_server = MetricsServer(metrics.registry, metrics_config.host, metrics_config.port)
+    
+    def _open_channel(self, options: List[tuple] = CHANNEL_OPTIONS) -> grpc.Channel:
+        """Create a channel to the configured server."""
+        credentials = self._channel_credentials()
+        if credentials is None:
+            return grpc.insecure_channel(self.config.server.address, options=options)
+        return grpc.secure_channel(self.config.server.address, credentials, options=options)
+    
+    def connect(self) -> None:
+        """Establish gRPC connection to CoreCast server."""
+        logger.debug(f"Connecting to gRPC server: {self.config.server.address}")
+        
+        # Create channel
+        self.channel = self._open_channel()
+        
+        # Create client stubs
+        self.client = corecast_pb2_grpc.CoreCastStub(self.channel)
+        self.raw_client = RawCoreCastStub(self.channel)
+        logger.debug("gRPC connection established")
+    
+    def close(self) -> None:
+        """Close the gRPC connection, flush buffered output and recordings, and save currencies."""
+        if self.channel:
+            self.channel.close()
+            logger.debug("gRPC connection closed")
+        if self.recorder is not None:
+            self.recorder.close()
+        if self._output is not None:
+            self._output.close()
+        if self.currencies is not None:
+            self.currencies.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        if self.profiler is not None:
+            self.profiler.close()
+        if self.stage_profiler is not None:
+            logger.info(f"Stage times:\n{self.stage_profiler.report()}")
+    
+    def start_recording(self, path: str) -> None:
+        """Append every raw message received from now on to a capture file."""
+        self.recorder = CaptureWriter(path)
+        logger.info(f"Recording stream messages to {path}")
+    
+    def start_replay(self, path: str, speed: float = 1.0, from_slot: int = 0) -> None:
+        """
+        Read stream messages from a capture file instead of the server.
+        
+        Args:
+            path: Capture file written by start_recording()
+            speed: Playback speed multiplier; 0 replays as fast as possible
+            from_slot: Skip messages before this slot
+        """
+        self.replay_source = CaptureReplay(path, speed=speed, from_slot=from_slot)
+        logger.info(f"Replaying stream messages from {path} (speed={speed or 'max'})")
+    
+    def _message_filter(self, stream_type: str) -> MessageFilter:
+        """Compile the client_filters config for one stream type."""
+        filters_config = self.config.client_filters
+        return MessageFilter(
+            stream_type,
+            success=filters_config.success,
+            protocol_families=filters_config.protocol_families,
+            signers=filters_config.signers,
+            methods=filters_config.methods,
+            accounts=filters_config.accounts,
+            min_usd=filters_config.min_usd,
+            usd_prices=filters_config.usd_prices
+        )
+    
+    @contextmanager
+    def _message_dispatcher(self, name: str, handler: Optional[Callable] = None) -> Iterator[Callable]:
+        """
+        Yield the callable the consume loop hands each message to.
+        
+        Client-side filters run first, so rejected messages are never
+        queued or formatted. With the pipeline enabled, accepted messages are
+        enqueued into a bounded queue drained by a worker thread, so handlers
+        never block the gRPC reader.
+        """
+        handler = handler or self.message_handler
+        if self.metrics is not None:
+            handler = self.metrics.timed(name, handler)
+        if self.stage_profiler is not None:
+            handler = self.stage_profiler.timed(name, "handler", handler)
+        message_filter = self._message_filter(name)
+        
+        def filtered(target: Callable) -> Callable:
+            if self.stage_profiler is not None and message_filter:
+                return self.stage_profiler.filtered(name, message_filter.accept, target)
+            return message_filter.wrap(target)
+        
+        pipeline_config = self.config.pipeline
+        try:
+            if not pipeline_config.enabled:
+                yield filtered(handler)
+                return
+            
+            with MessagePipeline(
+                handler,
+                capacity=pipeline_config.capacity,
+                overflow=pipeline_config.overflow,
+                spill_dir=pipeline_config.spill_dir,
+                stats_interval=pipeline_config.stats_interval,
+                name=name
+            ) as pipeline:
+                self.pipelines[name] = pipeline
+                yield filtered(pipeline.put)
+        finally:
+            if message_filter:
+                logger.info(
+                    f"Client filters on {name}: {message_filter.accepted} accepted, "
+                    f"{message_filter.rejected} rejected"
+                )
+    
+    @contextmanager
+    def _dex_trades_handler(self) -> Iterator[Callable]:
+        """
+        Yield the DEX trades handler.
+        
+        Enabled stages (Parquet sink, candle aggregation) each receive every
+        trade; with none enabled trades go to the default message handler.
+        """
+        parquet_config = self.config.parquet
+        candles_config = self.config.candles
+        with ExitStack() as stack:
+            stages = []
+            if parquet_config.enabled:
+                sink = stack.enter_context(DexTradeParquetSink(
+                    parquet_config.directory,
+                    batch_rows=parquet_config.batch_rows,
+                    batch_interval=parquet_config.batch_interval,
+                    file_rows=parquet_config.file_rows,
+                    rotate_interval=parquet_config.rotate_interval,
+                    compression=parquet_config.compression
+                ))
+                logger.info(f"Writing DEX trades to Parquet files in {parquet_config.directory}")
+                stages.append(sink.write)
+            if candles_config.enabled:
+                aggregator = stack.enter_context(CandleAggregator(
+                    on_candle=functools.partial(write_candle, out=self.output),
+                    intervals=candles_config.intervals,
+                    history=candles_config.history,
+                    max_markets=candles_config.max_markets,
+                    by_mint_pair=candles_config.by_mint_pair
+                ))
+                logger.info(f"Aggregating DEX trades into {candles_config.intervals}s candles")
+                stages.append(aggregator.add_trade)
+            
+            if not stages:
+                yield self.message_handler
+            elif len(stages) == 1:
+                yield stages[0]
+            else:
+                def handle_all(msg) -> None:
+                    for stage in stages:
+                        stage(msg)
+                yield handle_all
+    
+    @contextmanager
+    def _dex_orders_handler(self) -> Iterator[Callable]:
+        """Yield the DEX orders handler: the order book engine if enabled, else the default."""
+        book_config = self.config.order_book
+        if not book_config.enabled:
+            yield self.message_handler
+            return
+        
+        engine = self.order_books = OrderBookEngine()
+        interval = book_config.snapshot_interval
+        next_snapshot = time.monotonic() + interval
+        logger.info("Maintaining DEX order books")
+        
+        def handle(msg) -> None:
+            nonlocal next_snapshot
+            engine.apply(msg)
+            if interval > 0 and time.monotonic() >= next_snapshot:
+                next_snapshot = time.monotonic() + interval
+                write_snapshots(engine.changed_snapshots(book_config.depth), out=self.output)
+        
+        try:
+            yield handle
+        finally:
+            if interval > 0:
+                write_snapshots(engine.changed_snapshots(book_config.depth), out=self.output)
+            logger.info(
+                f"Order books: {len(engine.books)} markets after {engine.events} events "
+                f"({engine.unknown_cancels} cancels of unknown orders)"
+            )
+    
+    @contextmanager
+    def _dex_pools_handler(self) -> Iterator[Callable]:
+        """Yield the DEX pools handler: the pool state store if enabled, else the default."""
+        pool_config = self.config.pool_state
+        if not pool_config.enabled:
+            yield self.message_handler
+            return
+        
+        with PoolStateStore(
+            snapshot_path=pool_config.snapshot_path,
+            snapshot_interval=pool_config.snapshot_interval
+        ) as store:
+            self.pool_states = store
+            logger.info(f"Maintaining pool reserves ({len(store)} pools loaded)")
+            yield store.update
+    
+    @contextmanager
+    def _balances_handler(self) -> Iterator[Callable]:
+        """Yield the balances handler: the balance ledger if enabled, else the default."""
+        ledger_config = self.config.ledger
+        if not ledger_config.enabled:
+            yield self.message_handler
+            return
+        
+        ledger = self.ledger = BalanceLedger(
+            on_delta=functools.partial(write_delta, out=self.output),
+            owners=ledger_config.owners
+        )
+        logger.info(
+            f"Maintaining balance ledger for "
+            f"{len(ledger.owners) if ledger.owners is not None else 'all'} owners"
+        )
+        try:
+            yield ledger.update
+        finally:
+            logger.info(
+                f"Balance ledger: {len(ledger)} balances after {ledger.updates} updates "
+                f"({ledger.gaps} gaps, {ledger.stale} stale, {ledger.unresolved} unresolved)"
+            )
+    
+    def _reconnecting_stream(
+        self,
+        label: str,
+        open_stream: Callable[[], Iterator],
+        slot_of: Callable = None
+    ) -> Iterator:
+        """Wrap a stream so it is re-opened with backoff when it drops."""
+        return self._reconnector(label, slot_of).run(open_stream)
+    
+    def _sharded_stream(self, rpc_name: str, label: str, requests: list, metadata: List[tuple]) -> Iterator[bytes]:
+        """Run shard subscriptions concurrently and yield their raw messages merged by slot."""
+        sharding = self.config.sharding
+        # Extra channels get their own connection instead of sharing the main one
+        channels = [
+            self._open_channel(CHANNEL_OPTIONS + [('grpc.use_local_subchannel_pool', 1)])
+            for _ in range(sharding.channels - 1)
+        ]
+        stubs = [self.raw_client] + [RawCoreCastStub(channel) for channel in channels]
+        merger = SlotMerger(len(requests), max_delay=sharding.max_delay)
+        calls: List[Optional[grpc.Call]] = [None] * len(requests)
+        stopped = threading.Event()
+        
+        def run_shard(shard: int, req) -> None:
+            rpc = getattr(stubs[shard % len(stubs)], rpc_name)
+            
+            def open_stream():
+                call = calls[shard] = rpc(req, metadata=metadata)
+                if stopped.is_set():
+                    # Stopped during a reconnect backoff; the cancelled call ends the reconnect loop
+                    call.cancel()
+                return call
+            
+            error = None
+            try:
+                for data in self._reconnecting_stream(f"{label} shard {shard}", open_stream, slot_of=read_slot):
+                    merger.put(shard, read_slot(data), data)
+            except Exception as e:
+                error = e
+            finally:
+                merger.finish(shard, error)
+        
+        logger.info(f"Subscribing to {label} with {len(requests)} shards on {len(stubs)} channels")
+        threads = [
+            threading.Thread(target=run_shard, args=(shard, req), name=f"shard-{shard}", daemon=True)
+            for shard, req in enumerate(requests)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            yield from merger
+        finally:
+            stopped.set()
+            merger.close()
+            for call in calls:
+                if call is not None:
+                    call.cancel()
+            for channel in channels:
+                channel.close()
+            logger.info(
+                f"{label} shards: {merger.received} messages, {merger.duplicates} duplicates dropped, "
+                f"{merger.late} released late"
+            )
+    
+    def _run_stream(self, rpc_name: str, label: str, req, metadata: List[tuple], consume: Callable) -> None:
+        """Open an RPC (with reconnects), or replay it from a capture, and feed it to its consume loop."""
+        sharding = self.config.sharding
+        requests = [req]
+        if sharding.enabled and self.replay_source is None:
+            requests = shard_request(req, max_addresses=sharding.max_addresses, shards=sharding.shards)
+        
+        if self.replay_source is not None:
+            stream = self.replay_source.stream(rpc_name)
+        elif len(requests) > 1:
+            # Shard streams are merged as bytes, so duplicates are dropped before decoding
+            stream = self._sharded_stream(rpc_name, label, requests, metadata)
+        elif (self.recorder is not None or self.config.process_pool.enabled or self.config.raw.enabled
+              or self.metrics is not None or self.stage_profiler is not None):
+            # Receive the bytes undecoded so they can be recorded, measured, relayed or handed to workers
+            raw_rpc = getattr(self.raw_client, rpc_name)
+            stream = self._reconnecting_stream(
+                label, lambda: raw_rpc(req, metadata=metadata), slot_of=read_slot
+            )
+        else:
+            rpc = getattr(self.client, rpc_name)
+            consume(self._reconnecting_stream(label, lambda: rpc(req, metadata=metadata)))
+            return
+        
+        stream_type = RPC_STREAM_TYPES[rpc_name]
+        if self.metrics is not None:
+            stream = self.metrics.count(stream_type, stream)
+        if self.recorder is not None:
+            stream = self.recorder.tap(rpc_name, stream)
+        if self.config.raw.enabled:
+            self._consume_raw(rpc_name, stream)
+            return
+        if self.config.process_pool.enabled:
+            # Worker processes parse the messages
+            self._consume_in_process_pool(rpc_name, stream)
+            return
+        parse = RPC_TYPES[rpc_name][1].FromString
+        if self.stage_profiler is not None:
+            parse = self.stage_profiler.timed(stream_type, "decode", parse)
+        if self.metrics is not None:
+            consume(self.metrics.decode(stream_type, stream, parse))
+        else:
+            consume(map(parse, stream))
+    
     def stream_dex_trades(self):
         """Stream DEX trades."""
-        if not self.client:
+        if not self.client and self.replay_source is None:
             raise RuntimeError("Client not connected. Call connect() first.")
         
-        req = request_pb2.SubscribeTradesRequest(
-            program=self._addr_filter_from_slice(self.config.filters.programs),
-            pool=self._addr_filter_from_slice(self.config.filters.pools),
-            token=self._addr_filter_from_slice(self.config.filters.tokens),
-            trader=self._addr_filter_from_slice(self.config.filters.traders)
-        )
+        req = self._dex_trades_request(self.config.filters)
         
         logger.info(f"Subscribing to DEX trades: {req}")
         metadata = self._create_metadata()
         
         try:
-            stream = self.client.DexTrades(req, metadata=metadata)
-            self._consume_dex_trades(stream)
+            self._run_stream("DexTrades", "DEX trades", req, metadata, self._consume_dex_trades)
         except grpc.RpcError as e:
             logger.error(f"DEX trades subscription failed: {e}")
             raise
     
     def stream_dex_orders(self):
         """Stream DEX orders."""
-        if not self.client:
+        if not self.client and self.replay_source is None:
             raise RuntimeError("Client not connected. Call connect() first.")
         
-        req = request_pb2.SubscribeOrdersRequest(
-            program=self._addr_filter_from_slice(self.config.filters.programs),
-            pool=self._addr_filter_from_slice(self.config.filters.pools),
-            token=self._addr_filter_from_slice(self.config.filters.tokens),
-            trader=self._addr_filter_from_slice(self.config.filters.traders)
-        )
+        req = self._dex_orders_request(self.config.filters)
         
         logger.info(f"Subscribing to DEX orders: {req}")
         metadata = self._create_metadata()
         
         try:
-            stream = self.client.DexOrders(req, metadata=metadata)
-            self._consume_dex_orders(stream)
+            self._run_stream("DexOrders", "DEX orders", req, metadata, self._consume_dex_orders)
         except grpc.RpcError as e:
             logger.error(f"DEX orders subscription failed: {e}")
             raise
     
     def stream_dex_pools(self):
         """Stream DEX pool events."""
-        if not self.client:
+        if not self.client and self.replay_source is None:
             raise RuntimeError("Client not connected. Call connect() first.")
         
-        req = request_pb2.SubscribePoolsRequest(
-            program=self._addr_filter_from_slice(self.config.filters.programs),
-            pool=self._addr_filter_from_slice(self.config.filters.pools),
-            token=self._addr_filter_from_slice(self.config.filters.tokens)
-        )
+        req = self._dex_pools_request(self.config.filters)
         
         logger.info(f"Subscribing to DEX pools: {req}")
         metadata = self._create_metadata()
         
         try:
-            stream = self.client.DexPools(req, metadata=metadata)
-            self._consume_dex_pools(stream)
+            self._run_stream("DexPools", "DEX pools", req, metadata, self._consume_dex_pools)
         except grpc.RpcError as e:
             logger.error(f"DEX pools subscription failed: {e}")
             raise
     
     def stream_transactions(self):
         """Stream parsed transactions."""
-        if not self.client:
+        if not self.client and self.replay_source is None:
             raise RuntimeError("Client not connected. Call connect() first.")
         
-        req = request_pb2.SubscribeTransactionsRequest(
-            program=self._addr_filter_from_slice(self.config.filters.programs),
-            signer=self._addr_filter_from_slice(self.config.filters.signers)
-        )
+        req = self._transactions_request(self.config.filters)
         
         logger.info(f"Subscribing to transactions: {req}")
         metadata = self._create_metadata()
         
         try:
-            stream = self.client.Transactions(req, metadata=metadata)
-            self._consume_parsed_transactions(stream)
+            self._run_stream("Transactions", "Transactions", req, metadata, self._consume_parsed_transactions)
         except grpc.RpcError as e:
             logger.error(f"Transactions subscription failed: {e}")
             raise
     
     def stream_transfers(self):
         """Stream transfers."""
-        if not self.client:
+        if not self.client and self.replay_source is None:
             raise RuntimeError("Client not connected. Call connect() first.")
         
-        req = request_pb2.SubscribeTransfersRequest(
-            sender=self._addr_filter_from_slice(self.config.filters.senders),
-            receiver=self._addr_filter_from_slice(self.config.filters.receivers),
-            token=self._addr_filter_from_slice(self.config.filters.tokens)
-        )
+        req = self._transfers_request(self.config.filters)
         
         logger.info(f"Subscribing to transfers: {req}")
         metadata = self._create_metadata()
         
         try:
-            stream = self.client.Transfers(req, metadata=metadata)
-            self._consume_transfers_tx(stream)
+            self._run_stream("Transfers", "Transfers", req, metadata, self._consume_transfers_tx)
         except grpc.RpcError as e:
             logger.error(f"Transfers subscription failed: {e}")
             raise
     
     def stream_balances(self):
         """Stream balance updates."""
-        if not self.client:
+        if not self.client and self.replay_source is None:
             raise RuntimeError("Client not connected. Call connect() first.")
         
-        req = request_pb2.SubscribeBalanceUpdateRequest(
-            address=self._addr_filter_from_slice(self.config.filters.addresses),
-            token=self._addr_filter_from_slice(self.config.filters.tokens)
-        )
+        req = self._balances_request(self.config.filters)
         
         logger.info(f"Subscribing to balances: {req}")
         metadata = self._create_metadata()
         
         try:
-            stream = self.client.Balances(req, metadata=metadata)
-            self._consume_balances_tx(stream)
+            self._run_stream("Balances", "Balances", req, metadata, self._consume_balances_tx)
         except grpc.RpcError as e:
             logger.error(f"Balances subscription failed: {e}")
             raise
@@ -219,83 +684,142 @@ class CoreCastClient:
     def _consume_dex_trades(self, stream):
         """Consume DEX trades stream."""
         logger.info("Streaming DEX trades. Press Ctrl+C to stop.")
-        try:
-            for msg in stream:
-                try:
-                    # Extract trade information
-                    logger.debug(f"Received message: {msg}")
+        with self._dex_trades_handler() as handler, \
+                self._message_dispatcher("dex_trades", handler) as handle:
+            try:
+                for msg in stream:
+                    try:
+                        # Extract trade information
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(f"Received message: {msg}")
 
-                    print_protobuf_message(msg)                    
-                except Exception as e:
-                    logger.error(f"Error processing trade: {e}")
-                    logger.debug(f"Message data: {msg}")
-        except KeyboardInterrupt:
-            logger.info("Stream interrupted by user")
-            raise
-        except grpc.RpcError as e:
-            logger.debug(f"Stream ended: {e}")
+                        handle(msg)
+                    except Exception as e:
+                        logger.error(f"Error processing trade: {e}")
+                        logger.debug(f"Message data: {msg}")
+            except KeyboardInterrupt:
+                logger.info("Stream interrupted by user")
+                raise
     
     def _consume_dex_orders(self, stream):
         """Consume DEX orders stream."""
         logger.info("Streaming DEX orders. Press Ctrl+C to stop.")
-        try:
-            for msg in stream:
-                print_protobuf_message(msg)
-        except KeyboardInterrupt:
-            logger.info("Stream interrupted by user")
-            raise
-        except grpc.RpcError as e:
-            logger.debug(f"Stream ended: {e}")
+        with self._dex_orders_handler() as handler, \
+                self._message_dispatcher("dex_orders", handler) as handle:
+            try:
+                for msg in stream:
+                    handle(msg)
+            except KeyboardInterrupt:
+                logger.info("Stream interrupted by user")
+                raise
     
     def _consume_dex_pools(self, stream):
         """Consume DEX pool events stream."""
         logger.info("Streaming DEX pool events. Press Ctrl+C to stop.")
-        try:
-            for msg in stream:
-                evt = msg.pool_event
-                print_protobuf_message(msg)
-        except KeyboardInterrupt:
-            logger.info("Stream interrupted by user")
-            raise
-                           
-        except grpc.RpcError as e:
-            logger.debug(f"Stream ended: {e}")
+        with self._dex_pools_handler() as handler, \
+                self._message_dispatcher("dex_pools", handler) as handle:
+            try:
+                for msg in stream:
+                    handle(msg)
+            except KeyboardInterrupt:
+                logger.info("Stream interrupted by user")
+                raise
     
     def _consume_parsed_transactions(self, stream):
         """Consume parsed transactions stream."""
         logger.info("Streaming parsed transactions. Press Ctrl+C to stop.")
-        try:
-            for msg in stream:
-                print_protobuf_message(msg)
-        except KeyboardInterrupt:
-            logger.info("Stream interrupted by user")
-            raise
-        except grpc.RpcError as e:
-            logger.debug(f"Stream ended: {e}")
+        with self._message_dispatcher("transactions") as handle:
+            try:
+                for msg in stream:
+                    handle(msg)
+            except KeyboardInterrupt:
+                logger.info("Stream interrupted by user")
+                raise
     
     def _consume_transfers_tx(self, stream):
         """Consume transfers stream."""
         logger.info("Streaming transfers. Press Ctrl+C to stop.")
+        with self._message_dispatcher("transfers") as handle:
+            try:
+                for msg in stream:
+                    handle(msg)
+            except KeyboardInterrupt:
+                logger.info("Stream interrupted by user")
+                raise
+    
+    def _consume_balances_tx(self, stream):
+        """Consume balance updates stream."""
+        logger.info("Streaming balance updates. Press Ctrl+C to stop.")
+        with self._balances_handler() as handler, \
+                self._message_dispatcher("balances", handler) as handle:
+            try:
+                for msg in stream:
+                    handle(msg)
+            except KeyboardInterrupt:
+                logger.info("Stream interrupted by user")
+                raise
+
+    
+    def _consume_raw(self, rpc_name: str, stream: Iterator[Buffer]):
+        """Hand each serialized message to the raw handler without decoding it."""
+        raw_config = self.config.raw
+        if self.config.client_filters != ClientFiltersConfig():
+            logger.warning("client_filters are not applied in raw mode")
+        if self.config.process_pool.enabled:
+            logger.warning("process_pool is ignored in raw mode")
+        
+        output = None
+        handler = self.raw_handler
+        if handler is None:
+            output = DelimitedOutput(
+                raw_config.output,
+                buffer_size=raw_config.buffer_size,
+                flush_interval=raw_config.flush_interval
+            )
+            handler = output.write
+        stream_type = RPC_STREAM_TYPES[rpc_name]
+        if self.metrics is not None:
+            handler = self.metrics.timed(stream_type, handler)
+        if self.stage_profiler is not None:
+            handler = self.stage_profiler.timed(stream_type, "handler", handler)
+        
+        if output is None:
+            destination = "raw_handler"
+        else:
+            destination = "stdout" if raw_config.output == "-" else raw_config.output
+        logger.info(f"Relaying raw {rpc_name} messages to {destination}. Press Ctrl+C to stop.")
         try:
-            for msg in stream:
-                print_protobuf_message(msg)
+            for data in stream:
+                handler(data)
         except KeyboardInterrupt:
             logger.info("Stream interrupted by user")
             raise
-        except grpc.RpcError as e:
-            logger.debug(f"Stream ended: {e}")
+        finally:
+            if output is not None:
+                output.close()
+                logger.info(f"Relayed {output.messages} raw {rpc_name} messages")
     
-    def _consume_balances_tx(self, stream):
-        """Consume balance updates stream."""
-        logger.info("Streaming balance updates. Press Ctrl+C to stop.")
+    def _consume_in_process_pool(self, rpc_name: str, stream):
+        """Consume a raw byte stream by fanning it out to worker processes."""
+        pool_config = self.config.process_pool
+        logger.info(f"Streaming {rpc_name} through a process pool. Press Ctrl+C to stop.")
+        if self.config.client_filters != ClientFiltersConfig():
+            logger.warning("client_filters are not applied to raw messages sent to the process pool")
+        if self.profiler is not None:
+            logger.warning("Profile captures and stage times do not cover the pool's worker processes")
+        fanout = ProcessPoolFanout(
+            rpc_name,
+            handler=pool_config.handler,
+            workers=pool_config.workers,
+            batch_size=pool_config.batch_size,
+            max_batch_delay=pool_config.max_batch_delay,
+            on_result=functools.partial(write_result, out=self.output)
+        )
         try:
-            for msg in stream:
-                print_protobuf_message(msg)
+            fanout.run(stream)
         except KeyboardInterrupt:
             logger.info("Stream interrupted by user")
             raise
-        except grpc.RpcError as e:
-            logger.debug(f"Stream ended: {e}")
 
 
 @contextmanager
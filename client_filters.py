@@ -0,0 +1,167 @@
+"""
+Client-side filtering of decoded stream messages, compiled once from config.
+"""
+import logging
+import operator
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+from currencies import decimal_scale
+from encoding import b58decode
+
+
+logger = logging.getLogger(__name__)
+
+
+# Quote currencies priced at 1 USD unless usd_prices says otherwise
+STABLECOIN_MINTS = (
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",  # USDC
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB",  # USDT
+)
+
+# Stream type -> DEX event field carrying Dex and Instruction
+_DEX_EVENT_FIELDS = {
+    "dex_trades": "Trade",
+    "dex_orders": "Order",
+    "dex_pools": "PoolEvent",
+}
+
+
+def _address_set(addresses: Iterable[str]) -> FrozenSet[bytes]:
+    return frozenset(b58decode(address) for address in addresses)
+
+
+class MessageFilter:
+    """
+    Accept/reject predicate over one stream type's decoded messages.
+
+    Conditions are compiled once into a list of small checks, cheapest
+    first. Configured addresses are decoded to raw bytes up front, so the
+    checks compare the messages' bytes fields by hash-set membership and
+    never base58-encode anything. A message must pass every configured
+    condition:
+
+    - ``success``: ``Transaction.Status.Success`` equals this value
+    - ``protocol_families``: the DEX event's ``Dex.ProtocolFamily`` is listed
+    - ``signers``: ``Transaction.Header.Signer`` is listed
+    - ``methods``: some instruction's parsed ``Program.Method`` is listed
+    - ``accounts``: some ``Transaction.Header.Accounts`` address is listed
+    - ``min_usd``: the trade or transfer is worth at least this much,
+      valued by ``usd_prices`` (mint -> USD per whole token, with USDC and
+      USDT at 1). A trade takes the larger of its priced sides. Messages
+      with no priced currency are rejected.
+
+    Conditions that do not exist on the stream type raise ValueError.
+    """
+
+    def __init__(
+        self,
+        stream_type: str,
+        success: Optional[bool] = None,
+        protocol_families: Iterable[str] = (),
+        signers: Iterable[str] = (),
+        methods: Iterable[str] = (),
+        accounts: Iterable[str] = (),
+        min_usd: Optional[float] = None,
+        usd_prices: Optional[Dict[str, float]] = None
+    ):
+        self.stream_type = stream_type
+        self.accepted = 0
+        self.rejected = 0
+        checks: List[Callable] = []
+        event_field = _DEX_EVENT_FIELDS.get(stream_type)
+
+        if success is not None:
+            get_success = operator.attrgetter("Transaction.Status.Success")
+            checks.append(lambda msg: get_success(msg) == success)
+
+        families = frozenset(protocol_families)
+        if families:
+            if event_field is None:
+                raise ValueError(f"'protocol_families' does not apply to {stream_type} streams")
+            get_family = operator.attrgetter(f"{event_field}.Dex.ProtocolFamily")
+            checks.append(lambda msg: get_family(msg) in families)
+
+        signer_set = _address_set(signers)
+        if signer_set:
+            get_signer = operator.attrgetter("Transaction.Header.Signer")
+            checks.append(lambda msg: get_signer(msg) in signer_set)
+
+        method_set = frozenset(methods)
+        if method_set:
+            checks.append(self._method_check(stream_type, event_field, method_set))
+
+        account_set = _address_set(accounts)
+        if account_set:
+            get_accounts = operator.attrgetter("Transaction.Header.Accounts")
+            checks.append(
+                lambda msg: any(account.Address in account_set for account in get_accounts(msg))
+            )
+
+        if min_usd is not None:
+            checks.append(self._usd_check(stream_type, min_usd, usd_prices or {}))
+
+        self.checks = checks
+
+    @staticmethod
+    def _method_check(stream_type: str, event_field: Optional[str], methods: FrozenSet[str]) -> Callable:
+        if event_field is not None:
+            get_method = operator.attrgetter(f"{event_field}.Instruction.Program.Method")
+            return lambda msg: get_method(msg) in methods
+        if stream_type == "transactions":
+            get_instructions = operator.attrgetter("Transaction.ParsedIdlInstructions")
+            return lambda msg: any(
+                instruction.Program.Method in methods for instruction in get_instructions(msg)
+            )
+        raise ValueError(f"'methods' does not apply to {stream_type} streams")
+
+    @staticmethod
+    def _usd_check(stream_type: str, min_usd: float, usd_prices: Dict[str, float]) -> Callable:
+        prices = {b58decode(mint): 1.0 for mint in STABLECOIN_MINTS}
+        prices.update({b58decode(mint): float(price) for mint, price in usd_prices.items()})
+
+        def value(amount: int, currency) -> float:
+            price = prices.get(currency.MintAddress)
+            if price is None:
+                return -1.0
+            return amount * decimal_scale(currency.Decimals) * price
+
+        if stream_type == "dex_trades":
+            def check(msg) -> bool:
+                trade = msg.Trade
+                buy = trade.Buy
+                sell = trade.Sell
+                return max(value(buy.Amount, buy.Currency), value(sell.Amount, sell.Currency)) >= min_usd
+            return check
+        if stream_type == "transfers":
+            def check(msg) -> bool:
+                transfer = msg.Transfer
+                return value(transfer.Amount, transfer.Currency) >= min_usd
+            return check
+        raise ValueError(f"'min_usd' does not apply to {stream_type} streams")
+
+    def __bool__(self) -> bool:
+        """True if any condition is configured."""
+        return bool(self.checks)
+
+    def accept(self, msg) -> bool:
+        for check in self.checks:
+            if not check(msg):
+                self.rejected += 1
+                return False
+        self.accepted += 1
+        return True
+
+    def wrap(self, handler: Callable) -> Callable:
+        """A handler that passes only accepted messages on to handler."""
+        if not self.checks:
+            return handler
+        checks = self.checks
+
+        def handle(msg) -> None:
+            for check in checks:
+                if not check(msg):
+                    self.rejected += 1
+                    return
+            self.accepted += 1
+            handler(msg)
+        return handle
@@ -2,11 +2,22 @@
 Configuration management for the CoreCast client.
 """
 import yaml
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 from pathlib import Path
 
 
+# Stream types understood by the clients and the multi-stream runner
+STREAM_TYPES = (
+    "dex_trades",
+    "dex_orders",
+    "dex_pools",
+    "transactions",
+    "transfers",
+    "balances",
+)
+
+
 @dataclass
 class ServerConfig:
     """Server configuration."""
@@ -34,12 +45,508 @@ class FiltersConfig:
     signers: List[str]
 
 
+@dataclass
+class ReconnectConfig:
+    """Automatic reconnect settings applied to every stream."""
+    enabled: bool = True
+    initial_backoff: float = 0.5  # seconds
+    max_backoff: float = 30.0  # seconds
+    multiplier: float = 2.0
+    jitter: float = 0.2  # fraction of the delay randomly shaved off
+    max_attempts: int = 0  # consecutive failed attempts; 0 retries forever
+
+
+@dataclass
+class PipelineConfig:
+    """Bounded queue between the stream reader and the message handler."""
+    enabled: bool = False
+    capacity: int = 10000
+    overflow: str = "block"  # block | drop_oldest | spill
+    spill_dir: Optional[str] = None  # defaults to the system temp dir
+    stats_interval: float = 10.0  # seconds between stats log lines; 0 disables
+
+
+@dataclass
+class ProcessPoolConfig:
+    """Decode and handle raw messages in a pool of worker processes."""
+    enabled: bool = False
+    workers: int = 0  # 0 uses every CPU
+    batch_size: int = 64
+    max_batch_delay: float = 0.05  # seconds a partial batch may wait
+    handler: str = "format"  # runs in the workers; see handlers.resolve_handler
+
+
+@dataclass
+class OutputConfig:
+    """Block-buffered stdout settings for formatted messages."""
+    buffer_size: int = 256 * 1024  # characters buffered before a write
+    flush_interval: float = 0.5  # max seconds output may sit in the buffer
+
+
+@dataclass
+class RawConfig:
+    """Raw passthrough: relay serialized messages without decoding them."""
+    enabled: bool = False
+    output: str = "-"  # file or FIFO for length-delimited messages; "-" is stdout
+    buffer_size: int = 1024 * 1024  # bytes buffered before a write
+    flush_interval: float = 0.5  # max seconds output may sit in the buffer
+
+
+@dataclass
+class ParquetConfig:
+    """Columnar Parquet sink for the dex_trades stream (requires pyarrow)."""
+    enabled: bool = False
+    directory: str = "./data/dex_trades"
+    batch_rows: int = 10000  # rows per Arrow record batch
+    batch_interval: float = 5.0  # max seconds rows wait before a batch is written
+    file_rows: int = 1000000  # rows per Parquet file before rolling over
+    rotate_interval: float = 3600.0  # max seconds per Parquet file
+    compression: str = "zstd"
+
+
+@dataclass
+class CandlesConfig:
+    """OHLCV candle aggregation for the dex_trades stream."""
+    enabled: bool = False
+    intervals: List[int] = field(default_factory=lambda: [1, 60, 300, 3600])  # seconds
+    history: int = 16  # candles kept per market and interval
+    max_markets: int = 20000  # least recently traded markets are evicted beyond this
+    by_mint_pair: bool = False  # key candles by market and mint pair instead of market only
+
+
+@dataclass
+class OrderBookConfig:
+    """Live order books for the dex_orders stream."""
+    enabled: bool = False
+    depth: int = 10  # price levels per side in snapshots
+    snapshot_interval: float = 1.0  # seconds between snapshots of changed books; 0 disables
+
+
+@dataclass
+class PoolStateConfig:
+    """Latest-reserves store for the dex_pools stream."""
+    enabled: bool = False
+    snapshot_path: Optional[str] = None  # load on start and save periodically when set
+    snapshot_interval: float = 60.0  # seconds between snapshots; 0 saves only on exit
+
+
+@dataclass
+class LedgerConfig:
+    """Running balance ledger for the balances stream."""
+    enabled: bool = False
+    owners: List[str] = field(default_factory=list)  # wallets to track; empty tracks every owner
+
+
+@dataclass
+class CurrenciesConfig:
+    """Interned Currency metadata shared across messages."""
+    enabled: bool = False
+    max_entries: int = 10000  # least recently seen mints are evicted beyond this
+    path: Optional[str] = None  # warm-start file, loaded on start and saved on exit
+
+
+@dataclass
+class ShardingConfig:
+    """Split large address filters into several concurrent subscriptions."""
+    enabled: bool = False
+    max_addresses: int = 1000  # addresses per shard of the largest filter list
+    shards: int = 0  # fixed shard count; 0 derives it from max_addresses
+    channels: int = 1  # channels (connections) the shards are spread over
+    max_delay: float = 1.0  # seconds a message may wait for slower shards
+
+
+@dataclass
+class MetricsConfig:
+    """Prometheus metrics endpoint."""
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 9108
+    slot_duration: float = 0.4  # seconds per slot, for the chain head estimate
+    reference_slot: int = 0  # known slot at reference_time; 0 uses the first slot received
+    reference_time: float = 0.0  # Unix seconds
+
+
+@dataclass
+class RelayConfig:
+    """Local CoreCast server that shares upstream subscriptions among local subscribers."""
+    enabled: bool = False
+    listen: str = "127.0.0.1:50051"  # address local subscribers connect to (plaintext)
+    capacity: int = 10000  # messages buffered per subscriber
+    slow_consumer: str = "drop_oldest"  # drop_oldest | disconnect, when a subscriber's buffer is full
+    max_subscribers: int = 64  # concurrent local streams; more are rejected
+    linger: float = 0.0  # seconds an upstream stays open after its last subscriber leaves
+
+
+@dataclass
+class ProfilingConfig:
+    """On-demand profile captures, and optional per-stage timing."""
+    enabled: bool = False
+    stage_timing: bool = False  # time the decode, filter and handler stages of every message
+    directory: str = "."  # where captures are written
+    window: float = 30.0  # seconds per capture
+    sample_interval: float = 0.005  # seconds between stack samples
+    cprofile_every: int = 0  # with stage_timing, run every Nth call of each stage under cProfile during a capture (0: off)
+    tracemalloc_frames: int = 0  # trace allocations with this many frames during a capture (0: off)
+    signal: str = "SIGUSR1"  # signal that starts or ends a capture ("" for none)
+
+
+@dataclass
+class ClientFiltersConfig:
+    """Filters applied to decoded messages on the client, after the server-side filters."""
+    success: Optional[bool] = None  # keep only successful (true) or failed (false) transactions
+    protocol_families: List[str] = field(default_factory=list)  # DEX streams
+    signers: List[str] = field(default_factory=list)
+    methods: List[str] = field(default_factory=list)  # parsed instruction method names
+    accounts: List[str] = field(default_factory=list)  # any transaction account
+    min_usd: Optional[float] = None  # dex_trades and transfers
+    usd_prices: Dict[str, float] = field(default_factory=dict)  # mint -> USD per whole token
+
+
+@dataclass
+class SubscriptionConfig:
+    """A named subscription run alongside others on one shared channel."""
+    name: str
+    type: str
+    filters: FiltersConfig
+    handler: str = "print"
+    merge: Optional[str] = None  # subscriptions sharing a merge group are deduplicated and merged
+
+
+@dataclass
+class MergeConfig:
+    """Merging of subscriptions that share a merge group."""
+    max_delay: float = 1.0  # seconds an event may wait for slower streams
+    window_slots: int = 64  # slots of event keys kept for deduplication
+    max_keys: int = 200000  # bound on event keys kept
+
+
 @dataclass
 class Config:
     """Main configuration class."""
     server: ServerConfig
     stream: StreamConfig
     filters: FiltersConfig
+    subscriptions: List[SubscriptionConfig] = field(default_factory=list)
+    merge: MergeConfig = field(default_factory=MergeConfig)
+    reconnect: ReconnectConfig = field(default_factory=ReconnectConfig)
+    pipeline: PipelineConfig = field(default_factory=PipelineConfig)
+    process_pool: ProcessPoolConfig = field(default_factory=ProcessPoolConfig)
+    output: OutputConfig = field(default_factory=OutputConfig)
+    raw: RawConfig = field(default_factory=RawConfig)
+    parquet: ParquetConfig = field(default_factory=ParquetConfig)
+    candles: CandlesConfig = field(default_factory=CandlesConfig)
+    order_book: OrderBookConfig = field(default_factory=OrderBookConfig)
+    pool_state: PoolStateConfig = field(default_factory=PoolStateConfig)
+    ledger: LedgerConfig = field(default_factory=LedgerConfig)
+    currencies: CurrenciesConfig = field(default_factory=CurrenciesConfig)
+    client_filters: ClientFiltersConfig = field(default_factory=ClientFiltersConfig)
+    sharding: ShardingConfig = field(default_factory=ShardingConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    profiling: ProfilingConfig = field(default_factory=ProfilingConfig)
+    relay: RelayConfig = field(default_factory=RelayConfig)
+
+
+def _load_filters(filters_data: Optional[dict]) -> FiltersConfig:
+    """Create a FiltersConfig from a 'filters' mapping (missing keys are empty)."""
+    filters_data = filters_data or {}
+    return FiltersConfig(
+        programs=filters_data.get('programs', []),
+        pools=filters_data.get('pools', []),
+        tokens=filters_data.get('tokens', []),
+        traders=filters_data.get('traders', []),
+        senders=filters_data.get('senders', []),
+        receivers=filters_data.get('receivers', []),
+        addresses=filters_data.get('addresses', []),
+        signers=filters_data.get('signers', [])
+    )
+
+
+def _load_reconnect(reconnect_data: Optional[dict]) -> ReconnectConfig:
+    """Create a ReconnectConfig from an optional 'reconnect' mapping."""
+    defaults = ReconnectConfig()
+    reconnect_data = reconnect_data or {}
+    reconnect_config = ReconnectConfig(
+        enabled=reconnect_data.get('enabled', defaults.enabled),
+        initial_backoff=float(reconnect_data.get('initial_backoff', defaults.initial_backoff)),
+        max_backoff=float(reconnect_data.get('max_backoff', defaults.max_backoff)),
+        multiplier=float(reconnect_data.get('multiplier', defaults.multiplier)),
+        jitter=float(reconnect_data.get('jitter', defaults.jitter)),
+        max_attempts=int(reconnect_data.get('max_attempts', defaults.max_attempts))
+    )
+    if not 0.0 <= reconnect_config.jitter <= 1.0:
+        raise ValueError("'reconnect.jitter' must be between 0 and 1")
+    return reconnect_config
+
+
+def _load_pipeline(pipeline_data: Optional[dict]) -> PipelineConfig:
+    """Create a PipelineConfig from an optional 'pipeline' mapping."""
+    defaults = PipelineConfig()
+    pipeline_data = pipeline_data or {}
+    pipeline_config = PipelineConfig(
+        enabled=pipeline_data.get('enabled', defaults.enabled),
+        capacity=int(pipeline_data.get('capacity', defaults.capacity)),
+        overflow=pipeline_data.get('overflow', defaults.overflow),
+        spill_dir=pipeline_data.get('spill_dir', defaults.spill_dir),
+        stats_interval=float(pipeline_data.get('stats_interval', defaults.stats_interval))
+    )
+    if pipeline_config.capacity <= 0:
+        raise ValueError("'pipeline.capacity' must be positive")
+    if pipeline_config.overflow not in ("block", "drop_oldest", "spill"):
+        raise ValueError(
+            f"Unknown pipeline overflow policy: {pipeline_config.overflow}. "
+            f"Supported policies: block|drop_oldest|spill"
+        )
+    return pipeline_config
+
+
+def _load_process_pool(pool_data: Optional[dict]) -> ProcessPoolConfig:
+    """Create a ProcessPoolConfig from an optional 'process_pool' mapping."""
+    defaults = ProcessPoolConfig()
+    pool_data = pool_data or {}
+    pool_config = ProcessPoolConfig(
+        enabled=pool_data.get('enabled', defaults.enabled),
+        workers=int(pool_data.get('workers', defaults.workers)),
+        batch_size=int(pool_data.get('batch_size', defaults.batch_size)),
+        max_batch_delay=float(pool_data.get('max_batch_delay', defaults.max_batch_delay)),
+        handler=pool_data.get('handler', defaults.handler)
+    )
+    if pool_config.workers < 0 or pool_config.batch_size <= 0:
+        raise ValueError("'process_pool.workers' must be >= 0 and 'process_pool.batch_size' positive")
+    return pool_config
+
+
+def _load_output(output_data: Optional[dict]) -> OutputConfig:
+    """Create an OutputConfig from an optional 'output' mapping."""
+    defaults = OutputConfig()
+    output_data = output_data or {}
+    return OutputConfig(
+        buffer_size=int(output_data.get('buffer_size', defaults.buffer_size)),
+        flush_interval=float(output_data.get('flush_interval', defaults.flush_interval))
+    )
+
+
+def _load_raw(raw_data: Optional[dict]) -> RawConfig:
+    """Create a RawConfig from an optional 'raw' mapping."""
+    defaults = RawConfig()
+    raw_data = raw_data or {}
+    return RawConfig(
+        enabled=raw_data.get('enabled', defaults.enabled),
+        output=raw_data.get('output', defaults.output),
+        buffer_size=int(raw_data.get('buffer_size', defaults.buffer_size)),
+        flush_interval=float(raw_data.get('flush_interval', defaults.flush_interval))
+    )
+
+
+def _load_parquet(parquet_data: Optional[dict]) -> ParquetConfig:
+    """Create a ParquetConfig from an optional 'parquet' mapping."""
+    defaults = ParquetConfig()
+    parquet_data = parquet_data or {}
+    return ParquetConfig(
+        enabled=parquet_data.get('enabled', defaults.enabled),
+        directory=parquet_data.get('directory', defaults.directory),
+        batch_rows=int(parquet_data.get('batch_rows', defaults.batch_rows)),
+        batch_interval=float(parquet_data.get('batch_interval', defaults.batch_interval)),
+        file_rows=int(parquet_data.get('file_rows', defaults.file_rows)),
+        rotate_interval=float(parquet_data.get('rotate_interval', defaults.rotate_interval)),
+        compression=parquet_data.get('compression', defaults.compression)
+    )
+
+
+def _load_candles(candles_data: Optional[dict]) -> CandlesConfig:
+    """Create a CandlesConfig from an optional 'candles' mapping."""
+    defaults = CandlesConfig()
+    candles_data = candles_data or {}
+    intervals = [int(i) for i in candles_data.get('intervals', defaults.intervals)]
+    if not intervals or min(intervals) <= 0:
+        raise ValueError("'candles.intervals' must be a non-empty list of positive seconds")
+    return CandlesConfig(
+        enabled=candles_data.get('enabled', defaults.enabled),
+        intervals=intervals,
+        history=int(candles_data.get('history', defaults.history)),
+        max_markets=int(candles_data.get('max_markets', defaults.max_markets)),
+        by_mint_pair=candles_data.get('by_mint_pair', defaults.by_mint_pair)
+    )
+
+
+def _load_order_book(order_book_data: Optional[dict]) -> OrderBookConfig:
+    """Create an OrderBookConfig from an optional 'order_book' mapping."""
+    defaults = OrderBookConfig()
+    order_book_data = order_book_data or {}
+    return OrderBookConfig(
+        enabled=order_book_data.get('enabled', defaults.enabled),
+        depth=int(order_book_data.get('depth', defaults.depth)),
+        snapshot_interval=float(order_book_data.get('snapshot_interval', defaults.snapshot_interval))
+    )
+
+
+def _load_pool_state(pool_state_data: Optional[dict]) -> PoolStateConfig:
+    """Create a PoolStateConfig from an optional 'pool_state' mapping."""
+    defaults = PoolStateConfig()
+    pool_state_data = pool_state_data or {}
+    return PoolStateConfig(
+        enabled=pool_state_data.get('enabled', defaults.enabled),
+        snapshot_path=pool_state_data.get('snapshot_path', defaults.snapshot_path),
+        snapshot_interval=float(pool_state_data.get('snapshot_interval', defaults.snapshot_interval))
+    )
+
+
+def _load_ledger(ledger_data: Optional[dict]) -> LedgerConfig:
+    """Create a LedgerConfig from an optional 'ledger' mapping."""
+    defaults = LedgerConfig()
+    ledger_data = ledger_data or {}
+    return LedgerConfig(
+        enabled=ledger_data.get('enabled', defaults.enabled),
+        owners=list(ledger_data.get('owners') or defaults.owners)
+    )
+
+
+def _load_currencies(currencies_data: Optional[dict]) -> CurrenciesConfig:
+    """Create a CurrenciesConfig from an optional 'currencies' mapping."""
+    defaults = CurrenciesConfig()
+    currencies_data = currencies_data or {}
+    return CurrenciesConfig(
+        enabled=currencies_data.get('enabled', defaults.enabled),
+        max_entries=int(currencies_data.get('max_entries', defaults.max_entries)),
+        path=currencies_data.get('path', defaults.path)
+    )
+
+
+def _load_sharding(sharding_data: Optional[dict]) -> ShardingConfig:
+    """Create a ShardingConfig from an optional 'sharding' mapping."""
+    defaults = ShardingConfig()
+    sharding_data = sharding_data or {}
+    config = ShardingConfig(
+        enabled=sharding_data.get('enabled', defaults.enabled),
+        max_addresses=int(sharding_data.get('max_addresses', defaults.max_addresses)),
+        shards=int(sharding_data.get('shards', defaults.shards)),
+        channels=int(sharding_data.get('channels', defaults.channels)),
+        max_delay=float(sharding_data.get('max_delay', defaults.max_delay))
+    )
+    if config.max_addresses <= 0 or config.shards < 0 or config.channels <= 0:
+        raise ValueError("'sharding.max_addresses' and 'sharding.channels' must be positive and 'sharding.shards' >= 0")
+    return config
+
+
+def _load_metrics(metrics_data: Optional[dict]) -> MetricsConfig:
+    """Create a MetricsConfig from an optional 'metrics' mapping."""
+    defaults = MetricsConfig()
+    metrics_data = metrics_data or {}
+    return MetricsConfig(
+        enabled=metrics_data.get('enabled', defaults.enabled),
+        host=metrics_data.get('host', defaults.host),
+        port=int(metrics_data.get('port', defaults.port)),
+        slot_duration=float(metrics_data.get('slot_duration', defaults.slot_duration)),
+        reference_slot=int(metrics_data.get('reference_slot', defaults.reference_slot)),
+        reference_time=float(metrics_data.get('reference_time', defaults.reference_time))
+    )
+
+
+def _load_relay(relay_data: Optional[dict]) -> RelayConfig:
+    """Create a RelayConfig from an optional 'relay' mapping."""
+    defaults = RelayConfig()
+    relay_data = relay_data or {}
+    config = RelayConfig(
+        enabled=relay_data.get('enabled', defaults.enabled),
+        listen=relay_data.get('listen', defaults.listen),
+        capacity=int(relay_data.get('capacity', defaults.capacity)),
+        slow_consumer=relay_data.get('slow_consumer', defaults.slow_consumer),
+        max_subscribers=int(relay_data.get('max_subscribers', defaults.max_subscribers)),
+        linger=float(relay_data.get('linger', defaults.linger))
+    )
+    if config.capacity <= 0 or config.max_subscribers <= 0:
+        raise ValueError("'relay.capacity' and 'relay.max_subscribers' must be positive")
+    if config.slow_consumer not in ("drop_oldest", "disconnect"):
+        raise ValueError(
+            f"Unknown relay slow_consumer policy: {config.slow_consumer}. "
+            f"Supported policies: drop_oldest|disconnect"
+        )
+    return config
+
+
+def _load_profiling(profiling_data: Optional[dict]) -> ProfilingConfig:
+    """Create a ProfilingConfig from an optional 'profiling' mapping."""
+    defaults = ProfilingConfig()
+    profiling_data = profiling_data or {}
+    config = ProfilingConfig(
+        enabled=profiling_data.get('enabled', defaults.enabled),
+        stage_timing=profiling_data.get('stage_timing', defaults.stage_timing),
+        directory=profiling_data.get('directory', defaults.directory),
+        window=float(profiling_data.get('window', defaults.window)),
+        sample_interval=float(profiling_data.get('sample_interval', defaults.sample_interval)),
+        cprofile_every=int(profiling_data.get('cprofile_every', defaults.cprofile_every)),
+        tracemalloc_frames=int(profiling_data.get('tracemalloc_frames', defaults.tracemalloc_frames)),
+        signal=profiling_data.get('signal', defaults.signal) or ""
+    )
+    if config.window <= 0 or config.sample_interval <= 0:
+        raise ValueError("'profiling.window' and 'profiling.sample_interval' must be positive")
+    return config
+
+
+def _load_client_filters(client_filters_data: Optional[dict]) -> ClientFiltersConfig:
+    """Create a ClientFiltersConfig from an optional 'client_filters' mapping."""
+    client_filters_data = client_filters_data or {}
+    min_usd = client_filters_data.get('min_usd')
+    return ClientFiltersConfig(
+        success=client_filters_data.get('success'),
+        protocol_families=client_filters_data.get('protocol_families', []),
+        signers=client_filters_data.get('signers', []),
+        methods=client_filters_data.get('methods', []),
+        accounts=client_filters_data.get('accounts', []),
+        min_usd=float(min_usd) if min_usd is not None else None,
+        usd_prices={mint: float(price) for mint, price in (client_filters_data.get('usd_prices') or {}).items()}
+    )
+
+
+def _load_subscriptions(subscriptions_data: list) -> List[SubscriptionConfig]:
+    """Create SubscriptionConfig entries from a 'subscriptions' list."""
+    if not isinstance(subscriptions_data, list) or not subscriptions_data:
+        raise ValueError("'subscriptions' must be a non-empty list")
+    
+    subscriptions = []
+    seen_names = set()
+    for idx, sub_data in enumerate(subscriptions_data):
+        name = sub_data.get('name') or f"{sub_data.get('type', 'subscription')}_{idx}"
+        if name in seen_names:
+            raise ValueError(f"Duplicate subscription name: {name}")
+        seen_names.add(name)
+        
+        stream_type = sub_data.get('type', '')
+        if stream_type not in STREAM_TYPES:
+            raise ValueError(
+                f"Unknown stream type for subscription '{name}': {stream_type}. "
+                f"Supported types: {'|'.join(STREAM_TYPES)}"
+            )
+        
+        subscriptions.append(SubscriptionConfig(
+            name=name,
+            type=stream_type,
+            filters=_load_filters(sub_data.get('filters')),
+            handler=sub_data.get('handler', 'print'),
+            merge=sub_data.get('merge')
+        ))
+    
+    groups = {}
+    for sub in subscriptions:
+        if sub.merge is None:
+            continue
+        first = groups.setdefault(sub.merge, sub)
+        if (sub.type, sub.handler) != (first.type, first.handler):
+            raise ValueError(
+                f"Subscriptions in merge group '{sub.merge}' must share type and handler: "
+                f"'{first.name}' and '{sub.name}' differ"
+            )
+    return subscriptions
+
+
+def _load_merge(merge_data: Optional[dict]) -> MergeConfig:
+    """Create a MergeConfig from an optional 'merge' mapping."""
+    defaults = MergeConfig()
+    merge_data = merge_data or {}
+    return MergeConfig(
+        max_delay=float(merge_data.get('max_delay', defaults.max_delay)),
+        window_slots=int(merge_data.get('window_slots', defaults.window_slots)),
+        max_keys=int(merge_data.get('max_keys', defaults.max_keys))
+    )
 
 
 def load_config(config_path: str) -> Config:
@@ -64,12 +571,16 @@ def load_config(config_path: str) -> Config:
     with open(config_file, 'r') as f:
         data = yaml.safe_load(f)
     
-    # Validate required sections
+    # Validate required sections ('stream'/'filters' are optional when
+    # the config lists several 'subscriptions' instead, or runs a relay
+    # whose subscribers send their own requests)
     if 'server' not in data:
         raise ValueError("Missing 'server' section in config")
-    if 'stream' not in data:
+    multi_stream = 'subscriptions' in data
+    relay = bool((data.get('relay') or {}).get('enabled'))
+    if 'stream' not in data and not multi_stream and not relay:
         raise ValueError("Missing 'stream' section in config")
-    if 'filters' not in data:
+    if 'filters' not in data and not multi_stream and not relay:
         raise ValueError("Missing 'filters' section in config")
     
     # Create server config
@@ -81,26 +592,37 @@ def load_config(config_path: str) -> Config:
     )
     
     # Create stream config
-    stream_data = data['stream']
+    stream_data = data.get('stream') or {}
     stream_config = StreamConfig(
         type=stream_data.get('type', '')
     )
     
     # Create filters config
-    filters_data = data['filters']
-    filters_config = FiltersConfig(
-        programs=filters_data.get('programs', []),
-        pools=filters_data.get('pools', []),
-        tokens=filters_data.get('tokens', []),
-        traders=filters_data.get('traders', []),
-        senders=filters_data.get('senders', []),
-        receivers=filters_data.get('receivers', []),
-        addresses=filters_data.get('addresses', []),
-        signers=filters_data.get('signers', [])
-    )
+    filters_config = _load_filters(data.get('filters'))
+    
+    # Create named subscriptions for the multi-stream runner
+    subscriptions = _load_subscriptions(data['subscriptions']) if multi_stream else []
     
     return Config(
         server=server_config,
         stream=stream_config,
-        filters=filters_config
+        filters=filters_config,
+        subscriptions=subscriptions,
+        merge=_load_merge(data.get('merge')),
+        reconnect=_load_reconnect(data.get('reconnect')),
+        pipeline=_load_pipeline(data.get('pipeline')),
+        process_pool=_load_process_pool(data.get('process_pool')),
+        output=_load_output(data.get('output')),
+        raw=_load_raw(data.get('raw')),
+        parquet=_load_parquet(data.get('parquet')),
+        candles=_load_candles(data.get('candles')),
+        order_book=_load_order_book(data.get('order_book')),
+        pool_state=_load_pool_state(data.get('pool_state')),
+        ledger=_load_ledger(data.get('ledger')),
+        currencies=_load_currencies(data.get('currencies')),
+        client_filters=_load_client_filters(data.get('client_filters')),
+        sharding=_load_sharding(data.get('sharding')),
+        metrics=_load_metrics(data.get('metrics')),
+        profiling=_load_profiling(data.get('profiling')),
+        relay=_load_relay(data.get('relay'))
     )
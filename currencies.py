@@ -0,0 +1,216 @@
+"""
+Interned Currency metadata shared across messages.
+"""
+import collections
+import logging
+import os
+import struct
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+from encoding import b58decode, b58encode
+from protobuf_utils import MessageRenderers, format_protobuf_message, message_to_dict
+from solana.token_block_message_pb2 import Currency
+
+
+logger = logging.getLogger(__name__)
+
+
+_FILE_MAGIC = b"CCCURR01"
+# Length prefix of each serialized Currency in the warm-start file
+_RECORD_LENGTH = struct.Struct("<I")
+
+# 10 ** -decimals for the decimals real mints use
+_SCALE = [10.0 ** -d for d in range(64)]
+
+
+def decimal_scale(decimals: int) -> float:
+    """10 ** -decimals: the factor from a raw token amount to whole tokens."""
+    if decimals < len(_SCALE):
+        return _SCALE[decimals]
+    return 10.0 ** -decimals
+
+
+class CurrencyInfo(NamedTuple):
+    """Immutable summary of one Currency record, shared by every message of the mint."""
+    mint: bytes
+    address: str  # base58 mint address
+    name: str
+    symbol: str
+    decimals: int
+    uri: str
+    native: bool
+    wrapped: bool
+    fungible: bool
+    token_standard: Optional[str]
+    data: bytes  # the serialized Currency message
+
+    @property
+    def message(self) -> Currency:
+        """A fresh Currency message decoded from ``data``."""
+        return Currency.FromString(self.data)
+
+
+def _fingerprint(currency: Currency) -> tuple:
+    """The metadata compared to tell a changed record from a repeat."""
+    return currency.Name, currency.Symbol, currency.Uri, currency.UpdateAuthority, currency.Decimals
+
+
+def _copy(value):
+    """A copy of a message_to_dict value; only immutable leaves are shared."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+class _Entry:
+    __slots__ = ("info", "fingerprint", "text", "dicts")
+
+    def __init__(self, info: CurrencyInfo, fingerprint: tuple):
+        self.info = info
+        self.fingerprint = fingerprint
+        # encoding -> rendered lines / dict, built on first use
+        self.text: Dict[str, Tuple[str, ...]] = {}
+        self.dicts: Dict[str, dict] = {}
+
+
+def _info(currency: Currency, data: bytes) -> CurrencyInfo:
+    return CurrencyInfo(
+        mint=currency.MintAddress,
+        address=b58encode(currency.MintAddress),
+        name=currency.Name,
+        symbol=currency.Symbol,
+        decimals=currency.Decimals,
+        uri=currency.Uri,
+        native=currency.Native,
+        wrapped=currency.Wrapped,
+        fungible=currency.Fungible,
+        token_standard=currency.TokenStandard if currency.HasField("TokenStandard") else None,
+        data=data,
+    )
+
+
+class CurrencyRegistry:
+    """
+    LRU registry of Currency records keyed by ``MintAddress``.
+
+    Every trade side, transfer and balance update repeats the full Currency
+    record of its mint. intern() returns one shared CurrencyInfo per mint
+    instead. The incoming record's name, symbol, URI, update authority and
+    decimals are compared with the stored entry, so changed metadata
+    replaces the entry; repeats cost a dict lookup and a tuple comparison.
+    Records are only serialized when they are new or changed.
+
+    The registry also caches each mint's rendered text and dict form.
+    Passing ``renderers`` to print_protobuf_message, format_protobuf_message
+    or message_to_dict renders Currency fields through it, so output reuses
+    those renderings instead of formatting the same metadata again.
+
+    At most ``max_entries`` mints are kept; the least recently seen is
+    evicted. With ``path`` set, the registry is loaded from that file on
+    start and written back atomically on close(), so a restart begins
+    with warm entries for the popular mints.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: "collections.OrderedDict[bytes, _Entry]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.renderers = MessageRenderers({Currency.DESCRIPTOR.full_name: self})
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _entry(self, currency: Currency) -> _Entry:
+        mint = currency.MintAddress
+        fingerprint = _fingerprint(currency)
+        with self._lock:
+            entry = self._entries.get(mint)
+            if entry is not None and entry.fingerprint == fingerprint:
+                self._entries.move_to_end(mint)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            entry = _Entry(_info(currency, currency.SerializeToString()), fingerprint)
+            self._entries[mint] = entry
+            self._entries.move_to_end(mint)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+            return entry
+
+    def intern(self, currency: Currency) -> CurrencyInfo:
+        """The shared CurrencyInfo for a Currency message."""
+        return self._entry(currency).info
+
+    def get(self, mint: Union[bytes, str]) -> Optional[CurrencyInfo]:
+        """The last seen CurrencyInfo of a mint (raw bytes or base58)."""
+        if isinstance(mint, str):
+            mint = b58decode(mint)
+        entry = self._entries.get(mint)
+        return entry.info if entry is not None else None
+
+    def text_lines(self, currency: Currency, encoding: str = "base58") -> Tuple[str, ...]:
+        """print_protobuf_message lines of a Currency, without indentation."""
+        entry = self._entry(currency)
+        lines = entry.text.get(encoding)
+        if lines is None:
+            lines = entry.text[encoding] = tuple(format_protobuf_message(currency, encoding).splitlines())
+        return lines
+
+    def to_dict(self, currency: Currency, encoding: str = "base58") -> dict:
+        """message_to_dict of a Currency, copied from the cached dict."""
+        entry = self._entry(currency)
+        data = entry.dicts.get(encoding)
+        if data is None:
+            data = entry.dicts[encoding] = message_to_dict(currency, encoding)
+        return _copy(data)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the registry atomically (temp file + rename), least recent first."""
+        path = path or self.path
+        with self._lock:
+            records = [entry.info.data for entry in self._entries.values()]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_FILE_MAGIC)
+            f.write(b''.join(_RECORD_LENGTH.pack(len(data)) + data for data in records))
+        os.replace(tmp_path, path)
+        logger.debug(f"Saved {len(records)} currencies to {path}")
+
+    def load(self, path: Optional[str] = None) -> int:
+        """Load a warm-start file written by save(); returns the record count."""
+        path = path or self.path
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(_FILE_MAGIC)] != _FILE_MAGIC:
+            raise ValueError(f"{path} is not a currency registry file")
+        offset = len(_FILE_MAGIC)
+        count = 0
+        while offset + _RECORD_LENGTH.size <= len(data):
+            length, = _RECORD_LENGTH.unpack_from(data, offset)
+            offset += _RECORD_LENGTH.size
+            self._entry(Currency.FromString(data[offset:offset + length]))
+            offset += length
+            count += 1
+        self.hits = self.misses = 0
+        logger.info(f"Loaded {count} currencies from {path}")
+        return count
+
+    def close(self) -> None:
+        """Write the warm-start file, if configured."""
+        if self.path:
+            self.save()
+        logger.info(
+            f"Currency registry: {len(self)} mints, {self.hits} hits, "
+            f"{self.misses} misses, {self.evicted} evicted"
+        )
@@ -0,0 +1,107 @@
+"""
+Duplicate detection for events delivered by overlapping subscriptions.
+"""
+import heapq
+from typing import Callable, Dict, Hashable, List, Set
+
+
+def _trade_key(msg) -> tuple:
+    return msg.Transaction.Signature, msg.Trade.InstructionIndex, "trade"
+
+
+def _order_key(msg) -> tuple:
+    order = msg.Order
+    # One instruction can open, update or cancel several orders
+    return msg.Transaction.Signature, order.InstructionIndex, "order", order.Type, order.Order.OrderId
+
+
+def _pool_key(msg) -> tuple:
+    event = msg.PoolEvent
+    return msg.Transaction.Signature, event.InstructionIndex, "pool", event.Market.MarketAddress
+
+
+def _transaction_key(msg) -> tuple:
+    return msg.Transaction.Signature, 0, "transaction"
+
+
+def _transfer_key(msg) -> tuple:
+    return msg.Transaction.Signature, msg.Transfer.InstructionIndex, "transfer"
+
+
+def _balance_key(msg) -> tuple:
+    return msg.Transaction.Signature, msg.BalanceUpdate.BalanceUpdate.AccountIndex, "balance"
+
+
+# Stream message type -> event key function
+_EVENT_KEYS: Dict[str, Callable] = {
+    "solana_corecast.DexTradeStreamMessage": _trade_key,
+    "solana_corecast.DexOrderStreamMessage": _order_key,
+    "solana_corecast.PoolLiquidityChangeStreamMessage": _pool_key,
+    "solana_corecast.ParsedTransactionStreamMessage": _transaction_key,
+    "solana_corecast.TransferStreamMessage": _transfer_key,
+    "solana_corecast.BalanceUpdateStreamMessage": _balance_key,
+}
+
+
+def event_key(msg) -> tuple:
+    """
+    Identity of the event carried by a decoded stream message.
+
+    The key is (transaction signature, instruction index, event kind). Order
+    events add their type and order id, and pool events add the market. A
+    balance update uses its account index in place of an instruction.
+    """
+    return _EVENT_KEYS[msg.DESCRIPTOR.full_name](msg)
+
+
+class SlotWindowDedup:
+    """
+    Remembers recent event keys, bucketed by slot, to spot duplicates.
+
+    Copies of one event always carry the same slot, so a lookup checks a
+    single bucket. Buckets more than ``window_slots`` behind the newest
+    slot are dropped, and so are the oldest buckets once more than
+    ``max_keys`` keys are held. Memory therefore stays bounded. Keys
+    older than the window cannot be checked and count as new.
+    """
+
+    def __init__(self, window_slots: int = 64, max_keys: int = 200000):
+        self.window_slots = window_slots
+        self.max_keys = max_keys
+        self._buckets: Dict[int, Set[Hashable]] = {}
+        self._slots: List[int] = []  # min-heap of bucket slots
+        self._size = 0
+        self._newest = -1
+        self.duplicates = 0
+        self.expired = 0
+
+    def is_duplicate(self, key: Hashable, slot: int) -> bool:
+        """Record key at slot; True if it was already seen."""
+        bucket = self._buckets.get(slot)
+        if bucket is None:
+            if slot < self._newest - self.window_slots:
+                self.expired += 1
+                return False
+            bucket = self._buckets[slot] = set()
+            heapq.heappush(self._slots, slot)
+            if slot > self._newest:
+                self._newest = slot
+                self._evict(self._newest - self.window_slots)
+        elif key in bucket:
+            self.duplicates += 1
+            return True
+        bucket.add(key)
+        self._size += 1
+        if self._size > self.max_keys:
+            self._evict(self._slots[0] + 1)
+        return False
+
+    def _evict(self, before_slot: int) -> None:
+        """Drop every bucket older than before_slot."""
+        slots = self._slots
+        while slots and slots[0] < before_slot:
+            self._size -= len(self._buckets.pop(heapq.heappop(slots)))
+
+    def __len__(self) -> int:
+        """Number of keys held."""
+        return self._size
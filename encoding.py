@@ -0,0 +1,98 @@
+"""
+Fast, cached encoding of bytes fields (addresses, mints, signatures, hashes).
+"""
+import functools
+from typing import Iterable, List
+
+import base58
+
+
+B58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+# Size of the LRU cache for 32-byte keys (addresses, mints, program IDs)
+DEFAULT_KEY_CACHE_SIZE = 65536
+
+# Digits are produced five at a time: 58**5 < 2**30, so the inner divmods
+# stay on single-limb ints instead of the full big integer
+_CHUNK_DIGITS = 5
+_CHUNK = 58 ** _CHUNK_DIGITS
+_PAIR = 58 ** 2
+_PAIRS = [a + b for a in B58_ALPHABET for b in B58_ALPHABET]
+
+
+def _encode_chunk(value: int) -> str:
+    """Render 0 <= value < 58**5 as exactly five base58 digits."""
+    rest, d01 = divmod(value, _PAIR)
+    d4, d23 = divmod(rest, _PAIR)
+    return B58_ALPHABET[d4] + _PAIRS[d23] + _PAIRS[d01]
+
+
+def _b58encode(value: bytes) -> str:
+    """Uncached base58 encoder; same output as base58.b58encode(value).decode()."""
+    stripped = value.lstrip(b'\0')
+    leading_ones = '1' * (len(value) - len(stripped))
+    if not stripped:
+        return leading_ones
+
+    number = int.from_bytes(stripped, 'big')
+    chunks = []
+    while number:
+        number, chunk = divmod(number, _CHUNK)
+        chunks.append(_encode_chunk(chunk))
+    chunks.reverse()
+    return leading_ones + ''.join(chunks).lstrip('1')
+
+
+_b58encode_key = functools.lru_cache(maxsize=DEFAULT_KEY_CACHE_SIZE)(_b58encode)
+
+
+def b58encode(value: bytes) -> str:
+    """
+    Base58-encode a bytes value.
+
+    32-byte values (public keys: accounts, mints, programs) repeat heavily
+    across a stream and go through a bounded LRU cache. Other lengths, such
+    as 64-byte signatures that are almost always unique, skip the cache so
+    they don't evict the hot keys.
+    """
+    if len(value) == 32:
+        return _b58encode_key(value)
+    return _b58encode(value)
+
+
+def b58encode_many(values: Iterable[bytes]) -> List[str]:
+    """Base58-encode a batch of values (e.g. a transaction's account list)."""
+    encode_key = _b58encode_key
+    encode = _b58encode
+    return [encode_key(v) if len(v) == 32 else encode(v) for v in values]
+
+
+def encode_bytes(value: bytes, encoding: str = "base58") -> str:
+    """Encode a bytes field as base58 (default) or hex."""
+    if encoding == "base58":
+        return b58encode(value)
+    return value.hex()
+
+
+def encode_bytes_many(values: Iterable[bytes], encoding: str = "base58") -> List[str]:
+    """Encode a repeated bytes field as base58 (default) or hex."""
+    if encoding == "base58":
+        return b58encode_many(values)
+    return [v.hex() for v in values]
+
+
+def set_key_cache_size(maxsize: int) -> None:
+    """Resize (and clear) the 32-byte key cache."""
+    global _b58encode_key
+    _b58encode_key = functools.lru_cache(maxsize=maxsize)(_b58encode)
+
+
+def key_cache_info():
+    """Return hit/miss statistics of the 32-byte key cache."""
+    return _b58encode_key.cache_info()
+
+
+@functools.lru_cache(maxsize=DEFAULT_KEY_CACHE_SIZE)
+def b58decode(value: str) -> bytes:
+    """Decode a base58 string (cached; used for configured addresses)."""
+    return base58.b58decode(value)
@@ -0,0 +1,49 @@
+"""
+Message handler resolution for configurable subscriptions.
+"""
+import importlib
+from typing import Callable
+
+from protobuf_utils import format_protobuf_message, print_protobuf_message
+
+
+# Handlers that can be referenced by short name in YAML configs
+BUILTIN_HANDLERS = {
+    "print": print_protobuf_message,
+    "format": format_protobuf_message,
+}
+
+
+def resolve_handler(spec: str) -> Callable:
+    """
+    Resolve a handler specification to a callable.
+
+    Args:
+        spec: Either a built-in handler name (e.g. "print") or an import
+            path in the form "package.module:function"
+
+    Returns:
+        The handler callable. It receives one decoded stream message and
+        may be a plain function or a coroutine function.
+
+    Raises:
+        ValueError: If the specification is malformed or not callable
+        ImportError: If the handler module cannot be imported
+    """
+    if spec in BUILTIN_HANDLERS:
+        return BUILTIN_HANDLERS[spec]
+
+    module_name, sep, attr_path = spec.partition(':')
+    if not sep or not module_name or not attr_path:
+        raise ValueError(
+            f"Invalid handler '{spec}': expected one of "
+            f"{', '.join(BUILTIN_HANDLERS)} or 'module:function'"
+        )
+
+    target = importlib.import_module(module_name)
+    for attr in attr_path.split('.'):
+        target = getattr(target, attr)
+
+    if not callable(target):
+        raise ValueError(f"Handler '{spec}' is not callable")
+    return target
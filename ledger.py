@@ -0,0 +1,214 @@
+"""
+Running per-owner balances maintained from the Balances stream.
+"""
+import json
+import logging
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Set, Union
+
+from encoding import b58decode, b58encode
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BalanceDelta:
+    """One change of an owner's balance in a mint."""
+    owner: bytes
+    mint: bytes
+    account: bytes
+    slot: int
+    signature: bytes
+    pre_balance: int
+    post_balance: int
+    delta: int  # change of the owner's (owner, mint) total
+    decimals: int
+    # True if pre_balance did not match the last known post-balance, i.e.
+    # updates were missed or arrived out of order
+    gap: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "owner": b58encode(self.owner),
+            "mint": b58encode(self.mint),
+            "account": b58encode(self.account),
+            "slot": self.slot,
+            "signature": b58encode(self.signature),
+            "pre_balance": self.pre_balance,
+            "post_balance": self.post_balance,
+            "delta": self.delta,
+            "decimals": self.decimals,
+            "gap": self.gap,
+        }
+
+
+def write_delta(delta: BalanceDelta, out=None) -> None:
+    """Default delta sink: one JSON object per line to out (default stdout)."""
+    (out or sys.stdout).write(json.dumps(delta.to_dict()) + "\n")
+
+
+class _AccountBalance:
+    __slots__ = ("total_key", "balance", "slot")
+
+    def __init__(self, total_key: bytes, balance: int, slot: int):
+        self.total_key = total_key
+        self.balance = balance
+        self.slot = slot
+
+
+Address = Union[bytes, str]
+
+
+class BalanceLedger:
+    """
+    Current balance per (owner, mint) from BalanceUpdateStreamMessages.
+
+    Each update's ``AccountIndex`` is resolved against
+    ``Transaction.Header.Accounts``. For a token account, the owner and mint
+    come from its ``Token`` info. For a native (SOL) balance, the account
+    itself is the owner and the mint is the update's
+    ``Currency.MintAddress``.
+
+    Balances are tracked per account and summed per (owner, mint), since
+    an owner can hold several token accounts of one mint. Keys are the
+    concatenated raw addresses, which keeps both hash tables compact and
+    every lookup O(1).
+
+    An update whose ``PreBalance`` differs from the stored post-balance
+    means updates were missed or reordered. It is counted, logged and
+    flagged on the emitted delta. The stored balance is still moved to the
+    new ``PostBalance``. Updates from an older slot than the stored one
+    are dropped. Only real changes reach ``on_delta``.
+
+    With ``owners`` set, only those wallets are tracked.
+    """
+
+    def __init__(
+        self,
+        on_delta: Optional[Callable[[BalanceDelta], None]] = write_delta,
+        owners: Optional[Iterable[Address]] = None
+    ):
+        self.on_delta = on_delta
+        self.owners: Optional[Set[bytes]] = (
+            {self._address(owner) for owner in owners} if owners else None
+        )
+        # account + mint -> balance of that account
+        self._accounts: Dict[bytes, _AccountBalance] = {}
+        # owner + mint -> summed balance
+        self._totals: Dict[bytes, int] = {}
+        # owner -> mints held, for per-owner listings
+        self._owner_mints: Dict[bytes, Set[bytes]] = {}
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.gaps = 0
+        self.stale = 0
+        self.unresolved = 0
+
+    @staticmethod
+    def _address(address: Address) -> bytes:
+        return b58decode(address) if isinstance(address, str) else address
+
+    def update(self, msg) -> None:
+        """Apply one BalanceUpdateStreamMessage."""
+        currency_update = msg.BalanceUpdate
+        balance_update = currency_update.BalanceUpdate
+        accounts = msg.Transaction.Header.Accounts
+        index = balance_update.AccountIndex
+        if index >= len(accounts):
+            self.unresolved += 1
+            return
+        account = accounts[index]
+        if account.HasField("Token"):
+            owner = account.Token.Owner
+            mint = account.Token.Mint
+            decimals = account.Token.Decimals
+        else:
+            owner = account.Address
+            mint = currency_update.Currency.MintAddress
+            decimals = currency_update.Currency.Decimals
+        if self.owners is not None and owner not in self.owners:
+            return
+        self.apply(
+            owner, mint, account.Address, msg.Block.Slot,
+            balance_update.PreBalance, balance_update.PostBalance,
+            decimals=decimals, signature=msg.Transaction.Signature
+        )
+
+    def apply(
+        self,
+        owner: bytes,
+        mint: bytes,
+        account: bytes,
+        slot: int,
+        pre_balance: int,
+        post_balance: int,
+        decimals: int = 0,
+        signature: bytes = b""
+    ) -> Optional[BalanceDelta]:
+        """Apply one resolved balance change; returns the emitted delta, if any."""
+        account_key = account + mint
+        with self._lock:
+            self.updates += 1
+            entry = self._accounts.get(account_key)
+            gap = False
+            if entry is None:
+                total_key = owner + mint
+                entry = self._accounts[account_key] = _AccountBalance(total_key, pre_balance, slot)
+                self._totals[total_key] = self._totals.get(total_key, 0) + pre_balance
+                self._owner_mints.setdefault(owner, set()).add(mint)
+            elif slot < entry.slot:
+                self.stale += 1
+                return None
+            elif pre_balance != entry.balance:
+                gap = True
+                self.gaps += 1
+                logger.warning(
+                    f"Balance gap for {b58encode(account)} ({b58encode(mint)}) at slot {slot}: "
+                    f"pre-balance {pre_balance}, last known {entry.balance} at slot {entry.slot}"
+                )
+
+            delta = post_balance - entry.balance
+            entry.balance = post_balance
+            entry.slot = slot
+            if not delta:
+                return None
+            self._totals[entry.total_key] += delta
+
+        change = BalanceDelta(
+            owner=owner,
+            mint=mint,
+            account=account,
+            slot=slot,
+            signature=signature,
+            pre_balance=pre_balance,
+            post_balance=post_balance,
+            delta=delta,
+            decimals=decimals,
+            gap=gap,
+        )
+        if self.on_delta is not None:
+            try:
+                self.on_delta(change)
+            except Exception as e:
+                logger.error(f"Error in balance delta sink: {e}")
+        return change
+
+    def balance(self, owner: Address, mint: Address) -> Optional[int]:
+        """Current raw balance of an owner in a mint, or None if never seen."""
+        return self._totals.get(self._address(owner) + self._address(mint))
+
+    def balances(self, owner: Address) -> Dict[str, int]:
+        """All known balances of an owner, keyed by base58 mint."""
+        owner = self._address(owner)
+        with self._lock:
+            return {
+                b58encode(mint): self._totals[owner + mint]
+                for mint in self._owner_mints.get(owner, ())
+            }
+
+    def __len__(self) -> int:
+        """Number of (owner, mint) balances tracked."""
+        return len(self._totals)
@@ -3,12 +3,15 @@
 Main entry point for the CoreCast Python client.
 """
 import argparse
+import asyncio
 import sys
 import logging
 from pathlib import Path
 
 from config import load_config
 from client import CoreCastClient, signal_handler
+from multiplex import MultiStreamRunner
+from relay import CoreCastRelay
 
 
 def main():
@@ -25,6 +28,28 @@ def main():
         default='INFO',
         help='Set the logging level (default: INFO)'
     )
+    parser.add_argument(
+        '--record',
+        metavar='PATH',
+        help='Append every raw message received to a capture file'
+    )
+    parser.add_argument(
+        '--replay',
+        metavar='PATH',
+        help='Read messages from a capture file instead of connecting to the server'
+    )
+    parser.add_argument(
+        '--replay-speed',
+        type=float,
+        default=1.0,
+        help='Replay speed multiplier; 0 replays as fast as possible (default: 1.0)'
+    )
+    parser.add_argument(
+        '--replay-from-slot',
+        type=int,
+        default=0,
+        help='Start the replay at this slot (default: from the beginning)'
+    )
     
     args = parser.parse_args()
     
@@ -51,17 +76,59 @@ def main():
             f"filters.senders={len(config.filters.senders)}, "
             f"filters.receivers={len(config.filters.receivers)}, "
             f"filters.addresses={len(config.filters.addresses)}, "
-            f"filters.signers={len(config.filters.signers)}"
+            f"filters.signers={len(config.filters.signers)}, "
+            f"subscriptions={len(config.subscriptions)}"
         )
         
+        # Several named subscriptions share one channel in a single event loop
+        if config.subscriptions:
+            if args.record or args.replay:
+                logger.error("--record and --replay are only supported for single-stream configs")
+                sys.exit(1)
+            runner = MultiStreamRunner(config)
+            with signal_handler():
+                try:
+                    asyncio.run(runner.run())
+                except KeyboardInterrupt:
+                    logger.info("Received interrupt signal, shutting down...")
+                except Exception as e:
+                    logger.error(f"Unexpected error: {e}")
+                    sys.exit(1)
+            return
+        
+        # Serve the CoreCast service locally from shared upstream streams
+        if config.relay.enabled:
+            if args.record or args.replay:
+                logger.error("--record and --replay are not supported in relay mode")
+                sys.exit(1)
+            relay = CoreCastRelay(config)
+            with signal_handler():
+                try:
+                    relay.connect()
+                    relay.start()
+                    relay.wait_for_termination()
+                except KeyboardInterrupt:
+                    logger.info("Received interrupt signal, shutting down...")
+                except Exception as e:
+                    logger.error(f"Unexpected error: {e}")
+                    sys.exit(1)
+                finally:
+                    relay.close()
+            return
+        
         # Create client
         client = CoreCastClient(config)
         
         # Set up signal handling
         with signal_handler() as interrupted:
             try:
-                # Connect to server
-                client.connect()
+                # Connect to server, or read a capture instead
+                if args.replay:
+                    client.start_replay(args.replay, speed=args.replay_speed, from_slot=args.replay_from_slot)
+                else:
+                    client.connect()
+                if args.record:
+                    client.start_recording(args.record)
                 
                 # Start streaming based on configuration
                 stream_type = config.stream.type
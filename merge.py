@@ -0,0 +1,146 @@
+"""
+Slot-ordered merging of several live streams.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, List, Optional, Sequence
+
+from dedup import SlotWindowDedup, event_key
+
+
+logger = logging.getLogger(__name__)
+
+
+class MergeBuffer:
+    """
+    Holds items from several live sources until they can be released in order.
+
+    Items are ordered by (slot, index, arrival). The head is released once
+    every running source has delivered a later slot, the watermark. It is
+    also released after it has waited ``max_delay`` seconds, so a quiet
+    source cannot stall the merge. An item released after a later slot
+    went out is counted as late. Not thread-safe; the mergers below
+    guard it.
+    """
+
+    def __init__(self, sources: int, max_delay: float = 1.0):
+        self.max_delay = max_delay
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._latest = [-1] * sources
+        self._running = [True] * sources
+        self._released_slot = -1
+        self.late = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def running(self) -> bool:
+        """True while any source may still deliver items."""
+        return any(self._running)
+
+    def push(self, source: int, slot: int, item: Any, now: float, index: int = 0) -> None:
+        if slot > self._latest[source]:
+            self._latest[source] = slot
+        heapq.heappush(self._heap, (slot, index, next(self._seq), now, item))
+
+    def finish(self, source: int) -> None:
+        self._running[source] = False
+
+    def wait_time(self, now: float) -> Optional[float]:
+        """Seconds until the head may be released (<= 0: now), or None if empty."""
+        if not self._heap:
+            return None
+        slot, _, _, arrived, _ = self._heap[0]
+        running = [latest for latest, active in zip(self._latest, self._running) if active]
+        if not running or slot < min(running):
+            return 0.0
+        return arrived + self.max_delay - now
+
+    def pop(self) -> Any:
+        """Remove and return the head item."""
+        slot, _, _, _, item = heapq.heappop(self._heap)
+        if slot < self._released_slot:
+            self.late += 1
+        else:
+            self._released_slot = slot
+        return item
+
+
+class AsyncStreamMerger:
+    """
+    K-way merge of decoded asyncio streams in (slot, transaction index) order.
+
+    Each stream is pumped by its own task into a MergeBuffer. Events
+    already seen on another stream are dropped on arrival, before they are
+    buffered. They are matched by ``key`` (default event_key) in a
+    SlotWindowDedup. An error in any stream ends the merge with that
+    error.
+    """
+
+    def __init__(
+        self,
+        streams: Sequence[AsyncIterator],
+        max_delay: float = 1.0,
+        dedup: Optional[SlotWindowDedup] = None,
+        key: Callable = event_key
+    ):
+        self.streams = list(streams)
+        self.buffer = MergeBuffer(len(self.streams), max_delay)
+        self.dedup = dedup if dedup is not None else SlotWindowDedup()
+        self.key = key
+        self.received = 0
+        self._wakeup = asyncio.Event()
+        self._error: Optional[BaseException] = None
+
+    @property
+    def duplicates(self) -> int:
+        return self.dedup.duplicates
+
+    async def _pump(self, source: int, stream: AsyncIterator) -> None:
+        buffer = self.buffer
+        try:
+            async for msg in stream:
+                self.received += 1
+                slot = msg.Block.Slot
+                if self.dedup.is_duplicate(self.key(msg), slot):
+                    continue
+                buffer.push(source, slot, msg, time.monotonic(), msg.Transaction.Index)
+                self._wakeup.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+        finally:
+            buffer.finish(source)
+            self._wakeup.set()
+
+    async def __aiter__(self) -> AsyncIterator:
+        tasks: List[asyncio.Task] = [
+            asyncio.ensure_future(self._pump(source, stream)) for source, stream in enumerate(self.streams)
+        ]
+        buffer = self.buffer
+        try:
+            while True:
+                if self._error is not None:
+                    raise self._error
+                wait = buffer.wait_time(time.monotonic())
+                if wait is not None and wait <= 0:
+                    yield buffer.pop()
+                    continue
+                if wait is None and not buffer.running:
+                    return
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
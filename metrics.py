@@ -0,0 +1,318 @@
+"""
+Low-overhead client metrics with a Prometheus text exporter.
+"""
+import bisect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from wire import read_slot
+
+
+logger = logging.getLogger(__name__)
+
+
+def exponential_buckets(start: float, factor: float, count: int) -> Tuple[float, ...]:
+    """Histogram bucket bounds start, start*factor, ... (count values)."""
+    return tuple(start * factor ** i for i in range(count))
+
+
+# 1us .. ~16ms
+DECODE_BUCKETS = exponential_buckets(1e-6, 2.0, 15)
+# 10us .. ~5s
+HANDLER_BUCKETS = exponential_buckets(1e-5, 2.0, 20)
+
+
+class Counter:
+    """Monotonic counter. Updates are plain attribute writes (one writer thread per metric)."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """Value that can go up and down."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect and three additions."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricFamily:
+    """A named metric with one child per label value combination."""
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names: Sequence[str], factory: Callable):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """The child metric for these label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def samples(self) -> Iterator[Tuple[str, Tuple[str, ...], float]]:
+        for values, child in list(self._children.items()):
+            yield "", values, child.value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if self.kind == "histogram":
+            for values, child in list(self._children.items()):
+                cumulative = 0
+                for bound, count in zip(child.bounds + (float("inf"),), child.counts):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {cumulative}")
+                labels = _format_labels(self.label_names, values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+                lines.append(f"{self.name}_count{labels} {child.count}")
+            return lines
+        for suffix, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.label_names, values)} {_format_value(value)}")
+        return lines
+
+
+class _CallbackFamily(MetricFamily):
+    """A metric whose samples are read from a callback at scrape time."""
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        super().__init__(name, help_text, kind, label_names, factory=None)
+        self._collect = collect
+
+    def samples(self) -> Iterator[Tuple[str, Tuple[str, ...], float]]:
+        for values, value in self._collect():
+            yield "", tuple(values), value
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+
+    def _add(self, family: MetricFamily) -> MetricFamily:
+        if family.name in self._families:
+            raise ValueError(f"Metric {family.name} is already registered")
+        self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> MetricFamily:
+        return self._add(MetricFamily(name, help_text, "counter", labels, Counter))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> MetricFamily:
+        return self._add(MetricFamily(name, help_text, "gauge", labels, Gauge))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = HANDLER_BUCKETS) -> MetricFamily:
+        return self._add(MetricFamily(name, help_text, "histogram", labels, lambda: Histogram(buckets)))
+
+    def callback(self, name: str, help_text: str, kind: str, labels: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]) -> MetricFamily:
+        """Register a gauge or counter whose (label values, value) pairs come from collect()."""
+        return self._add(_CallbackFamily(name, help_text, kind, labels, collect))
+
+    def render(self) -> str:
+        lines = []
+        for family in list(self._families.values()):
+            try:
+                lines.extend(family.render())
+            except Exception as e:
+                logger.error(f"Failed to collect metric {family.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves a registry at ``/metrics`` from a background HTTP server thread."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?", 1)[0] != "/metrics":
+                    handler.send_error(404)
+                    return
+                body = registry.render().encode()
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics at http://{self.address[0]}:{self.address[1]}/metrics")
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class ClientMetrics:
+    """
+    The stream client's metrics, labelled by stream type.
+
+    Covers received messages and bytes, decode and handler time, slot
+    progress, and (through callbacks) pipeline queue depth and reconnects.
+
+    Stream messages carry no block time, so lag is measured against an
+    estimate of the chain head: a reference slot and time, advanced one
+    slot every ``slot_duration`` seconds. The reference is the first slot
+    received unless ``reference_slot`` and ``reference_time`` (Unix
+    seconds) are given, and it moves forward whenever a message is ahead of
+    the estimate. ``corecast_slot_lag_slots`` is how many slots a stream's
+    last message trails the estimate, and ``corecast_slot_lag_seconds`` the
+    same in seconds. Both are computed at scrape time, so they keep growing
+    while a stream is stalled. ``corecast_head_slot_age_seconds`` grows
+    while no new slot arrives at all.
+    """
+
+    def __init__(self, slot_duration: float = 0.4, reference_slot: int = 0, reference_time: float = 0.0):
+        self.slot_duration = slot_duration
+        self.registry = MetricsRegistry()
+        r = self.registry
+        self.messages = r.counter("corecast_messages_total", "Stream messages received", ["stream"])
+        self.bytes = r.counter("corecast_received_bytes_total", "Serialized message bytes received", ["stream"])
+        self.decode_seconds = r.histogram(
+            "corecast_decode_seconds", "Protobuf decode time per message", ["stream"], DECODE_BUCKETS
+        )
+        self.handler_seconds = r.histogram(
+            "corecast_handler_seconds", "Handler time per message", ["stream"], HANDLER_BUCKETS
+        )
+        self.latest_slot = r.gauge("corecast_latest_slot", "Slot of the last message received", ["stream"])
+        r.callback(
+            "corecast_slot_lag_slots", "Slots between the estimated chain head and the stream's last message",
+            "gauge", ["stream"], lambda: self._lag(1)
+        )
+        r.callback(
+            "corecast_slot_lag_seconds", "Seconds between the estimated chain head and the stream's last message",
+            "gauge", ["stream"], lambda: self._lag(self.slot_duration)
+        )
+        r.callback(
+            "corecast_head_slot_age_seconds", "Seconds since a new highest slot was received", "gauge", (),
+            lambda: [((), time.monotonic() - self._head_seen_at)] if self._head_slot >= 0 else []
+        )
+        self._head_slot = -1
+        self._head_seen_at = time.monotonic()
+        # (slot, Unix time) the head estimate counts from
+        self._reference = (reference_slot, reference_time) if reference_slot > 0 else None
+        self._lock = threading.Lock()
+
+    def estimated_head(self, now: Optional[float] = None) -> float:
+        """The chain head slot estimated from the reference and the clock; -1 before any slot."""
+        reference = self._reference
+        if reference is None:
+            return -1.0
+        if now is None:
+            now = time.time()
+        return reference[0] + (now - reference[1]) / self.slot_duration
+
+    def _lag(self, scale: float) -> List[Tuple[Tuple[str, ...], float]]:
+        head = int(self.estimated_head())
+        if head < 0:
+            return []
+        return [(values, max(0, head - slot) * scale) for _, values, slot in self.latest_slot.samples()]
+
+    def observe_slot(self, stream: str, slot: int) -> None:
+        if slot > self._head_slot:
+            with self._lock:
+                if slot > self._head_slot:
+                    now = time.time()
+                    self._head_slot = slot
+                    self._head_seen_at = time.monotonic()
+                    if slot > self.estimated_head(now):
+                        # No reference yet, or the chain runs ahead of slot_duration
+                        self._reference = (slot, now)
+        self.latest_slot.labels(stream).set(slot)
+
+    def count(self, stream: str, payloads: Iterator[bytes]) -> Iterator[bytes]:
+        """Pass raw messages through, counting them, their bytes and their slot."""
+        messages = self.messages.labels(stream)
+        received = self.bytes.labels(stream)
+        for data in payloads:
+            messages.inc()
+            received.inc(len(data))
+            self.observe_slot(stream, read_slot(data))
+            yield data
+
+    def decode(self, stream: str, payloads: Iterator[bytes], parse: Callable) -> Iterator:
+        """Decode raw messages with parse(), timing each decode."""
+        observe = self.decode_seconds.labels(stream).observe
+        clock = time.perf_counter
+        for data in payloads:
+            started = clock()
+            msg = parse(data)
+            observe(clock() - started)
+            yield msg
+
+    def timed(self, stream: str, handler: Callable) -> Callable:
+        """Wrap a handler to record its time per message."""
+        observe = self.handler_seconds.labels(stream).observe
+        clock = time.perf_counter
+
+        def handle(msg) -> None:
+            started = clock()
+            try:
+                handler(msg)
+            finally:
+                observe(clock() - started)
+        return handle
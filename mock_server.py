@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Local mock CoreCast server that streams synthetic messages for development and benchmarking.
+"""
+import argparse
+import logging
+import random
+import time
+from concurrent import futures
+from typing import Dict, Iterator, List, Optional
+
+import grpc
+from google.protobuf.descriptor import FieldDescriptor
+
+from capture import CaptureReader
+from raw_stub import RPC_TYPES, SERVICE_NAME
+
+
+logger = logging.getLogger(__name__)
+
+
+# Slot the synthetic chain starts at
+DEFAULT_START_SLOT = 300_000_000
+
+# Recursion guard for nested message fields
+_MAX_DEPTH = 8
+
+_INT_CPP_TYPES = (
+    FieldDescriptor.CPPTYPE_INT32,
+    FieldDescriptor.CPPTYPE_INT64,
+    FieldDescriptor.CPPTYPE_UINT32,
+    FieldDescriptor.CPPTYPE_UINT64,
+)
+_FLOAT_CPP_TYPES = (FieldDescriptor.CPPTYPE_FLOAT, FieldDescriptor.CPPTYPE_DOUBLE)
+
+_WORDS = ("swap", "route", "deposit", "withdraw", "transfer", "initialize", "close", "sync")
+
+
+class MessageFactory:
+    """
+    Builds synthetic stream messages for one CoreCast RPC.
+
+    Every field of the message type is populated by walking its descriptor,
+    so the generated messages exercise the same formatting paths as real
+    data. ``repeat`` sets the length of every repeated field and is the main
+    size knob. 32-byte values are drawn from a pool of ``key_pool_size``
+    keys so accounts and mints repeat across messages as they do on chain.
+    """
+
+    def __init__(
+        self,
+        rpc_name: str,
+        repeat: int = 2,
+        key_pool_size: int = 2000,
+        seed: Optional[int] = None
+    ):
+        if rpc_name not in RPC_TYPES:
+            raise ValueError(f"Unknown CoreCast RPC: {rpc_name}")
+        self.rpc_name = rpc_name
+        self.message_type = RPC_TYPES[rpc_name][1]
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+        self.keys = [self.rng.randbytes(32) for _ in range(key_pool_size)]
+
+    def body(self) -> bytes:
+        """
+        Serialize one message without its per-message identity.
+
+        ``Block`` and ``Transaction.Index``/``Transaction.Signature`` are left
+        out; header() supplies them.
+        """
+        msg = self.message_type()
+        self._fill(msg, 0)
+        msg.ClearField("Block")
+        msg.Transaction.ClearField("Index")
+        msg.Transaction.ClearField("Signature")
+        return msg.SerializeToString()
+
+    def header(self, slot: int, index: int, signature: bytes) -> bytes:
+        """Serialize the slot, transaction index and signature of one message."""
+        msg = self.message_type()
+        msg.Block.Slot = slot
+        msg.Transaction.Index = index
+        msg.Transaction.Signature = signature
+        return msg.SerializeToString()
+
+    def _fill(self, msg, depth: int) -> None:
+        descriptor = msg.DESCRIPTOR
+        # Only one member of each oneof may be set
+        chosen = {self.rng.choice(oneof.fields) for oneof in descriptor.oneofs}
+        for field in descriptor.fields:
+            if field.containing_oneof is not None and field not in chosen:
+                continue
+            repeated = field.is_repeated
+            if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+                if depth >= _MAX_DEPTH:
+                    continue
+                target = getattr(msg, field.name)
+                for _ in range(self.repeat if repeated else 1):
+                    self._fill(target.add() if repeated else target, depth + 1)
+                if not repeated and not target.ByteSize():
+                    # Mark an all-default submessage as present
+                    target.SetInParent()
+            elif repeated:
+                getattr(msg, field.name).extend(self._value(field) for _ in range(self.repeat))
+            else:
+                setattr(msg, field.name, self._value(field))
+
+    def _value(self, field: FieldDescriptor):
+        rng = self.rng
+        name = field.name
+        cpp_type = field.cpp_type
+        if field.type == FieldDescriptor.TYPE_BYTES:
+            if "Signature" in name:
+                return rng.randbytes(64)
+            if name == "Data":
+                return rng.randbytes(rng.randint(8, 64))
+            return rng.choice(self.keys)
+        if cpp_type == FieldDescriptor.CPPTYPE_STRING:
+            if "Log" in name:
+                return f"Program log: Instruction: {rng.choice(_WORDS).capitalize()}"
+            return f"{name.lower()}-{rng.choice(_WORDS)}-{rng.randrange(100)}"
+        if cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+            return rng.random() < 0.9
+        if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+            return rng.choice(field.enum_type.values).number
+        if cpp_type in _FLOAT_CPP_TYPES:
+            return rng.random() * 1000
+        if cpp_type in _INT_CPP_TYPES:
+            if "Index" in name:
+                # Keep indexes pointing into the generated repeated fields
+                return rng.randrange(self.repeat or 1)
+            if name == "Decimals":
+                return rng.choice((6, 9))
+            if cpp_type in (FieldDescriptor.CPPTYPE_INT32, FieldDescriptor.CPPTYPE_UINT32):
+                return rng.randrange(1 << 16)
+            return rng.randrange(10 ** 12)
+        raise ValueError(f"Unsupported field type for {field.full_name}")
+
+
+class MockCoreCastServer:
+    """
+    Serves every CoreCast RPC from synthetic messages.
+
+    Each stream sends ``count`` messages (0 streams forever) at ``rate``
+    messages per second (0 sends as fast as possible), ``messages_per_slot``
+    per slot. Requests are parsed but filters are ignored. With ``corpus``
+    set to a capture file (see capture.py) the recorded messages of each RPC
+    are streamed instead, looping over the capture as needed.
+
+    To keep the server cheap enough to saturate a client, ``pool_size``
+    message bodies are generated up front and cycled. Each response is a
+    fresh header (slot, index, unique signature) followed by a pooled body.
+    Protobuf merges the two, so clients decode a normal, complete message.
+    Responses are sent as pre-serialized bytes through a generic handler,
+    the server counterpart of raw_stub.RawCoreCastStub.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0,
+        count: int = 0,
+        messages_per_slot: int = 50,
+        repeat: int = 2,
+        pool_size: int = 256,
+        start_slot: int = DEFAULT_START_SLOT,
+        seed: Optional[int] = None,
+        corpus: Optional[str] = None
+    ):
+        self.rate = rate
+        self.count = count
+        self.messages_per_slot = max(1, messages_per_slot)
+        self.repeat = repeat
+        self.pool_size = max(1, pool_size)
+        self.start_slot = start_slot
+        self.seed = seed
+        self.corpus = corpus
+        self._bodies: Dict[str, List[bytes]] = {}
+        self._factories: Dict[str, MessageFactory] = {}
+
+    def handler(self) -> grpc.GenericRpcHandler:
+        """Build the gRPC handler for the CoreCast service."""
+        method_handlers = {
+            rpc_name: grpc.unary_stream_rpc_method_handler(
+                self._stream_method(rpc_name),
+                request_deserializer=request_type.FromString,
+                response_serializer=None,
+            )
+            for rpc_name, (request_type, _) in RPC_TYPES.items()
+        }
+        return grpc.method_handlers_generic_handler(SERVICE_NAME, method_handlers)
+
+    def _prepare(self, rpc_name: str) -> MessageFactory:
+        if rpc_name not in self._factories:
+            factory = MessageFactory(rpc_name, repeat=self.repeat, seed=self.seed)
+            self._bodies[rpc_name] = [factory.body() for _ in range(self.pool_size)]
+            self._factories[rpc_name] = factory
+            sizes = [len(b) for b in self._bodies[rpc_name]]
+            logger.info(f"{rpc_name}: generated {len(sizes)} message bodies, avg {sum(sizes) / len(sizes):.0f} bytes")
+        return self._factories[rpc_name]
+
+    def _stream_method(self, rpc_name: str):
+        def stream(request, context) -> Iterator[bytes]:
+            logger.info(f"{rpc_name} subscription from {context.peer()}")
+            if self.corpus:
+                payloads = self._corpus_payloads(rpc_name)
+            else:
+                payloads = self._synthetic_payloads(rpc_name)
+            yield from self._throttle(rpc_name, payloads, context)
+        return stream
+
+    def _synthetic_payloads(self, rpc_name: str) -> Iterator[bytes]:
+        factory = self._prepare(rpc_name)
+        bodies = self._bodies[rpc_name]
+        rng = factory.rng
+        sent = 0
+        while True:
+            slot, index = divmod(sent, self.messages_per_slot)
+            # Random like real ed25519 signatures, so unique in practice
+            signature = rng.getrandbits(512).to_bytes(64, 'big')
+            yield factory.header(self.start_slot + slot, index, signature) + bodies[sent % len(bodies)]
+            sent += 1
+
+    def _corpus_payloads(self, rpc_name: str) -> Iterator[bytes]:
+        """Replay the captured messages of one RPC, looping over the capture."""
+        reader = CaptureReader(self.corpus)
+        while True:
+            replayed = 0
+            for record in reader.records(rpc_names=(rpc_name,)):
+                replayed += 1
+                yield record.data
+            if not replayed:
+                logger.warning(f"{self.corpus} has no {rpc_name} messages")
+                return
+
+    def _throttle(self, rpc_name: str, payloads: Iterator[bytes], context) -> Iterator[bytes]:
+        """Apply the message count and send rate to a payload source."""
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        started = time.monotonic()
+        sent = 0
+        for payload in payloads:
+            if self.count and sent >= self.count:
+                break
+            if interval:
+                ahead = started + sent * interval - time.monotonic()
+                if ahead > 0:
+                    time.sleep(ahead)
+            if not context.is_active():
+                return
+            yield payload
+            sent += 1
+        logger.info(f"{rpc_name} stream finished after {sent} messages")
+
+
+def serve(address: str, server: MockCoreCastServer, max_workers: int = 16) -> grpc.Server:
+    """Start serving the mock on address (e.g. "127.0.0.1:50051") and return the gRPC server."""
+    grpc_server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        options=[('grpc.max_send_message_length', 64 * 1024 * 1024)]
+    )
+    grpc_server.add_generic_rpc_handlers((server.handler(),))
+    port = grpc_server.add_insecure_port(address)
+    if not port:
+        raise RuntimeError(f"Could not bind mock server to {address}")
+    grpc_server.start()
+    logger.info(f"Mock CoreCast server listening on {address}")
+    return grpc_server
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Local mock CoreCast server')
+    parser.add_argument('--address', default='127.0.0.1:50051', help='Listen address (default: 127.0.0.1:50051)')
+    parser.add_argument('--rate', type=float, default=0, help='Messages per second per stream; 0 = unlimited')
+    parser.add_argument('--count', type=int, default=0, help='Messages per stream before it ends; 0 = forever')
+    parser.add_argument('--messages-per-slot', type=int, default=50, help='Messages per slot (default: 50)')
+    parser.add_argument('--repeat', type=int, default=2, help='Length of every repeated field (default: 2)')
+    parser.add_argument('--pool-size', type=int, default=256, help='Distinct message bodies per stream')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible messages')
+    parser.add_argument('--corpus', help='Stream messages from this capture file instead of generating them')
+    parser.add_argument(
+        '--log-level',
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+        default='INFO',
+        help='Set the logging level (default: INFO)'
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    mock = MockCoreCastServer(
+        rate=args.rate,
+        count=args.count,
+        messages_per_slot=args.messages_per_slot,
+        repeat=args.repeat,
+        pool_size=args.pool_size,
+        seed=args.seed,
+        corpus=args.corpus
+    )
+    grpc_server = serve(args.address, mock)
+    try:
+        grpc_server.wait_for_termination()
+    except KeyboardInterrupt:
+        logger.info("Shutting down mock server...")
+        grpc_server.stop(grace=1)
+
+
+if __name__ == "__main__":
+    main()
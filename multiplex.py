@@ -0,0 +1,123 @@
+"""
+Run several named CoreCast subscriptions over one shared gRPC channel.
+"""
+import asyncio
+import inspect
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from async_client import AsyncCoreCastClient
+from config import Config, SubscriptionConfig
+from dedup import SlotWindowDedup
+from handlers import resolve_handler
+from merge import AsyncStreamMerger
+
+
+logger = logging.getLogger(__name__)
+
+
+# Maps config stream types to the AsyncCoreCastClient method that serves them
+STREAM_METHODS = {
+    "dex_trades": "stream_dex_trades",
+    "dex_orders": "stream_dex_orders",
+    "dex_pools": "stream_dex_pools",
+    "transactions": "stream_transactions",
+    "transfers": "stream_transfers",
+    "balances": "stream_balances",
+}
+
+
+class MultiStreamRunner:
+    """
+    Runs every subscription listed in ``config.subscriptions`` concurrently.
+
+    All subscriptions share a single channel (one TLS handshake and one
+    HTTP/2 connection window) and are multiplexed as separate HTTP/2
+    streams. Each subscription's messages go to its own handler.
+
+    Subscriptions with the same ``merge`` group are consumed as one stream.
+    Their events are deduplicated and merged in (slot, transaction index)
+    order, and go to the group's shared handler.
+    """
+
+    def __init__(self, config: Config):
+        if not config.subscriptions:
+            raise ValueError("Config has no 'subscriptions' to run")
+        if config.metrics.enabled:
+            logger.warning("metrics are only collected for single-stream configs; ignored for subscriptions")
+        self.config = config
+        self.client = AsyncCoreCastClient(config)
+        self.handlers: Dict[str, Callable] = {
+            sub.name: resolve_handler(sub.handler) for sub in config.subscriptions
+        }
+
+    async def run(self) -> None:
+        """Connect and run all subscriptions until they end or are cancelled."""
+        await self.client.connect()
+        try:
+            subscriptions = self.config.subscriptions
+            logger.info(
+                f"Running {len(subscriptions)} subscriptions on one channel: "
+                f"{', '.join(sub.name for sub in subscriptions)}"
+            )
+            units = self._run_units(subscriptions)
+            results = await asyncio.gather(*(run for _, run in units), return_exceptions=True)
+            self._report_failures([name for name, _ in units], results)
+        finally:
+            await self.client.close()
+
+    def _run_units(self, subscriptions: List[SubscriptionConfig]) -> List[Tuple[str, Awaitable]]:
+        """(name, coroutine) for every standalone subscription and merge group."""
+        units = []
+        groups: Dict[str, List[SubscriptionConfig]] = {}
+        for sub in subscriptions:
+            if sub.merge is None:
+                units.append((sub.name, self._run_subscription(sub)))
+            else:
+                groups.setdefault(sub.merge, []).append(sub)
+        for group, members in groups.items():
+            units.append((group, self._run_merged(group, members)))
+        return units
+
+    def _open(self, sub: SubscriptionConfig) -> AsyncIterator:
+        return getattr(self.client, STREAM_METHODS[sub.type])(sub.filters)
+
+    async def _dispatch(self, name: str, handler: Callable, stream: AsyncIterator) -> None:
+        async for msg in stream:
+            try:
+                result = handler(msg)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"[{name}] Error processing message: {e}")
+                logger.debug(f"[{name}] Message data: {msg}")
+        logger.info(f"[{name}] Stream ended")
+
+    async def _run_subscription(self, sub: SubscriptionConfig) -> None:
+        """Consume one subscription and dispatch its messages to its handler."""
+        await self._dispatch(sub.name, self.handlers[sub.name], self._open(sub))
+
+    async def _run_merged(self, group: str, members: List[SubscriptionConfig]) -> None:
+        """Consume a merge group as one deduplicated, slot-ordered stream."""
+        merge_config = self.config.merge
+        merger = AsyncStreamMerger(
+            [self._open(sub) for sub in members],
+            max_delay=merge_config.max_delay,
+            dedup=SlotWindowDedup(merge_config.window_slots, merge_config.max_keys)
+        )
+        logger.info(f"[{group}] Merging {', '.join(sub.name for sub in members)}")
+        try:
+            await self._dispatch(group, self.handlers[members[0].name], merger)
+        finally:
+            logger.info(
+                f"[{group}] {merger.received} events received, {merger.duplicates} duplicates dropped, "
+                f"{merger.buffer.late} released late"
+            )
+
+    def _report_failures(self, names: List[str], results: list) -> None:
+        """Log subscriptions and merge groups that stopped with an error."""
+        for name, result in zip(names, results):
+            if isinstance(result, asyncio.CancelledError):
+                continue
+            if isinstance(result, BaseException):
+                logger.error(f"[{name}] Subscription failed: {result}")
@@ -0,0 +1,265 @@
+"""
+Incremental order books rebuilt from the DEX orders stream.
+"""
+import heapq
+import json
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from encoding import b58decode, b58encode
+from solana.dex_block_message_pb2 import CANCEL, OPEN, UPDATE
+
+
+@dataclass
+class Level:
+    """Aggregated resting orders at one price."""
+    price: int
+    amount: int
+    orders: int
+
+
+@dataclass
+class _Order:
+    buy_side: bool
+    price: int
+    amount: int
+
+
+class _BookSide:
+    """
+    One side of a book: price levels in a dict plus a heap of their sort keys.
+
+    Prices are stored as sort keys (negated for bids), so the best price is
+    the smallest key. Looking up or changing an existing level is a dict
+    hit; adding a level is a heap push. Removing a level only deletes it
+    from the dict. Its key stays in the heap and is skipped when it reaches
+    the top, so updates are O(log n). The heap is rebuilt from the live
+    levels once stale keys outnumber them. depth() selects the best k
+    levels in O(n log k) and is meant for periodic snapshots.
+    """
+
+    def __init__(self, descending: bool):
+        self.sign = -1 if descending else 1
+        # Min-heap of sort keys, possibly including removed levels
+        self.keys: List[int] = []
+        # Keys currently in the heap, live or stale
+        self._heaped: Set[int] = set()
+        # price -> [total amount, order count]
+        self.levels: Dict[int, List[int]] = {}
+
+    def add(self, price: int, amount: int) -> None:
+        level = self.levels.get(price)
+        if level is None:
+            self.levels[price] = [amount, 1]
+            key = self.sign * price
+            if key not in self._heaped:
+                self._heaped.add(key)
+                heapq.heappush(self.keys, key)
+        else:
+            level[0] += amount
+            level[1] += 1
+
+    def change(self, price: int, delta: int) -> None:
+        self.levels[price][0] += delta
+
+    def remove(self, price: int, amount: int) -> None:
+        level = self.levels[price]
+        level[0] -= amount
+        level[1] -= 1
+        if level[1] <= 0:
+            del self.levels[price]
+            if len(self.keys) > 2 * len(self.levels) + 64:
+                self._compact()
+
+    def _compact(self) -> None:
+        """Rebuild the heap from the live levels, dropping stale keys."""
+        self.keys = [self.sign * price for price in self.levels]
+        heapq.heapify(self.keys)
+        self._heaped = set(self.keys)
+
+    def _best_key(self) -> Optional[int]:
+        keys = self.keys
+        while keys and self.sign * keys[0] not in self.levels:
+            self._heaped.discard(heapq.heappop(keys))
+        return keys[0] if keys else None
+
+    def best(self) -> Optional[Level]:
+        key = self._best_key()
+        if key is None:
+            return None
+        price = self.sign * key
+        amount, orders = self.levels[price]
+        return Level(price, amount, orders)
+
+    def depth(self, levels: int) -> List[Level]:
+        sign = self.sign
+        result = []
+        for key in heapq.nsmallest(levels, (sign * price for price in self.levels)):
+            price = sign * key
+            amount, orders = self.levels[price]
+            result.append(Level(price, amount, orders))
+        return result
+
+
+class OrderBook:
+    """
+    Live limit order book of one market.
+
+    Prices and amounts are the raw ``LimitPrice``/``LimitAmount`` integers of
+    the orders stream, so levels compare exactly.
+    """
+
+    def __init__(self, market: bytes):
+        self.market = market
+        self.bids = _BookSide(descending=True)
+        self.asks = _BookSide(descending=False)
+        self.orders: Dict[bytes, _Order] = {}
+        self.last_slot = 0
+
+    def _side(self, buy_side: bool) -> _BookSide:
+        return self.bids if buy_side else self.asks
+
+    def open(self, order_id: bytes, buy_side: bool, price: int, amount: int) -> None:
+        """Add a resting order (replacing one with the same id)."""
+        if order_id in self.orders:
+            self.cancel(order_id)
+        if amount <= 0:
+            return
+        self.orders[order_id] = _Order(buy_side, price, amount)
+        self._side(buy_side).add(price, amount)
+
+    def update(self, order_id: bytes, buy_side: bool, price: int, amount: int) -> None:
+        """Change an order's remaining amount (and price); zero amount removes it."""
+        order = self.orders.get(order_id)
+        if order is None or order.price != price or order.buy_side != buy_side or amount <= 0:
+            # Unknown orders were placed before the stream started
+            self.open(order_id, buy_side, price, amount)
+            return
+        self._side(buy_side).change(price, amount - order.amount)
+        order.amount = amount
+
+    def cancel(self, order_id: bytes) -> bool:
+        """Remove an order; returns False if it is not in the book."""
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return False
+        self._side(order.buy_side).remove(order.price, order.amount)
+        return True
+
+    def best_bid(self) -> Optional[Level]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Level]:
+        return self.asks.best()
+
+    def spread(self) -> Optional[int]:
+        """Best ask minus best bid, or None if either side is empty."""
+        bid = self.bids.best()
+        ask = self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask.price - bid.price
+
+    def depth(self, levels: int = 10) -> Tuple[List[Level], List[Level]]:
+        """The best ``levels`` bid and ask levels, best first."""
+        return self.bids.depth(levels), self.asks.depth(levels)
+
+    def snapshot(self, levels: int = 10) -> dict:
+        """JSON-serializable depth snapshot."""
+        bids, asks = self.depth(levels)
+        return {
+            "market": b58encode(self.market),
+            "slot": self.last_slot,
+            "orders": len(self.orders),
+            "spread": self.spread(),
+            "bids": [[level.price, level.amount, level.orders] for level in bids],
+            "asks": [[level.price, level.amount, level.orders] for level in asks],
+        }
+
+
+MarketId = Union[bytes, str]
+
+
+class OrderBookEngine:
+    """
+    Maintains an OrderBook per ``Market.MarketAddress`` from DexOrderStreamMessages.
+
+    OPEN adds an order and CANCEL removes it. UPDATE sets the remaining
+    amount, and a zero amount removes the order. Orders first seen in an
+    UPDATE are added, since the book starts empty mid-stream; CANCELs of
+    unknown orders are counted and ignored. Events from failed transactions
+    are skipped.
+
+    Queries take a market address as raw bytes or base58 and are safe to
+    call from other threads while events are applied.
+    """
+
+    def __init__(self):
+        self.books: Dict[bytes, OrderBook] = {}
+        self._lock = threading.Lock()
+        self._changed: set = set()
+        self.events = 0
+        self.unknown_cancels = 0
+
+    def apply(self, msg) -> None:
+        """Apply one DexOrderStreamMessage."""
+        if not msg.Transaction.Status.Success:
+            return
+        event = msg.Order
+        order = event.Order
+        market = event.Market.MarketAddress
+        with self._lock:
+            book = self.books.get(market)
+            if book is None:
+                book = self.books[market] = OrderBook(market)
+            event_type = event.Type
+            if event_type == CANCEL:
+                if not book.cancel(order.OrderId):
+                    self.unknown_cancels += 1
+            elif event_type == UPDATE:
+                book.update(order.OrderId, order.BuySide, order.LimitPrice, order.LimitAmount)
+            elif event_type == OPEN:
+                book.open(order.OrderId, order.BuySide, order.LimitPrice, order.LimitAmount)
+            book.last_slot = msg.Block.Slot
+            self._changed.add(market)
+            self.events += 1
+
+    def book(self, market: MarketId) -> Optional[OrderBook]:
+        if isinstance(market, str):
+            market = b58decode(market)
+        return self.books.get(market)
+
+    def top_of_book(self, market: MarketId) -> Tuple[Optional[Level], Optional[Level]]:
+        """(best bid, best ask) of a market."""
+        with self._lock:
+            book = self.book(market)
+            if book is None:
+                return None, None
+            return book.best_bid(), book.best_ask()
+
+    def spread(self, market: MarketId) -> Optional[int]:
+        with self._lock:
+            book = self.book(market)
+            return book.spread() if book is not None else None
+
+    def depth(self, market: MarketId, levels: int = 10) -> Tuple[List[Level], List[Level]]:
+        """The best ``levels`` (bids, asks) of a market."""
+        with self._lock:
+            book = self.book(market)
+            return book.depth(levels) if book is not None else ([], [])
+
+    def changed_snapshots(self, levels: int = 10) -> List[dict]:
+        """Snapshots of the books changed since the previous call."""
+        with self._lock:
+            snapshots = [self.books[market].snapshot(levels) for market in self._changed]
+            self._changed.clear()
+        return snapshots
+
+
+def write_snapshots(snapshots: List[dict], out=None) -> None:
+    """Write book snapshots as JSON lines to out (default stdout)."""
+    out = out or sys.stdout
+    for snapshot in snapshots:
+        out.write(json.dumps(snapshot) + "\n")
@@ -0,0 +1,256 @@
+"""
+Bounded producer/consumer stage between a gRPC stream and its message handler.
+"""
+import collections
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "spill")
+
+# Spill record header: message type name length, payload length
+_SPILL_HEADER = struct.Struct('<HI')
+
+
+@dataclass
+class PipelineStats:
+    """Point-in-time counters for a MessagePipeline."""
+    depth: int = 0
+    max_depth: int = 0
+    received: int = 0
+    processed: int = 0
+    dropped: int = 0
+    spilled: int = 0
+    spill_depth: int = 0
+    errors: int = 0
+
+
+class _SpillFile:
+    """Append-only overflow file, read back in FIFO order once the queue drains."""
+
+    def __init__(self, spill_dir: Optional[str], name: str):
+        fd, self.path = tempfile.mkstemp(prefix=f"corecast-{name}-", suffix=".spill", dir=spill_dir)
+        self._file = os.fdopen(fd, 'w+b')
+        self._read_offset = 0
+        self.pending = 0
+
+    def append(self, type_name: str, payload: bytes) -> None:
+        name = type_name.encode()
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(_SPILL_HEADER.pack(len(name), len(payload)))
+        self._file.write(name)
+        self._file.write(payload)
+        self.pending += 1
+
+    def pop(self):
+        """Return the oldest spilled (type_name, payload) record."""
+        self._file.flush()
+        self._file.seek(self._read_offset)
+        name_len, payload_len = _SPILL_HEADER.unpack(self._file.read(_SPILL_HEADER.size))
+        type_name = self._file.read(name_len).decode()
+        payload = self._file.read(payload_len)
+        self._read_offset = self._file.tell()
+        self.pending -= 1
+        if not self.pending:
+            # Fully drained: reclaim the disk space
+            self._file.seek(0)
+            self._file.truncate()
+            self._read_offset = 0
+        return type_name, payload
+
+    def close(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class MessagePipeline:
+    """
+    Decouples message receipt from message handling.
+
+    The gRPC reader calls put() and returns immediately while a worker
+    thread runs the handler, so a slow handler no longer stalls the HTTP/2
+    receive window. When the queue reaches ``capacity`` the overflow policy
+    applies:
+
+    - ``block``: put() waits for room (backpressure onto the stream)
+    - ``drop_oldest``: the oldest queued message is discarded
+    - ``spill``: messages are serialized to a temporary file and handled,
+      in order, after the in-memory queue drains
+    """
+
+    def __init__(
+        self,
+        handler: Callable,
+        capacity: int = 10000,
+        overflow: str = "block",
+        spill_dir: Optional[str] = None,
+        stats_interval: float = 0.0,
+        name: str = "pipeline"
+    ):
+        if capacity <= 0:
+            raise ValueError("Pipeline capacity must be positive")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy: {overflow}. "
+                f"Supported policies: {'|'.join(OVERFLOW_POLICIES)}"
+            )
+        self.handler = handler
+        self.capacity = capacity
+        self.overflow = overflow
+        self.spill_dir = spill_dir
+        self.stats_interval = stats_interval
+        self.name = name
+
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._spill: Optional[_SpillFile] = None
+        self._message_types: Dict[str, type] = {}
+        self._stats = PipelineStats()
+        self._worker: Optional[threading.Thread] = None
+        self._last_stats_log = time.monotonic()
+
+    def start(self) -> "MessagePipeline":
+        """Start the worker thread."""
+        self._worker = threading.Thread(target=self._run, name=f"{self.name}-worker", daemon=True)
+        self._worker.start()
+        return self
+
+    def put(self, msg) -> None:
+        """Enqueue a message, applying the overflow policy when full."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Pipeline {self.name} is closed")
+            stats = self._stats
+            stats.received += 1
+
+            # Keep FIFO order: once spilling, later messages queue up behind the spill
+            if self._spill is not None and self._spill.pending:
+                self._spill_message(msg)
+                return
+
+            if len(self._queue) >= self.capacity:
+                if self.overflow == "block":
+                    while len(self._queue) >= self.capacity and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        raise RuntimeError(f"Pipeline {self.name} is closed")
+                elif self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    stats.dropped += 1
+                else:
+                    self._spill_message(msg)
+                    return
+
+            self._queue.append(msg)
+            depth = len(self._queue)
+            if depth > stats.max_depth:
+                stats.max_depth = depth
+            self._cond.notify_all()
+
+    def close(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        """
+        Stop accepting messages and stop the worker.
+
+        Args:
+            drain: Handle everything already queued (and spilled) first
+            timeout: Seconds to wait for the worker to finish
+        """
+        with self._cond:
+            self._closed = True
+            if not drain:
+                self._stats.dropped += len(self._queue)
+                self._queue.clear()
+                if self._spill is not None:
+                    self._stats.dropped += self._spill.pending
+                    self._spill.pending = 0
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        with self._cond:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+        self._log_stats()
+
+    def stats(self) -> PipelineStats:
+        """Return a snapshot of the pipeline counters."""
+        with self._cond:
+            snapshot = PipelineStats(**vars(self._stats))
+            snapshot.depth = len(self._queue)
+            snapshot.spill_depth = self._spill.pending if self._spill is not None else 0
+        return snapshot
+
+    def __enter__(self) -> "MessagePipeline":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Drain on normal exit; on Ctrl+C don't wait for a backlog
+        self.close(drain=exc_type is None)
+
+    def _spill_message(self, msg) -> None:
+        """Serialize a message to the spill file (caller holds the lock)."""
+        if self._spill is None:
+            self._spill = _SpillFile(self.spill_dir, self.name)
+            logger.warning(f"Pipeline {self.name} full, spilling to {self._spill.path}")
+        type_name = msg.DESCRIPTOR.full_name
+        self._message_types[type_name] = type(msg)
+        self._spill.append(type_name, msg.SerializeToString())
+        self._stats.spilled += 1
+        self._cond.notify_all()
+
+    def _next_item(self):
+        """Wait for the next message; returns None once closed and drained."""
+        with self._cond:
+            while not self._queue and not (self._spill and self._spill.pending) and not self._closed:
+                self._cond.wait(self.stats_interval or None)
+                self._maybe_log_stats()
+            if self._queue:
+                msg = self._queue.popleft()
+                self._cond.notify_all()
+                return msg
+            if self._spill is not None and self._spill.pending:
+                type_name, payload = self._spill.pop()
+                return self._message_types[type_name].FromString(payload)
+            return None
+
+    def _run(self) -> None:
+        """Worker loop: hand each message to the handler."""
+        while True:
+            msg = self._next_item()
+            if msg is None:
+                break
+            try:
+                self.handler(msg)
+            except Exception as e:
+                self._stats.errors += 1
+                logger.error(f"Pipeline {self.name}: error processing message: {e}")
+            self._stats.processed += 1
+            if self.stats_interval:
+                self._maybe_log_stats()
+
+    def _maybe_log_stats(self) -> None:
+        if self.stats_interval and time.monotonic() - self._last_stats_log >= self.stats_interval:
+            self._log_stats()
+
+    def _log_stats(self) -> None:
+        self._last_stats_log = time.monotonic()
+        stats = self._stats
+        spill_depth = self._spill.pending if self._spill is not None else 0
+        logger.info(
+            f"Pipeline {self.name}: depth={len(self._queue)} max_depth={stats.max_depth} "
+            f"received={stats.received} processed={stats.processed} dropped={stats.dropped} "
+            f"spilled={stats.spilled} spill_depth={spill_depth} errors={stats.errors}"
+        )
@@ -0,0 +1,258 @@
+"""
+Latest pool reserves maintained from the DEX pools stream.
+"""
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from currencies import decimal_scale
+from encoding import b58decode, b58encode
+
+
+logger = logging.getLogger(__name__)
+
+
+_SNAPSHOT_MAGIC = b"CCPOOL02"
+# magic, pool count
+_SNAPSHOT_HEADER = struct.Struct("<8sQ")
+# market, base mint, quote mint (32-byte public keys), base reserve, quote
+# reserve, base decimals, quote decimals, slot
+_SNAPSHOT_ENTRY = struct.Struct("<32s32s32sQQIIQ")
+# Length of a public key; an unset mint is stored as zeros
+_KEY_SIZE = 32
+
+
+class PoolState:
+    """Latest known state of one pool; updated in place on every event."""
+
+    __slots__ = (
+        "market", "base_mint", "quote_mint", "base_decimals", "quote_decimals",
+        "base_reserve", "quote_reserve", "price", "slot", "updates",
+    )
+
+    def __init__(self, market: bytes):
+        self.market = market
+        self.base_mint = b""
+        self.quote_mint = b""
+        self.base_decimals = 0
+        self.quote_decimals = 0
+        self.base_reserve = 0
+        self.quote_reserve = 0
+        self.price = 0.0
+        self.slot = 0
+        self.updates = 0
+
+    def set_reserves(self, base_reserve: int, quote_reserve: int, slot: int) -> None:
+        self.base_reserve = base_reserve
+        self.quote_reserve = quote_reserve
+        self.slot = slot
+        self.updates += 1
+        # Quote per base, in whole tokens
+        base = base_reserve * decimal_scale(self.base_decimals)
+        if base:
+            self.price = quote_reserve * decimal_scale(self.quote_decimals) / base
+        else:
+            self.price = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "market": b58encode(self.market),
+            "base_mint": b58encode(self.base_mint),
+            "quote_mint": b58encode(self.quote_mint),
+            "base_reserve": self.base_reserve,
+            "quote_reserve": self.quote_reserve,
+            "price": self.price,
+            "slot": self.slot,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"PoolState({b58encode(self.market)}, base={self.base_reserve}, "
+            f"quote={self.quote_reserve}, price={self.price:.10g}, slot={self.slot})"
+        )
+
+
+MarketId = Union[bytes, str]
+
+
+class PoolStateStore:
+    """
+    Keeps the latest reserves, implied price and slot for each pool.
+
+    Fed with PoolLiquidityChangeStreamMessages. For each pool
+    (``Market.MarketAddress``), the store keeps ``BaseCurrency.PostAmount``
+    and ``QuoteCurrency.PostAmount`` from the newest event. The implied price
+    is quote per base, scaled by the market currencies' decimals. Events
+    older than the stored slot are ignored, and failed transactions are
+    skipped.
+
+    Lookups are a dict hit under a short lock, so they are consistent and
+    cheap from any thread. With ``snapshot_path`` set, the store is loaded
+    from that file on start. It is rewritten atomically every
+    ``snapshot_interval`` seconds when something changed, and again on
+    close(), so a restarted client has warm reserves before the first
+    event.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, snapshot_interval: float = 60.0):
+        self.pools: Dict[bytes, PoolState] = {}
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._lock = threading.Lock()
+        self.events = 0
+        # events at the last successful save
+        self._saved_events = 0
+        self.stale_events = 0
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                self.load(snapshot_path)
+            except ValueError as e:
+                # e.g. a snapshot from an older format; it is replaced on the next save
+                logger.warning(f"Ignoring pool state snapshot: {e}")
+
+        self._closed = threading.Event()
+        self._snapshotter: Optional[threading.Thread] = None
+        if snapshot_path and snapshot_interval > 0:
+            self._snapshotter = threading.Thread(target=self._snapshot_periodically, name="pool-snapshots", daemon=True)
+            self._snapshotter.start()
+
+    def update(self, msg) -> None:
+        """Apply one PoolLiquidityChangeStreamMessage."""
+        if not msg.Transaction.Status.Success:
+            return
+        event = msg.PoolEvent
+        market = event.Market
+        if not market.MarketAddress:
+            return
+        slot = msg.Block.Slot
+        with self._lock:
+            state = self.pools.get(market.MarketAddress)
+            if state is None:
+                state = self.pools[market.MarketAddress] = PoolState(market.MarketAddress)
+                state.base_mint = market.BaseCurrency.MintAddress
+                state.quote_mint = market.QuoteCurrency.MintAddress
+            elif slot < state.slot:
+                self.stale_events += 1
+                return
+            state.base_decimals = market.BaseCurrency.Decimals
+            state.quote_decimals = market.QuoteCurrency.Decimals
+            state.set_reserves(event.BaseCurrency.PostAmount, event.QuoteCurrency.PostAmount, slot)
+            self.events += 1
+
+    def _key(self, market: MarketId) -> bytes:
+        return b58decode(market) if isinstance(market, str) else market
+
+    def get(self, market: MarketId) -> Optional[PoolState]:
+        """The live state object of a pool (mutated by later events)."""
+        return self.pools.get(self._key(market))
+
+    def reserves(self, market: MarketId) -> Optional[Tuple[int, int, int]]:
+        """(base reserve, quote reserve, slot) of a pool, read consistently."""
+        key = self._key(market)
+        with self._lock:
+            state = self.pools.get(key)
+            if state is None:
+                return None
+            return state.base_reserve, state.quote_reserve, state.slot
+
+    def price(self, market: MarketId) -> Optional[float]:
+        """Implied price (quote per base) of a pool."""
+        state = self.pools.get(self._key(market))
+        return state.price if state is not None else None
+
+    def __len__(self) -> int:
+        return len(self.pools)
+
+    def __iter__(self) -> Iterator[PoolState]:
+        with self._lock:
+            states = list(self.pools.values())
+        return iter(states)
+
+    @property
+    def dirty(self) -> bool:
+        """True if events were applied since the last successful save."""
+        return self.events != self._saved_events
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Write a snapshot atomically (temp file + rename).
+
+        Pools whose market is not a 32-byte key, or whose mints are neither
+        unset nor 32 bytes, are left out rather than padded or truncated.
+        """
+        path = path or self.snapshot_path
+        skipped = 0
+        with self._lock:
+            events = self.events
+            entries = []
+            for s in self.pools.values():
+                if (len(s.market) != _KEY_SIZE or len(s.base_mint) not in (0, _KEY_SIZE)
+                        or len(s.quote_mint) not in (0, _KEY_SIZE)):
+                    skipped += 1
+                    continue
+                entries.append(_SNAPSHOT_ENTRY.pack(
+                    s.market, s.base_mint, s.quote_mint, s.base_reserve, s.quote_reserve,
+                    s.base_decimals, s.quote_decimals, s.slot
+                ))
+        if skipped:
+            logger.warning(f"Left {skipped} pools with malformed addresses out of the snapshot")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, len(entries)))
+            f.write(b''.join(entries))
+        os.replace(tmp_path, path)
+        self._saved_events = events
+        logger.debug(f"Saved {len(entries)} pool states to {path}")
+
+    def load(self, path: Optional[str] = None) -> int:
+        """Load a snapshot, keeping newer in-memory states; returns the pool count."""
+        path = path or self.snapshot_path
+        started = time.monotonic()
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, count = _SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != _SNAPSHOT_MAGIC or len(data) != _SNAPSHOT_HEADER.size + count * _SNAPSHOT_ENTRY.size:
+            raise ValueError(f"{path} is not a pool state snapshot")
+        with self._lock:
+            for market, base_mint, quote_mint, base_reserve, quote_reserve, base_decimals, quote_decimals, slot \
+                    in _SNAPSHOT_ENTRY.iter_unpack(data[_SNAPSHOT_HEADER.size:]):
+                current = self.pools.get(market)
+                if current is not None and current.slot >= slot:
+                    continue
+                state = PoolState(market)
+                state.base_mint = base_mint.rstrip(b"\0") and base_mint
+                state.quote_mint = quote_mint.rstrip(b"\0") and quote_mint
+                state.base_decimals = base_decimals
+                state.quote_decimals = quote_decimals
+                state.set_reserves(base_reserve, quote_reserve, slot)
+                state.updates = 0
+                self.pools[market] = state
+        logger.info(f"Loaded {count} pool states from {path} in {time.monotonic() - started:.3f}s")
+        return count
+
+    def _snapshot_periodically(self) -> None:
+        while not self._closed.wait(self.snapshot_interval):
+            if self.dirty:
+                try:
+                    self.save()
+                except (OSError, struct.error) as e:
+                    logger.error(f"Failed to save pool state snapshot: {e}")
+
+    def close(self) -> None:
+        """Stop periodic snapshots and write a final one."""
+        self._closed.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        if self.snapshot_path and self.dirty:
+            self.save()
+        logger.info(f"Pool state: {len(self.pools)} pools after {self.events} events ({self.stale_events} stale)")
+
+    def __enter__(self) -> "PoolStateStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,186 @@
+"""
+Process-pool fan-out that decodes and handles raw stream messages off the GIL.
+"""
+import collections
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Optional
+
+from handlers import resolve_handler
+from raw_stub import RPC_TYPES
+
+
+logger = logging.getLogger(__name__)
+
+
+# Per-worker state, set once by _init_worker
+_worker_message_type = None
+_worker_handler: Optional[Callable] = None
+
+_END_OF_STREAM = object()
+
+
+def _init_worker(rpc_name: str, handler_spec: str) -> None:
+    """Resolve the message type and handler once per worker process."""
+    global _worker_message_type, _worker_handler
+    # Shutdown is driven by the parent; don't inherit its interrupt handlers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _worker_message_type = RPC_TYPES[rpc_name][1]
+    _worker_handler = resolve_handler(handler_spec)
+
+
+def _process_batch(batch: List[bytes]) -> List[Any]:
+    """Decode and handle a batch of serialized messages inside a worker."""
+    results = []
+    for data in batch:
+        try:
+            results.append(_worker_handler(_worker_message_type.FromString(data)))
+        except Exception as e:
+            logger.error(f"Worker {os.getpid()}: error processing message: {e}")
+            results.append(None)
+    return results
+
+
+def write_result(result: Any, out=None) -> None:
+    """Default result sink: write handler output to out (default stdout) in order."""
+    if result is None:
+        return
+    out = out or sys.stdout
+    if isinstance(result, str):
+        out.write(result)
+    else:
+        out.write(f"{result}\n")
+
+
+class ProcessPoolFanout:
+    """
+    Hands batches of raw message bytes to a multiprocessing worker pool.
+
+    Workers run protobuf parsing and the user handler, so CPU-heavy streams
+    such as ``Transactions`` can use every core. Batches are collected in
+    submission order, so handler results reach ``on_result`` in the order
+    messages were received, which is slot order.
+
+    The handler is given as a spec string (see handlers.resolve_handler)
+    because it must be importable inside each worker. Whatever it returns is
+    passed to ``on_result`` in the parent process.
+    """
+
+    def __init__(
+        self,
+        rpc_name: str,
+        handler: str = "format",
+        workers: int = 0,
+        batch_size: int = 64,
+        max_batch_delay: float = 0.05,
+        max_pending_batches: int = 0,
+        on_result: Callable[[Any], None] = write_result
+    ):
+        if rpc_name not in RPC_TYPES:
+            raise ValueError(f"Unknown CoreCast RPC: {rpc_name}")
+        self.rpc_name = rpc_name
+        self.handler = handler
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_batch_delay = max_batch_delay
+        self.max_pending_batches = max_pending_batches or self.workers * 4
+        self.on_result = on_result
+        self.messages = 0
+        self.batches = 0
+
+    def run(self, raw_stream: Iterable[bytes]) -> None:
+        """Consume a raw byte stream until it ends, fanning work out to the pool."""
+        # The gRPC iterator is drained by a reader thread so that partial
+        # batches can still be flushed on a timer while the stream is idle
+        inbox: queue.Queue = queue.Queue(maxsize=self.batch_size * self.max_pending_batches)
+        reader_error: List[BaseException] = []
+
+        def read() -> None:
+            try:
+                for data in raw_stream:
+                    inbox.put(data)
+            except BaseException as e:
+                reader_error.append(e)
+            finally:
+                inbox.put(_END_OF_STREAM)
+
+        reader = threading.Thread(target=read, name=f"{self.rpc_name}-reader", daemon=True)
+        reader.start()
+
+        logger.info(
+            f"Processing {self.rpc_name} with {self.workers} worker processes "
+            f"(batch_size={self.batch_size}, handler={self.handler})"
+        )
+        # gRPC's internal threads make fork() unsafe once a channel exists
+        pool = multiprocessing.get_context("spawn").Pool(
+            self.workers, initializer=_init_worker, initargs=(self.rpc_name, self.handler)
+        )
+        pending = collections.deque()
+        completed = False
+        try:
+            batch: List[bytes] = []
+            batch_deadline = 0.0
+            while True:
+                if batch:
+                    timeout = max(0.0, batch_deadline - time.monotonic())
+                elif pending:
+                    # Poll so finished batches are emitted while the stream is quiet
+                    timeout = max(0.01, self.max_batch_delay)
+                else:
+                    timeout = None
+                try:
+                    item = inbox.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                    self._emit_ready(pending)
+                if item is _END_OF_STREAM:
+                    break
+                if item is not None:
+                    if not batch:
+                        batch_deadline = time.monotonic() + self.max_batch_delay
+                    batch.append(item)
+                    if len(batch) < self.batch_size:
+                        continue
+                if batch:
+                    self._submit(pool, pending, batch)
+                    batch = []
+            if batch:
+                self._submit(pool, pending, batch)
+            while pending:
+                self._emit(pending.popleft().get())
+            completed = True
+        finally:
+            if completed:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+            logger.info(f"Processed {self.messages} {self.rpc_name} messages in {self.batches} batches")
+
+        if reader_error:
+            raise reader_error[0]
+
+    def _submit(self, pool, pending: collections.deque, batch: List[bytes]) -> None:
+        """Submit a batch, first emitting finished results in order if at capacity."""
+        while len(pending) >= self.max_pending_batches:
+            self._emit(pending.popleft().get())
+        self._emit_ready(pending)
+        pending.append(pool.apply_async(_process_batch, (batch,)))
+        self.batches += 1
+        self.messages += len(batch)
+
+    def _emit_ready(self, pending: collections.deque) -> None:
+        """Emit the results of finished batches at the head of pending, in order."""
+        while pending and pending[0].ready():
+            self._emit(pending.popleft().get())
+
+    def _emit(self, results: List[Any]) -> None:
+        for result in results:
+            self.on_result(result)
@@ -0,0 +1,358 @@
+"""
+Per-stage timing and on-demand profile captures for the stream client.
+"""
+import cProfile
+import collections
+import itertools
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+# Stages timed for every message with stage timing on
+STAGES = ("decode", "filter", "handler")
+
+
+class StageStats:
+    """Call count and time of one stage of one stream. Written by a single thread."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, root: str = "") -> str:
+    """A frame and its callers as one collapsed-stack line, outermost first."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    if root:
+        names.append(root)
+    return ";".join(reversed(names))
+
+
+def write_collapsed(path: str, stacks: Iterable[Tuple[str, int]]) -> None:
+    """Write ``stack count`` lines, the input format of flamegraph.pl, speedscope and inferno."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        for stack, count in stacks:
+            f.write(f"{stack} {count}\n")
+    os.replace(tmp_path, path)
+
+
+class ProfileCapture:
+    """
+    One profiling window: stack samples, and optionally cProfile and allocation traces.
+
+    A background thread samples the stacks of every other thread each
+    ``sample_interval`` seconds until ``window`` seconds have passed or
+    stop() is called. It then writes the results next to ``prefix``:
+
+    - ``<prefix>.collapsed``: wall-clock stack samples, one root per thread
+    - ``<prefix>.pstats``: cProfile data for the sampled messages, if any
+    - ``<prefix>.alloc.collapsed``: bytes allocated in the window and still
+      held at its end, by allocation stack, when ``tracemalloc_frames`` > 0
+    - ``<prefix>.stages.txt``: stage times of the window, if stages are timed
+    """
+
+    def __init__(
+        self,
+        profiler: "StageProfiler",
+        prefix: str,
+        window: float = 30.0,
+        sample_interval: float = 0.005,
+        tracemalloc_frames: int = 0
+    ):
+        self.profiler = profiler
+        self.prefix = prefix
+        self.window = window
+        self.sample_interval = sample_interval
+        self.tracemalloc_frames = tracemalloc_frames
+        self.samples = 0
+        self._stacks: "collections.Counter[str]" = collections.Counter()
+        self._profiles: Dict[int, cProfile.Profile] = {}
+        self._stop = threading.Event()
+        self._started_tracemalloc = False
+        self._stages_at_start = profiler.snapshot()
+        self._thread = threading.Thread(target=self._run, name="profile-capture", daemon=True)
+
+    def start(self) -> None:
+        if self.tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            self._started_tracemalloc = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        """End the window early; the results are still written."""
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def profile(self) -> cProfile.Profile:
+        """The calling thread's cProfile profiler (cProfile profiles one thread at a time)."""
+        ident = threading.get_ident()
+        profile = self._profiles.get(ident)
+        if profile is None:
+            profile = self._profiles.setdefault(ident, cProfile.Profile())
+        return profile
+
+    def _sample(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                self._stacks[collapse_stack(frame, root=names.get(ident, str(ident)))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.window
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                self._sample()
+                self._stop.wait(self.sample_interval)
+        finally:
+            self.profiler._capture_finished(self)
+            try:
+                self._write()
+            except Exception as e:
+                logger.error(f"Failed to write profile {self.prefix}: {e}")
+            finally:
+                if self._started_tracemalloc:
+                    tracemalloc.stop()
+
+    def _write(self) -> None:
+        written = []
+        if self._started_tracemalloc:
+            # Taken first, and without the capture's own allocations
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__)])
+            allocations = []
+            for stat in snapshot.statistics("traceback"):
+                stack = ";".join(f"{os.path.basename(f.filename)}:{f.lineno}" for f in stat.traceback)
+                allocations.append((stack, stat.size))
+            written.append(self.prefix + ".alloc.collapsed")
+            write_collapsed(written[-1], allocations)
+
+        written.append(self.prefix + ".collapsed")
+        write_collapsed(written[-1], self._stacks.most_common())
+
+        profiles = list(self._profiles.values())
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            written.append(self.prefix + ".pstats")
+            stats.dump_stats(written[-1])
+
+        if self.profiler.stats:
+            written.append(self.prefix + ".stages.txt")
+            with open(written[-1], "w") as f:
+                f.write(self.profiler.report(since=self._stages_at_start) + "\n")
+        logger.info(f"Profile capture ({self.samples} samples) written to {', '.join(written)}")
+
+
+class StageProfiler:
+    """
+    On-demand profile captures, and timing of the decode, filter and
+    handler stages of each stream type.
+
+    start_capture() opens a ProfileCapture window; install_signal() lets a
+    signal (SIGUSR1 by default) start one, or end the running one early.
+    Captures sample stacks from their own thread, so they need nothing
+    from the stream code and cost nothing between captures.
+
+    timed() wraps a stage function. Each call adds to the stage's
+    StageStats and is passed to every hook as ``hook(stream, stage,
+    seconds)``. The client only wraps stages when stage timing is on.
+    During a capture with ``cprofile_every`` N > 0, every Nth call of each
+    timed stage runs under cProfile. One call is profiled at a time (on
+    Python 3.12+ a profiler is process-wide), so a sample that would
+    overlap another is skipped.
+    """
+
+    def __init__(
+        self,
+        directory: str = ".",
+        window: float = 30.0,
+        sample_interval: float = 0.005,
+        cprofile_every: int = 0,
+        tracemalloc_frames: int = 0
+    ):
+        self.directory = directory
+        self.window = window
+        self.sample_interval = sample_interval
+        self.cprofile_every = cprofile_every
+        self.tracemalloc_frames = tracemalloc_frames
+        self.stats: Dict[Tuple[str, str], StageStats] = {}
+        self.hooks: List[Callable[[str, str, float], None]] = []
+        self.capture: Optional[ProfileCapture] = None
+        self._lock = threading.Lock()
+        # Held while a stage call runs under cProfile
+        self._cprofile_lock = threading.Lock()
+        # Numbers captures, so two started within one second get distinct files
+        self._capture_ids = itertools.count(1)
+        self._signal: Optional[int] = None
+        self._previous_handler = None
+
+    def add_hook(self, hook: Callable[[str, str, float], None]) -> None:
+        """Call hook(stream, stage, seconds) after every timed stage call."""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[str, str, float], None]) -> None:
+        self.hooks.remove(hook)
+
+    def _stage(self, stream: str, stage: str) -> StageStats:
+        key = (stream, stage)
+        stats = self.stats.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self.stats.setdefault(key, StageStats())
+        return stats
+
+    def timed(self, stream: str, stage: str, func: Callable) -> Callable:
+        """Wrap a one-argument stage function to time each call."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}. Supported stages: {'|'.join(STAGES)}")
+        stats = self._stage(stream, stage)
+        hooks = self.hooks
+        clock = time.perf_counter
+        every = self.cprofile_every
+        cprofile_lock = self._cprofile_lock
+        calls = 0
+
+        def run(msg):
+            nonlocal calls
+            started = clock()
+            try:
+                capture = self.capture if every > 0 else None
+                if capture is not None:
+                    calls += 1
+                    if calls % every == 0 and cprofile_lock.acquire(blocking=False):
+                        try:
+                            return capture.profile().runcall(func, msg)
+                        finally:
+                            cprofile_lock.release()
+                return func(msg)
+            finally:
+                elapsed = clock() - started
+                stats.add(elapsed)
+                for hook in hooks:
+                    hook(stream, stage, elapsed)
+        return run
+
+    def filtered(self, stream: str, accept: Callable, handler: Callable) -> Callable:
+        """A handler that times accept(msg) as the filter stage and passes accepted messages on."""
+        accept = self.timed(stream, "filter", accept)
+
+        def handle(msg) -> None:
+            if accept(msg):
+                handler(msg)
+        return handle
+
+    def snapshot(self) -> Dict[Tuple[str, str], Tuple[int, float]]:
+        """Current (count, total seconds) of every stage."""
+        return {key: (stats.count, stats.total) for key, stats in list(self.stats.items())}
+
+    def report(self, since: Optional[Dict[Tuple[str, str], Tuple[int, float]]] = None) -> str:
+        """Stage times as a table; with ``since``, only what happened after that snapshot."""
+        since = since or {}
+        lines = [f"{'stream':<14} {'stage':<8} {'calls':>10} {'total s':>10} {'mean us':>10} {'max us':>10}"]
+        for (stream, stage), stats in sorted(self.stats.items()):
+            start_count, start_total = since.get((stream, stage), (0, 0.0))
+            count = stats.count - start_count
+            total = stats.total - start_total
+            mean = total / count * 1e6 if count else 0.0
+            lines.append(
+                f"{stream:<14} {stage:<8} {count:>10} {total:>10.3f} {mean:>10.1f} {stats.max * 1e6:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def start_capture(self, window: Optional[float] = None) -> Optional[ProfileCapture]:
+        """Start a capture window unless one is running; returns the capture started."""
+        with self._lock:
+            if self.capture is not None:
+                return None
+            os.makedirs(self.directory, exist_ok=True)
+            prefix = os.path.join(
+                self.directory, f"{time.strftime('profile-%Y%m%d-%H%M%S')}-{next(self._capture_ids)}"
+            )
+            capture = ProfileCapture(
+                self,
+                prefix,
+                window=window or self.window,
+                sample_interval=self.sample_interval,
+                tracemalloc_frames=self.tracemalloc_frames
+            )
+            self.capture = capture
+        logger.info(f"Profiling for {capture.window}s into {prefix}.*")
+        capture.start()
+        return capture
+
+    def stop_capture(self, wait: bool = False) -> None:
+        """End the running capture early."""
+        capture = self.capture
+        if capture is not None:
+            capture.stop()
+            if wait:
+                capture.join()
+
+    def toggle_capture(self) -> None:
+        """Start a capture, or end the running one."""
+        if self.capture is None:
+            self.start_capture()
+        else:
+            self.stop_capture()
+
+    def _capture_finished(self, capture: ProfileCapture) -> None:
+        with self._lock:
+            if self.capture is capture:
+                self.capture = None
+
+    def install_signal(self, name: str = "SIGUSR1") -> bool:
+        """Toggle captures on the named signal; False if unavailable here."""
+        signum = getattr(signal, name, None)
+        if signum is None:
+            logger.warning(f"Signal {name} is not available; profile captures must be started in code")
+            return False
+        try:
+            self._previous_handler = signal.signal(signum, lambda signum, frame: self.toggle_capture())
+        except ValueError:
+            logger.warning(f"Cannot install a {name} handler outside the main thread")
+            return False
+        self._signal = signum
+        logger.info(f"Send {name} to PID {os.getpid()} to capture a {self.window}s profile")
+        return True
+
+    def close(self) -> None:
+        """Restore the signal handler and finish a running capture."""
+        if self._signal is not None:
+            signal.signal(self._signal, self._previous_handler or signal.SIG_DFL)
+            self._signal = None
+        self.stop_capture(wait=True)
@@ -1,79 +1,423 @@
 """
 Utility functions for working with protobuf messages.
 """
-import base58
+import functools
+import json
+import operator
+import re
+import sys
+
 from google.protobuf.descriptor import FieldDescriptor
 
+from encoding import b58encode, b58encode_many, encode_bytes, encode_bytes_many
+
+
+# One dotted-path segment: a field name with an optional [*] or [N] selector
+_PATH_SEGMENT = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*)(?:\[(\*|\d+)\])?$')
+
 
-def print_protobuf_message(msg, indent=0, encoding="base58"):
+def print_protobuf_message(msg, indent=0, encoding="base58", out=None, renderers=None):
     """
     Debug helper to dump any protobuf message in a readable format.
     
+    The whole message is rendered first and written with a single call.
+    
     Args:
         msg: The protobuf message to print
         indent: Current indentation level for nested structures
         encoding: Encoding for bytes fields ("base58" or "hex")
+        out: Writer with a write(str) method (default: sys.stdout)
+        renderers: Optional MessageRenderers for sub-message fields
     """
-    prefix = " " * indent
-    for field in msg.DESCRIPTOR.fields:
-        value = getattr(msg, field.name)
-        if field.label == FieldDescriptor.LABEL_REPEATED:
-            if not value:
-                continue
-            print(f"{prefix}{field.name} (repeated):")
-            for idx, item in enumerate(value):
-                if field.type == FieldDescriptor.TYPE_MESSAGE:
-                    print(f"{prefix}  [{idx}]:")
-                    print_protobuf_message(item, indent + 4, encoding)
-                elif field.type == FieldDescriptor.TYPE_BYTES:
-                    if encoding == "base58":
-                        s = base58.b58encode(item).decode()
-                    else:
-                        s = item.hex()
-                    print(f"{prefix}  [{idx}]: {s}")
-                else:
-                    print(f"{prefix}  [{idx}]: {item}")
+    lines = []
+    plan = _text_plan(msg.DESCRIPTOR, encoding, renderers or _DEFAULT_RENDERERS)
+    _run_text_plan(plan, msg, " " * indent, lines.append)
+    if lines:
+        (out or sys.stdout).write("\n".join(lines) + "\n")
 
-        elif field.type == FieldDescriptor.TYPE_MESSAGE:
-            if msg.HasField(field.name):
-                print(f"{prefix}{field.name}:")
-                print_protobuf_message(value, indent + 4, encoding)
 
-        elif field.type == FieldDescriptor.TYPE_BYTES:
-            s = base58.b58encode(value).decode() if encoding == "base58" else value.hex()
-            print(f"{prefix}{field.name}: {s}")
+def message_to_dict(msg, encoding="base58", renderers=None):
+    """
+    Convert a protobuf message to a plain dict (bytes fields encoded as strings).
+    
+    Unset sub-messages, empty repeated fields and unselected oneof members
+    are omitted; scalar fields are always present.
+    
+    Args:
+        msg: The protobuf message
+        encoding: Encoding for bytes fields ("base58" or "hex")
+        renderers: Optional MessageRenderers for sub-message fields
+        
+    Returns:
+        Dictionary of field names to JSON-compatible values
+    """
+    return _run_dict_plan(_dict_plan(msg.DESCRIPTOR, encoding, renderers or _DEFAULT_RENDERERS), msg)
+
+
+def message_to_json(msg, encoding="base58", indent=None, renderers=None):
+    """
+    Serialize a protobuf message to a JSON string.
+    
+    Args:
+        msg: The protobuf message
+        encoding: Encoding for bytes fields ("base58" or "hex")
+        indent: Passed through to json.dumps
+        renderers: Optional MessageRenderers for sub-message fields
+        
+    Returns:
+        JSON representation of message_to_dict(msg, encoding)
+    """
+    return json.dumps(message_to_dict(msg, encoding, renderers), indent=indent)
 
-        elif field.containing_oneof:
-            if msg.WhichOneof(field.containing_oneof.name) == field.name:
-                print(f"{prefix}{field.name} (oneof): {value}")
 
+class MessageRenderers:
+    """
+    Caching renderers for sub-message fields of chosen types.
+    
+    A renderer provides text_lines(msg, encoding), returning unindented
+    lines, and to_dict(msg, encoding). Sub-message fields of its type are
+    rendered through it, other fields field by field. Pass an instance to
+    print_protobuf_message, format_protobuf_message or message_to_dict;
+    callers that don't are unaffected.
+    
+    Formatting plans (per message type, an ordered list of field handlers
+    built once from the descriptor and reused for every message of that
+    type) are cached per instance, keyed by (descriptor full_name, encoding).
+    
+    Args:
+        renderers: Mapping of message full_name (e.g.
+            "solana_messages.Currency") to its renderer
+    """
+    
+    def __init__(self, renderers=None):
+        self.renderers = dict(renderers or {})
+        self.text_plans = {}
+        self.dict_plans = {}
+
+
+# Plain field-by-field rendering, used when no renderers are passed
+_DEFAULT_RENDERERS = MessageRenderers()
+
+
+def _bytes_encoder(encoding):
+    """Return (single, many) encoders for bytes fields."""
+    if encoding == "base58":
+        return b58encode, b58encode_many
+    return bytes.hex, lambda values: [v.hex() for v in values]
+
+
+def _plan_key(descriptor, encoding):
+    return descriptor.full_name, "base58" if encoding == "base58" else "hex"
+
+
+def _text_plan(descriptor, encoding, renderers):
+    """Return the cached text plan for a message type, building it on first use."""
+    key = _plan_key(descriptor, encoding)
+    plan = renderers.text_plans.get(key)
+    if plan is None:
+        plan = [_text_field_handler(field, key[1], renderers) for field in descriptor.fields]
+        renderers.text_plans[key] = plan
+    return plan
+
+
+def _run_text_plan(plan, msg, prefix, emit):
+    for handle in plan:
+        handle(msg, prefix, emit)
+
+
+def _text_field_handler(field, encoding, renderers):
+    """Build the handler that renders one field as text lines via emit(line)."""
+    name = field.name
+    encode, encode_many = _bytes_encoder(encoding)
+    
+    if field.is_repeated:
+        header = f"{name} (repeated):"
+        if field.type == FieldDescriptor.TYPE_MESSAGE:
+            sub_descriptor = field.message_type
+            
+            def handle(msg, prefix, emit):
+                items = getattr(msg, name)
+                if not items:
+                    return
+                emit(prefix + header)
+                plan = _text_plan(sub_descriptor, encoding, renderers)
+                nested = prefix + "    "
+                for idx, item in enumerate(items):
+                    emit(f"{prefix}  [{idx}]:")
+                    _run_text_plan(plan, item, nested, emit)
+            return handle
+        
+        field_is_bytes = field.type == FieldDescriptor.TYPE_BYTES
+        
+        def handle(msg, prefix, emit):
+            items = getattr(msg, name)
+            if not items:
+                return
+            emit(prefix + header)
+            if field_is_bytes:
+                items = encode_many(items)
+            for idx, item in enumerate(items):
+                emit(f"{prefix}  [{idx}]: {item}")
+        return handle
+    
+    if field.type == FieldDescriptor.TYPE_MESSAGE:
+        sub_descriptor = field.message_type
+        header = f"{name}:"
+        renderer = renderers.renderers.get(sub_descriptor.full_name)
+        if renderer is not None:
+            text_lines = renderer.text_lines
+            
+            def handle(msg, prefix, emit):
+                if msg.HasField(name):
+                    emit(prefix + header)
+                    nested = prefix + "    "
+                    for line in text_lines(getattr(msg, name), encoding):
+                        emit(nested + line)
+            return handle
+        
+        def handle(msg, prefix, emit):
+            if msg.HasField(name):
+                emit(prefix + header)
+                _run_text_plan(_text_plan(sub_descriptor, encoding, renderers), getattr(msg, name), prefix + "    ", emit)
+        return handle
+    
+    if field.type == FieldDescriptor.TYPE_BYTES:
+        def handle(msg, prefix, emit):
+            emit(f"{prefix}{name}: {encode(getattr(msg, name))}")
+        return handle
+    
+    if field.containing_oneof:
+        oneof_name = field.containing_oneof.name
+        
+        def handle(msg, prefix, emit):
+            if msg.WhichOneof(oneof_name) == name:
+                emit(f"{prefix}{name} (oneof): {getattr(msg, name)}")
+        return handle
+    
+    def handle(msg, prefix, emit):
+        emit(f"{prefix}{name}: {getattr(msg, name)}")
+    return handle
+
+
+def _dict_plan(descriptor, encoding, renderers):
+    """Return the cached dict plan for a message type, building it on first use."""
+    key = _plan_key(descriptor, encoding)
+    plan = renderers.dict_plans.get(key)
+    if plan is None:
+        plan = [_dict_field_handler(field, key[1], renderers) for field in descriptor.fields]
+        renderers.dict_plans[key] = plan
+    return plan
+
+
+def _run_dict_plan(plan, msg):
+    out = {}
+    for handle in plan:
+        handle(msg, out)
+    return out
+
+
+def _dict_field_handler(field, encoding, renderers):
+    """Build the handler that stores one field into an output dict."""
+    name = field.name
+    encode, encode_many = _bytes_encoder(encoding)
+    
+    if field.is_repeated:
+        if field.type == FieldDescriptor.TYPE_MESSAGE:
+            sub_descriptor = field.message_type
+            
+            def handle(msg, out):
+                items = getattr(msg, name)
+                if items:
+                    plan = _dict_plan(sub_descriptor, encoding, renderers)
+                    out[name] = [_run_dict_plan(plan, item) for item in items]
+        elif field.type == FieldDescriptor.TYPE_BYTES:
+            def handle(msg, out):
+                items = getattr(msg, name)
+                if items:
+                    out[name] = encode_many(items)
         else:
-            print(f"{prefix}{field.name}: {value}")
+            def handle(msg, out):
+                items = getattr(msg, name)
+                if items:
+                    out[name] = list(items)
+        return handle
+    
+    if field.type == FieldDescriptor.TYPE_MESSAGE:
+        sub_descriptor = field.message_type
+        renderer = renderers.renderers.get(sub_descriptor.full_name)
+        if renderer is not None:
+            to_dict = renderer.to_dict
+            
+            def handle(msg, out):
+                if msg.HasField(name):
+                    out[name] = to_dict(getattr(msg, name), encoding)
+            return handle
+        
+        def handle(msg, out):
+            if msg.HasField(name):
+                out[name] = _run_dict_plan(_dict_plan(sub_descriptor, encoding, renderers), getattr(msg, name))
+        return handle
+    
+    convert = encode if field.type == FieldDescriptor.TYPE_BYTES else None
+    if field.containing_oneof:
+        oneof_name = field.containing_oneof.name
+        
+        def handle(msg, out):
+            if msg.WhichOneof(oneof_name) == name:
+                value = getattr(msg, name)
+                out[name] = convert(value) if convert else value
+        return handle
+    
+    if convert:
+        def handle(msg, out):
+            out[name] = convert(getattr(msg, name))
+        return handle
+    
+    def handle(msg, out):
+        out[name] = getattr(msg, name)
+    return handle
 
 
-def format_protobuf_message(msg, encoding="base58"):
+def format_protobuf_message(msg, encoding="base58", renderers=None):
     """
     Format a protobuf message as a string instead of printing it.
     
     Args:
         msg: The protobuf message to format
         encoding: Encoding for bytes fields ("base58" or "hex")
+        renderers: Optional MessageRenderers for sub-message fields
         
     Returns:
         Formatted string representation of the message
     """
-    import io
-    import sys
+    lines = []
+    plan = _text_plan(msg.DESCRIPTOR, encoding, renderers or _DEFAULT_RENDERERS)
+    _run_text_plan(plan, msg, "", lines.append)
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class FieldPath:
+    """
+    Accessor for a dotted field path, validated against a message descriptor.
     
-    # Capture print output
-    old_stdout = sys.stdout
-    sys.stdout = captured_output = io.StringIO()
+    Build instances with compile_field_path() so they are cached. Runs of
+    plain segments are resolved with a single operator.attrgetter, so a path
+    without selectors costs one C-level call per message. A ``[*]``
+    selector fans out over a repeated field and makes the result a flat
+    list; ``[N]`` picks one element (None if out of range).
+    """
     
-    try:
-        print_protobuf_message(msg, encoding=encoding)
-        return captured_output.getvalue()
-    finally:
-        sys.stdout = old_stdout
+    def __init__(self, descriptor, path: str):
+        self.descriptor = descriptor
+        self.path = path
+        self._steps = self._compile(descriptor, path)
+        self._fans_out = any(kind == '*' for kind, _ in self._steps)
+    
+    @staticmethod
+    def _compile(descriptor, path: str) -> list:
+        """
+        Resolve the path into steps of ('get', attrgetter), ('*', None) or
+        ('index', N).
+        
+        Raises:
+            ValueError: If the path does not match the descriptor
+        """
+        if not path:
+            raise ValueError("Empty field path")
+        
+        steps = []
+        pending = []  # plain field names not yet folded into an attrgetter
+        current = descriptor
+        segments = path.split('.')
+        for position, segment in enumerate(segments):
+            match = _PATH_SEGMENT.match(segment)
+            if not match:
+                raise ValueError(f"Invalid segment '{segment}' in field path '{path}'")
+            if current is None:
+                raise ValueError(
+                    f"Field path '{path}' continues past scalar field '{segments[position - 1]}'"
+                )
+            name, selector = match.groups()
+            field = current.fields_by_name.get(name)
+            if field is None:
+                raise ValueError(f"{current.full_name} has no field '{name}' (path '{path}')")
+            
+            is_last = position == len(segments) - 1
+            repeated = field.is_repeated
+            if selector is not None and not repeated:
+                raise ValueError(f"Selector [{selector}] used on non-repeated field '{name}' in '{path}'")
+            if repeated and selector is None and not is_last:
+                raise ValueError(f"Repeated field '{name}' needs [*] or [N] in field path '{path}'")
+            
+            pending.append(name)
+            if selector is not None:
+                steps.append(('get', operator.attrgetter('.'.join(pending))))
+                pending = []
+                steps.append(('*', None) if selector == '*' else ('index', int(selector)))
+            
+            current = field.message_type if field.type == FieldDescriptor.TYPE_MESSAGE else None
+        
+        if pending:
+            steps.append(('get', operator.attrgetter('.'.join(pending))))
+        return steps
+    
+    def __call__(self, msg):
+        """Return the value at the path, or a list of values if it has [*]."""
+        if not self._fans_out:
+            value = msg
+            for kind, arg in self._steps:
+                if kind == 'get':
+                    value = arg(value)
+                elif arg < len(value):
+                    value = value[arg]
+                else:
+                    return None
+            return value
+        return self._collect(msg, 0, [])
+    
+    def _collect(self, value, step_index: int, out: list) -> list:
+        """Walk the remaining steps, fanning out at each [*]."""
+        steps = self._steps
+        while step_index < len(steps):
+            kind, arg = steps[step_index]
+            step_index += 1
+            if kind == 'get':
+                value = arg(value)
+            elif kind == 'index':
+                if arg >= len(value):
+                    return out
+                value = value[arg]
+            else:
+                if step_index == len(steps):
+                    out.extend(value)
+                else:
+                    for item in value:
+                        self._collect(item, step_index, out)
+                return out
+        out.append(value)
+        return out
+    
+    def __repr__(self) -> str:
+        return f"FieldPath({self.descriptor.full_name}, {self.path!r})"
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_field_path(descriptor, field_path: str) -> FieldPath:
+    """
+    Compile (once) an accessor for a dotted field path.
+    
+    Args:
+        descriptor: Message descriptor the path starts from (msg.DESCRIPTOR)
+        field_path: Dot-separated path, e.g. "Trade.Buy.Currency.MintAddress"
+            or "Transaction.Header.Accounts[*].Address"
+        
+    Returns:
+        A cached FieldPath; call it with a message to read the value
+        
+    Raises:
+        ValueError: If the path is malformed or does not match the descriptor
+    """
+    return FieldPath(descriptor, field_path)
 
 
 def get_protobuf_field_value(msg, field_path):
@@ -82,31 +426,17 @@ def get_protobuf_field_value(msg, field_path):
     
     Args:
         msg: The protobuf message
-        field_path: Dot-separated field path (e.g., "header.block_height")
+        field_path: Dot-separated field path (e.g., "header.block_height").
+            Repeated fields accept [*] (all elements) or [N] (one element).
         
     Returns:
         The field value, or None if not found
     """
-    fields = field_path.split('.')
-    current_msg = msg
-    
-    for field_name in fields:
-        if not hasattr(current_msg, field_name):
-            return None
-        
-        value = getattr(current_msg, field_name)
-        
-        # If this is the last field, return the value
-        if field_name == fields[-1]:
-            return value
-        
-        # Otherwise, continue traversing
-        if hasattr(value, 'DESCRIPTOR'):
-            current_msg = value
-        else:
-            return None
-    
-    return None
+    try:
+        accessor = compile_field_path(msg.DESCRIPTOR, field_path)
+    except ValueError:
+        return None
+    return accessor(msg)
 
 
 def extract_bytes_fields(msg, encoding="base58"):
@@ -125,19 +455,10 @@ def extract_bytes_fields(msg, encoding="base58"):
     for field in msg.DESCRIPTOR.fields:
         if field.type == FieldDescriptor.TYPE_BYTES:
             value = getattr(msg, field.name)
-            if field.label == FieldDescriptor.LABEL_REPEATED:
+            if field.is_repeated:
                 if value:
-                    encoded_values = []
-                    for item in value:
-                        if encoding == "base58":
-                            encoded_values.append(base58.b58encode(item).decode())
-                        else:
-                            encoded_values.append(item.hex())
-                    bytes_fields[field.name] = encoded_values
+                    bytes_fields[field.name] = encode_bytes_many(value, encoding)
             else:
-                if encoding == "base58":
-                    bytes_fields[field.name] = base58.b58encode(value).decode()
-                else:
-                    bytes_fields[field.name] = value.hex()
+                bytes_fields[field.name] = encode_bytes(value, encoding)
     
     return bytes_fields
@@ -0,0 +1,38 @@
+"""
+CoreCast stub variant that returns serialized response bytes instead of messages.
+"""
+from proto import request_pb2, stream_message_pb2
+
+
+# Request and response message types for each CoreCast RPC
+RPC_TYPES = {
+    "DexTrades": (request_pb2.SubscribeTradesRequest, stream_message_pb2.DexTradeStreamMessage),
+    "DexOrders": (request_pb2.SubscribeOrdersRequest, stream_message_pb2.DexOrderStreamMessage),
+    "DexPools": (request_pb2.SubscribePoolsRequest, stream_message_pb2.PoolLiquidityChangeStreamMessage),
+    "Transactions": (request_pb2.SubscribeTransactionsRequest, stream_message_pb2.ParsedTransactionStreamMessage),
+    "Transfers": (request_pb2.SubscribeTransfersRequest, stream_message_pb2.TransferStreamMessage),
+    "Balances": (request_pb2.SubscribeBalanceUpdateRequest, stream_message_pb2.BalanceUpdateStreamMessage),
+}
+
+SERVICE_NAME = "solana_corecast.CoreCast"
+
+
+class RawCoreCastStub(object):
+    """
+    Same RPCs as corecast_pb2_grpc.CoreCastStub, but without a response
+    deserializer: each stream yields the message bytes exactly as received,
+    leaving decoding to the caller (or to another process).
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel or grpc.aio.Channel.
+        """
+        for rpc_name, (request_type, _) in RPC_TYPES.items():
+            setattr(self, rpc_name, channel.unary_stream(
+                f'/{SERVICE_NAME}/{rpc_name}',
+                request_serializer=request_type.SerializeToString,
+                response_deserializer=None,
+            ))
@@ -0,0 +1,238 @@
+"""
+Automatic stream reconnection with exponential backoff and slot gap tracking.
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterator, List, Optional
+
+import grpc
+
+from config import ReconnectConfig
+
+
+logger = logging.getLogger(__name__)
+
+
+# Status codes that will not be fixed by retrying the same request
+NON_RETRYABLE_CODES = frozenset({
+    grpc.StatusCode.UNAUTHENTICATED,
+    grpc.StatusCode.PERMISSION_DENIED,
+    grpc.StatusCode.INVALID_ARGUMENT,
+    grpc.StatusCode.UNIMPLEMENTED,
+})
+
+
+@dataclass
+class SlotGap:
+    """Data lost between a disconnect and the first message after reconnecting."""
+    last_slot: int
+    resumed_slot: int
+    slots_missed: int
+    seconds_disconnected: float
+
+
+class Backoff:
+    """Exponential backoff with jitter."""
+
+    def __init__(self, config: ReconnectConfig):
+        self.config = config
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        """Return the delay before the next attempt and advance the schedule."""
+        delay = min(
+            self.config.max_backoff,
+            self.config.initial_backoff * (self.config.multiplier ** self.attempt)
+        )
+        self.attempt += 1
+        # Spread reconnects out so many clients don't retry in lockstep
+        return delay * (1.0 - self.config.jitter * random.random())
+
+    def reset(self) -> None:
+        """Start again from the initial delay."""
+        self.attempt = 0
+
+
+class GapTracker:
+    """Records the last slot seen and measures gaps across reconnects."""
+
+    def __init__(self):
+        self.last_slot: Optional[int] = None
+        self.disconnected_at: Optional[float] = None
+        self.gaps: List[SlotGap] = []
+
+    def disconnected(self) -> None:
+        """Mark the stream as down (only the first call per outage counts)."""
+        if self.disconnected_at is None:
+            self.disconnected_at = time.monotonic()
+
+    def observe(self, slot: int) -> Optional[SlotGap]:
+        """
+        Record a received slot.
+
+        Returns:
+            A SlotGap if this is the first message after a disconnect,
+            otherwise None
+        """
+        gap = None
+        if self.disconnected_at is not None:
+            seconds = time.monotonic() - self.disconnected_at
+            self.disconnected_at = None
+            if self.last_slot is not None:
+                gap = SlotGap(
+                    last_slot=self.last_slot,
+                    resumed_slot=slot,
+                    slots_missed=max(0, slot - self.last_slot - 1),
+                    seconds_disconnected=seconds
+                )
+                self.gaps.append(gap)
+        if self.last_slot is None or slot > self.last_slot:
+            self.last_slot = slot
+        return gap
+
+    @property
+    def total_slots_missed(self) -> int:
+        return sum(gap.slots_missed for gap in self.gaps)
+
+
+def _block_slot(msg) -> int:
+    return msg.Block.Slot
+
+
+class StreamReconnector:
+    """
+    Re-opens a server stream whenever it fails or ends.
+
+    ``open_stream`` is called to start each attempt and must return a new
+    gRPC response iterator for the same subscription. ``slot_of`` extracts
+    the slot from a received item; by default it reads ``msg.Block.Slot``
+    from a decoded message. CoreCast streams do
+    not take a start slot, so a reconnect resumes at the live head; the
+    slots skipped meanwhile are reported as a SlotGap.
+
+    Slots are only read where a gap is measured: from the last message of
+    an attempt and the first message after a reconnect. Messages in
+    between pass through untouched, which keeps raw byte streams free of
+    per-message parsing.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        config: ReconnectConfig,
+        on_gap: Optional[Callable[[SlotGap], None]] = None,
+        slot_of: Optional[Callable[[object], int]] = None
+    ):
+        self.label = label
+        self.config = config
+        self.on_gap = on_gap
+        self.slot_of = slot_of or _block_slot
+        self.backoff = Backoff(config)
+        self.tracker = GapTracker()
+        self.reconnects = 0
+
+    def run(self, open_stream: Callable[[], Iterator]) -> Iterator:
+        """Yield messages from successive stream attempts."""
+        tracker = self.tracker
+        while True:
+            stream = open_stream()
+            msg = None
+            try:
+                for msg in stream:
+                    if tracker.disconnected_at is not None:
+                        self._on_resume(msg)
+                    yield msg
+                error = None
+            except grpc.RpcError as e:
+                error = e
+            finally:
+                cancel = getattr(stream, 'cancel', None)
+                if cancel:
+                    cancel()
+            delay = self._on_stream_end(error, msg)
+            if delay is None:
+                return
+            time.sleep(delay)
+
+    async def arun(self, open_stream: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """Async variant of run() for grpc.aio calls."""
+        tracker = self.tracker
+        while True:
+            call = open_stream()
+            msg = None
+            try:
+                async for msg in call:
+                    if tracker.disconnected_at is not None:
+                        self._on_resume(msg)
+                    yield msg
+                error = None
+            except grpc.RpcError as e:
+                error = e
+            finally:
+                call.cancel()
+            delay = self._on_stream_end(error, msg)
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+    def _on_resume(self, msg) -> None:
+        """Report the gap before the first message after a reconnect."""
+        # Data is flowing again, so the next outage starts a fresh schedule
+        self.backoff.reset()
+        gap = self.tracker.observe(self.slot_of(msg))
+        if gap is None:
+            return
+        logger.warning(
+            f"{self.label} stream resumed at slot {gap.resumed_slot}: "
+            f"missed {gap.slots_missed} slots after slot {gap.last_slot}, "
+            f"disconnected for {gap.seconds_disconnected:.1f}s"
+        )
+        if self.on_gap:
+            self.on_gap(gap)
+
+    def _on_stream_end(self, error: Optional[grpc.RpcError], last_msg=None) -> Optional[float]:
+        """
+        Decide whether to reconnect after a stream stops.
+
+        Args:
+            error: The error that ended the stream, if any
+            last_msg: The last message received on it, if any
+
+        Returns:
+            Seconds to wait before reconnecting, or None if the stream was
+            cancelled locally
+
+        Raises:
+            grpc.RpcError: If the error is not retryable or retries are
+                disabled or exhausted
+        """
+        if last_msg is not None:
+            self.tracker.observe(self.slot_of(last_msg))
+        code = error.code() if error is not None else None
+        if code == grpc.StatusCode.CANCELLED:
+            logger.debug(f"{self.label} stream cancelled")
+            return None
+        if error is not None and (not self.config.enabled or code in NON_RETRYABLE_CODES):
+            raise error
+        if not self.config.enabled:
+            logger.info(f"{self.label} stream ended by server")
+            return None
+
+        self.tracker.disconnected()
+        if self.config.max_attempts and self.backoff.attempt >= self.config.max_attempts:
+            logger.error(f"{self.label} stream: giving up after {self.backoff.attempt} reconnect attempts")
+            if error is not None:
+                raise error
+            return None
+
+        delay = self.backoff.next_delay()
+        self.reconnects += 1
+        reason = f"{code.name}: {error.details()}" if error is not None else "ended by server"
+        logger.warning(
+            f"{self.label} stream dropped ({reason}) after slot {self.tracker.last_slot}; "
+            f"reconnecting in {delay:.2f}s (attempt {self.backoff.attempt})"
+        )
+        return delay
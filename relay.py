@@ -0,0 +1,329 @@
+"""
+Local CoreCast relay: one upstream subscription per distinct request, shared by many local subscribers.
+"""
+import collections
+import itertools
+import logging
+import threading
+from concurrent import futures
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import grpc
+
+from client import BaseCoreCastClient, CHANNEL_OPTIONS
+from config import Config
+from raw_stub import RPC_TYPES, SERVICE_NAME, RawCoreCastStub
+from wire import read_slot
+
+
+logger = logging.getLogger(__name__)
+
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "disconnect")
+
+# (RPC name, deterministically serialized request)
+UpstreamKey = Tuple[str, bytes]
+
+
+class _Subscriber:
+    """
+    One local stream: a bounded buffer filled by the upstream thread and
+    drained by the subscriber's gRPC handler thread.
+
+    push() never blocks. When the buffer is full, ``drop_oldest`` discards
+    the oldest message and ``disconnect`` ends the stream with
+    RESOURCE_EXHAUSTED.
+    """
+
+    def __init__(self, peer: str, capacity: int, policy: str):
+        self.peer = peer
+        self.capacity = capacity
+        self.disconnect_slow = policy == "disconnect"
+        self._queue = collections.deque(maxlen=None if self.disconnect_slow else capacity)
+        self._ready = threading.Event()
+        self.closed = False
+        self.status: Optional[Tuple[grpc.StatusCode, str]] = None
+        self.sent = 0
+        self.dropped = 0
+
+    def push(self, data: bytes) -> None:
+        if self.closed:
+            return
+        queue = self._queue
+        if len(queue) >= self.capacity:
+            if self.disconnect_slow:
+                queue.clear()
+                self.close(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Subscriber fell {self.capacity} messages behind")
+                return
+            self.dropped += 1
+        queue.append(data)
+        if not self._ready.is_set():
+            self._ready.set()
+
+    def close(self, code: Optional[grpc.StatusCode] = None, details: str = "") -> None:
+        """End the stream once the buffer is drained, with an error status if code is given."""
+        if not self.closed:
+            if code is not None:
+                self.status = (code, details)
+            self.closed = True
+        self._ready.set()
+
+    def __iter__(self) -> Iterator[bytes]:
+        queue = self._queue
+        ready = self._ready
+        while True:
+            try:
+                data = queue.popleft()
+            except IndexError:
+                if self.closed:
+                    return
+                ready.clear()
+                # Re-check after clearing so a push in between is not missed
+                if not queue and not self.closed:
+                    ready.wait()
+                continue
+            self.sent += 1
+            yield data
+
+
+class _Upstream:
+    """One upstream subscription, read on its own thread and pushed to every subscriber."""
+
+    def __init__(self, relay: "CoreCastRelay", key: UpstreamKey, request, label: str):
+        self.relay = relay
+        self.key = key
+        self.rpc_name = key[0]
+        self.request = request
+        self.label = label
+        # Replaced, never mutated, so the reader thread iterates without a lock
+        self.subscribers: Tuple[_Subscriber, ...] = ()
+        self.received = 0
+        self.stopped = False
+        self.linger_timer: Optional[threading.Timer] = None
+        self._call: Optional[grpc.Call] = None
+        self._thread = threading.Thread(target=self._run, name=f"upstream-{label}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Cancel the upstream call; the reader thread then ends."""
+        self.stopped = True
+        call = self._call
+        if call is not None:
+            call.cancel()
+
+    def _open(self, rpc, metadata: List[tuple]) -> grpc.Call:
+        call = self._call = rpc(self.request, metadata=metadata)
+        if self.stopped:
+            # Stopped during a reconnect backoff; the cancelled call ends the reconnect loop
+            call.cancel()
+        return call
+
+    def _run(self) -> None:
+        relay = self.relay
+        rpc = getattr(relay.stub, self.rpc_name)
+        metadata = relay._create_metadata()
+        status = None
+        try:
+            stream = relay._reconnector(self.label, slot_of=read_slot).run(lambda: self._open(rpc, metadata))
+            for data in stream:
+                self.received += 1
+                for subscriber in self.subscribers:
+                    subscriber.push(data)
+        except grpc.RpcError as e:
+            logger.error(f"{self.label} failed: {e.code().name}: {e.details()}")
+            status = (e.code(), e.details())
+        except Exception as e:
+            logger.error(f"{self.label} failed: {e}")
+            status = (grpc.StatusCode.INTERNAL, str(e))
+        finally:
+            relay._upstream_ended(self, status)
+
+
+class CoreCastRelay(BaseCoreCastClient):
+    """
+    Serves the CoreCast service locally from shared upstream subscriptions.
+
+    Local subscribers call the usual CoreCast RPCs. Requests for the same
+    RPC with the same serialized request share one upstream stream, opened
+    with the relay's own token and reconnect settings. Its messages are
+    forwarded to every subscriber as received, without decoding. The
+    upstream is cancelled when its last subscriber leaves, after
+    ``linger`` seconds.
+
+    Each subscriber has its own buffer of ``capacity`` messages, so a slow
+    subscriber never holds back the upstream or other subscribers. When
+    a buffer is full, the ``slow_consumer`` policy applies: ``drop_oldest``
+    or ``disconnect``. Subscribers join a live stream and only receive
+    messages from then on. If the upstream fails, its subscribers get the
+    upstream's status.
+    """
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        relay_config = config.relay
+        if relay_config.slow_consumer not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"Unknown slow consumer policy: {relay_config.slow_consumer}. "
+                f"Supported policies: {'|'.join(SLOW_CONSUMER_POLICIES)}"
+            )
+        self.relay_config = relay_config
+        self.channel: Optional[grpc.Channel] = None
+        self.stub: Optional[RawCoreCastStub] = None
+        self.server: Optional[grpc.Server] = None
+        self._upstreams: Dict[UpstreamKey, _Upstream] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def connect(self) -> None:
+        """Open the upstream channel to the configured CoreCast server."""
+        credentials = self._channel_credentials()
+        logger.debug(f"Connecting to gRPC server: {self.config.server.address}")
+        if credentials is None:
+            self.channel = grpc.insecure_channel(self.config.server.address, options=CHANNEL_OPTIONS)
+        else:
+            self.channel = grpc.secure_channel(self.config.server.address, credentials, options=CHANNEL_OPTIONS)
+        self.stub = RawCoreCastStub(self.channel)
+        logger.debug("gRPC connection established")
+
+    def handler(self) -> grpc.GenericRpcHandler:
+        """Build the gRPC handler for the relayed CoreCast service."""
+        method_handlers = {
+            rpc_name: grpc.unary_stream_rpc_method_handler(
+                self._stream_method(rpc_name),
+                request_deserializer=request_type.FromString,
+                # Payloads are the upstream's serialized messages, sent as they are
+                response_serializer=None,
+            )
+            for rpc_name, (request_type, _) in RPC_TYPES.items()
+        }
+        return grpc.method_handlers_generic_handler(SERVICE_NAME, method_handlers)
+
+    def start(self) -> int:
+        """Start serving on relay.listen; returns the bound port."""
+        if self.stub is None:
+            raise RuntimeError("Relay not connected. Call connect() first.")
+        max_subscribers = self.relay_config.max_subscribers
+        # One handler thread per subscriber stream; extra streams are rejected, not queued
+        self.server = grpc.server(
+            futures.ThreadPoolExecutor(max_workers=max_subscribers, thread_name_prefix="relay"),
+            options=[('grpc.max_send_message_length', 64 * 1024 * 1024)],
+            maximum_concurrent_rpcs=max_subscribers
+        )
+        self.server.add_generic_rpc_handlers((self.handler(),))
+        port = self.server.add_insecure_port(self.relay_config.listen)
+        if not port:
+            raise RuntimeError(f"Could not bind relay to {self.relay_config.listen}")
+        self.server.start()
+        logger.info(
+            f"Relaying {self.config.server.address} on {self.relay_config.listen} "
+            f"(capacity={self.relay_config.capacity}, slow_consumer={self.relay_config.slow_consumer})"
+        )
+        return port
+
+    def wait_for_termination(self, timeout: Optional[float] = None) -> bool:
+        return self.server.wait_for_termination(timeout)
+
+    def close(self, grace: float = 1.0) -> None:
+        """Stop serving, cancel every upstream and close the channel."""
+        if self.server is not None:
+            self.server.stop(grace).wait()
+        with self._lock:
+            upstreams = list(self._upstreams.values())
+            self._upstreams.clear()
+        for upstream in upstreams:
+            if upstream.linger_timer is not None:
+                upstream.linger_timer.cancel()
+            upstream.stop()
+        if self.channel:
+            self.channel.close()
+            logger.debug("gRPC connection closed")
+
+    def stats(self) -> List[dict]:
+        """Per-upstream message counts and per-subscriber buffer state."""
+        with self._lock:
+            upstreams = list(self._upstreams.values())
+        return [
+            {
+                "upstream": upstream.label,
+                "received": upstream.received,
+                "subscribers": [
+                    {"peer": s.peer, "sent": s.sent, "dropped": s.dropped, "buffered": len(s._queue)}
+                    for s in upstream.subscribers
+                ],
+            }
+            for upstream in upstreams
+        ]
+
+    def _stream_method(self, rpc_name: str):
+        def stream(request, context) -> Iterator[bytes]:
+            subscriber = _Subscriber(context.peer(), self.relay_config.capacity, self.relay_config.slow_consumer)
+            # Wakes the handler thread when the subscriber goes away
+            context.add_callback(subscriber.close)
+            upstream = self._subscribe(rpc_name, request, subscriber)
+            try:
+                yield from subscriber
+            finally:
+                self._unsubscribe(upstream, subscriber)
+            if subscriber.status is not None:
+                context.abort(*subscriber.status)
+        return stream
+
+    def _subscribe(self, rpc_name: str, request, subscriber: _Subscriber) -> _Upstream:
+        """Attach a subscriber to the upstream for its request, opening one if needed."""
+        key = (rpc_name, request.SerializeToString(deterministic=True))
+        with self._lock:
+            upstream = self._upstreams.get(key)
+            if upstream is None:
+                upstream = self._upstreams[key] = _Upstream(self, key, request, f"{rpc_name} #{next(self._ids)}")
+                upstream.start()
+                logger.info(f"Opened upstream {upstream.label}: {request}")
+            elif upstream.linger_timer is not None:
+                upstream.linger_timer.cancel()
+                upstream.linger_timer = None
+            upstream.subscribers += (subscriber,)
+            count = len(upstream.subscribers)
+        logger.info(f"Subscriber {subscriber.peer} joined {upstream.label} ({count} subscribers)")
+        return upstream
+
+    def _unsubscribe(self, upstream: _Upstream, subscriber: _Subscriber) -> None:
+        """Detach a subscriber; the last one out stops the upstream (after the linger time)."""
+        with self._lock:
+            upstream.subscribers = tuple(s for s in upstream.subscribers if s is not subscriber)
+            count = len(upstream.subscribers)
+            if not count and self._upstreams.get(upstream.key) is upstream:
+                if self.relay_config.linger > 0:
+                    upstream.linger_timer = threading.Timer(self.relay_config.linger, self._expire, (upstream,))
+                    upstream.linger_timer.daemon = True
+                    upstream.linger_timer.start()
+                else:
+                    self._close_upstream_locked(upstream)
+        reason = f" ({subscriber.status[1]})" if subscriber.status is not None else ""
+        logger.info(
+            f"Subscriber {subscriber.peer} left {upstream.label} after {subscriber.sent} messages, "
+            f"{subscriber.dropped} dropped{reason} ({count} subscribers)"
+        )
+
+    def _expire(self, upstream: _Upstream) -> None:
+        with self._lock:
+            if not upstream.subscribers and self._upstreams.get(upstream.key) is upstream:
+                self._close_upstream_locked(upstream)
+
+    def _close_upstream_locked(self, upstream: _Upstream) -> None:
+        del self._upstreams[upstream.key]
+        upstream.stop()
+        logger.info(f"Closed upstream {upstream.label} after {upstream.received} messages")
+
+    def _upstream_ended(self, upstream: _Upstream, status: Optional[Tuple[grpc.StatusCode, str]]) -> None:
+        """End every subscriber of an upstream that stopped on its own."""
+        with self._lock:
+            if self._upstreams.get(upstream.key) is upstream:
+                del self._upstreams[upstream.key]
+            subscribers = upstream.subscribers
+            self.reconnectors.pop(upstream.label, None)
+        for subscriber in subscribers:
+            if status is None:
+                subscriber.close()
+            else:
+                subscriber.close(*status)
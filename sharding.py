@@ -0,0 +1,142 @@
+"""
+Sharded subscriptions: split a large address filter and merge the shard streams by slot.
+"""
+import hashlib
+import logging
+import threading
+import time
+from typing import Iterator, Optional
+
+from dedup import SlotWindowDedup
+from merge import MergeBuffer
+from proto import request_pb2
+
+
+logger = logging.getLogger(__name__)
+
+
+def shard_request(req, max_addresses: int = 1000, shards: int = 0) -> list:
+    """
+    Split the largest AddressFilter of a subscription request into shards.
+
+    Filters on different fields are ANDed and addresses within a filter are
+    ORed. Splitting one field therefore keeps the union of the shards equal
+    to the original request. Every other field is copied unchanged.
+
+    Args:
+        req: A Subscribe*Request message
+        max_addresses: Addresses per shard when ``shards`` is 0
+        shards: Number of shards; 0 derives it from ``max_addresses``
+
+    Returns:
+        The shard requests, or ``[req]`` if there is nothing to split
+    """
+    sizes = [
+        (len(getattr(req, field.name).addresses), field.name)
+        for field in req.DESCRIPTOR.fields
+        if field.message_type is request_pb2.AddressFilter.DESCRIPTOR and req.HasField(field.name)
+    ]
+    if not sizes:
+        return [req]
+    size, name = max(sizes)
+    count = shards or -(-size // max(1, max_addresses))
+    count = min(count, size)
+    if count <= 1:
+        return [req]
+
+    addresses = list(getattr(req, name).addresses)
+    requests = []
+    for i in range(count):
+        shard = type(req)()
+        shard.CopyFrom(req)
+        address_filter = getattr(shard, name)
+        del address_filter.addresses[:]
+        address_filter.addresses.extend(addresses[i * size // count:(i + 1) * size // count])
+        requests.append(shard)
+    return requests
+
+
+class SlotMerger:
+    """
+    Merges raw messages from several shard streams into one slot-ordered stream.
+
+    Shard threads call put() and finish(); one consumer iterates. Ordering
+    follows MergeBuffer: a message is released once every running shard
+    has passed its slot, or after ``max_delay`` seconds.
+
+    A transaction matching addresses in several shards arrives once per
+    shard with identical bytes. Such duplicates are dropped before they are
+    buffered, using a SlotWindowDedup keyed by a 16-byte digest of the
+    payload, so the window holds digests rather than messages. At most
+    ``capacity`` messages are buffered; put() blocks beyond that.
+    """
+
+    def __init__(self, shards: int, max_delay: float = 1.0, capacity: int = 100000, dedup_slots: int = 32):
+        self.capacity = capacity
+        self._cond = threading.Condition()
+        self._buffer = MergeBuffer(shards, max_delay)
+        self._dedup = SlotWindowDedup(window_slots=dedup_slots)
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self.received = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self._dedup.duplicates
+
+    @property
+    def late(self) -> int:
+        return self._buffer.late
+
+    def put(self, shard: int, slot: int, data: bytes) -> None:
+        """Add a message from a shard stream."""
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        with self._cond:
+            while len(self._buffer) >= self.capacity and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return
+            self.received += 1
+            if not self._dedup.is_duplicate(key, slot):
+                self._buffer.push(shard, slot, data, time.monotonic())
+            self._cond.notify_all()
+
+    def finish(self, shard: int, error: Optional[BaseException] = None) -> None:
+        """Mark a shard stream as ended; an error fails the merged stream."""
+        with self._cond:
+            self._buffer.finish(shard)
+            if error is not None and self._error is None:
+                self._error = error
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Stop accepting messages and wake blocked producers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _next_locked(self) -> Optional[bytes]:
+        """Wait for and pop the next releasable message; None when all shards ended."""
+        while True:
+            if self._error is not None:
+                raise self._error
+            wait = self._buffer.wait_time(time.monotonic())
+            if wait is None:
+                if not self._buffer.running:
+                    return None
+                self._cond.wait()
+            elif wait <= 0:
+                break
+            else:
+                self._cond.wait(wait)
+        data = self._buffer.pop()
+        self._cond.notify_all()
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            with self._cond:
+                data = self._next_locked()
+            if data is None:
+                return
+            yield data
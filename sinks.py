@@ -0,0 +1,359 @@
+"""
+Output sinks for stream messages: buffered text, length-delimited raw messages and columnar Parquet.
+"""
+import os
+import sys
+import threading
+import time
+from typing import BinaryIO, List, Optional, TextIO
+
+from encoding import b58encode
+from wire import Buffer, encode_varint
+
+
+class BufferedOutput:
+    """
+    Block-buffered, thread-safe text writer.
+
+    Collects written text in memory and hands it to the target stream in
+    one write once ``buffer_size`` characters are pending or
+    ``flush_interval`` seconds have passed since the last flush, instead
+    of paying for a terminal/pipe write per line. A background thread
+    flushes pending output when the stream goes quiet.
+    """
+
+    def __init__(
+        self,
+        target: Optional[TextIO] = None,
+        buffer_size: int = 256 * 1024,
+        flush_interval: float = 0.5
+    ):
+        self.target = target or sys.stdout
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._parts: List[str] = []
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="output-flusher", daemon=True)
+            self._flusher.start()
+
+    def write(self, text: str) -> int:
+        """Buffer text, flushing if the size or time threshold is reached."""
+        with self._lock:
+            self._parts.append(text)
+            self._pending += len(text)
+            if (self._pending >= self.buffer_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+        return len(text)
+
+    def flush(self) -> None:
+        """Write all pending text to the target."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Flush and stop the background flusher (the target stays open)."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def __enter__(self) -> "BufferedOutput":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._parts:
+            return
+        data = ''.join(self._parts)
+        self._parts = []
+        self._pending = 0
+        try:
+            self.target.write(data)
+            self.target.flush()
+        except BrokenPipeError:
+            # Downstream reader (e.g. `| head`) went away; drop the output
+            pass
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._parts and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush_locked()
+
+
+class DelimitedOutput:
+    """
+    Writes raw stream messages as a length-delimited binary stream.
+
+    Each payload is preceded by its length as a varint, the framing read
+    by wire.read_delimited and Java's ``parseDelimitedFrom``. Payloads
+    (bytes or memoryview) go unchanged into a block-buffered file, so
+    relaying a message never decodes or re-serializes it. A background
+    thread flushes the buffer when the stream goes quiet.
+    """
+
+    def __init__(self, path: str = "-", buffer_size: int = 1024 * 1024, flush_interval: float = 0.5):
+        self.path = path
+        self.flush_interval = flush_interval
+        if path == "-":
+            self._file: BinaryIO = open(sys.stdout.fileno(), "wb", buffering=buffer_size, closefd=False)
+        else:
+            self._file = open(path, "ab", buffering=buffer_size)
+        self._lock = threading.Lock()
+        self._written = False
+        self._broken = False
+        self.messages = 0
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="raw-flusher", daemon=True)
+            self._flusher.start()
+
+    def write(self, data: Buffer) -> None:
+        """Append one serialized message."""
+        with self._lock:
+            if self._broken:
+                return
+            try:
+                self._file.write(encode_varint(len(data)))
+                self._file.write(data)
+            except BrokenPipeError:
+                # Downstream reader went away; drop the output
+                self._broken = True
+                return
+            self._written = True
+            self.messages += 1
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Flush, stop the background flusher and close the file (stdout stays open)."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self._flush_locked()
+            try:
+                self._file.close()
+            except BrokenPipeError:
+                pass
+
+    def __enter__(self) -> "DelimitedOutput":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _flush_locked(self) -> None:
+        if not self._written or self._broken:
+            return
+        self._written = False
+        try:
+            self._file.flush()
+        except BrokenPipeError:
+            self._broken = True
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                self._flush_locked()
+
+
+# Column layout for DexTradeParquetSink: (column, pyarrow type alias)
+DEX_TRADE_COLUMNS = (
+    ("slot", "uint64"),
+    ("tx_index", "uint32"),
+    ("signature", "string"),
+    ("success", "bool"),
+    ("instruction_index", "uint32"),
+    ("protocol_name", "string"),
+    ("protocol_family", "string"),
+    ("program_address", "string"),
+    ("market_address", "string"),
+    ("buy_amount", "uint64"),
+    ("buy_mint", "string"),
+    ("buy_decimals", "uint32"),
+    ("buy_account", "string"),
+    ("sell_amount", "uint64"),
+    ("sell_mint", "string"),
+    ("sell_decimals", "uint32"),
+    ("sell_account", "string"),
+    ("fee", "uint64"),
+    ("royalty", "uint64"),
+    ("received_at", "timestamp[ms]"),
+)
+
+
+class DexTradeParquetSink:
+    """
+    Writes DexTradeStreamMessage rows to rolling Parquet files.
+
+    Each trade is flattened into typed columns and buffered. Buffers become
+    an Arrow record batch once ``batch_rows`` rows are pending or the oldest
+    is ``batch_interval`` seconds old. A new file is started after
+    ``file_rows`` rows or ``rotate_interval`` seconds. Files are written as
+    ``*.parquet.tmp`` and renamed when complete, so readers never see a
+    partial file. A background thread applies both time limits while the
+    stream is quiet.
+
+    Requires the optional ``pyarrow`` package.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "dex_trades",
+        batch_rows: int = 10000,
+        batch_interval: float = 5.0,
+        file_rows: int = 1000000,
+        rotate_interval: float = 3600.0,
+        compression: str = "zstd"
+    ):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError(
+                "The Parquet sink requires pyarrow: pip install pyarrow"
+            ) from e
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+
+        self.directory = directory
+        self.prefix = prefix
+        self.batch_rows = batch_rows
+        self.batch_interval = batch_interval
+        self.file_rows = file_rows
+        self.rotate_interval = rotate_interval
+        self.compression = compression
+        os.makedirs(directory, exist_ok=True)
+
+        self.schema = pyarrow.schema([
+            (name, pyarrow.type_for_alias(type_alias)) for name, type_alias in DEX_TRADE_COLUMNS
+        ])
+        self._columns = {name: [] for name, _ in DEX_TRADE_COLUMNS}
+        self._rows = 0
+        self._batch_started = 0.0
+        self._lock = threading.Lock()
+
+        self._writer = None
+        self._file_path: Optional[str] = None
+        self._file_rows = 0
+        self._file_started = 0.0
+        self._file_seq = 0
+        self.files_written: List[str] = []
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="parquet-flusher", daemon=True)
+        self._flusher.start()
+
+    def write(self, msg) -> None:
+        """Append one DexTradeStreamMessage."""
+        trade = msg.Trade
+        tx = msg.Transaction
+        buy = trade.Buy
+        sell = trade.Sell
+        now = time.time()
+        with self._lock:
+            c = self._columns
+            c["slot"].append(msg.Block.Slot)
+            c["tx_index"].append(tx.Index)
+            c["signature"].append(b58encode(tx.Signature))
+            c["success"].append(tx.Status.Success)
+            c["instruction_index"].append(trade.InstructionIndex)
+            c["protocol_name"].append(trade.Dex.ProtocolName)
+            c["protocol_family"].append(trade.Dex.ProtocolFamily)
+            c["program_address"].append(b58encode(trade.Dex.ProgramAddress))
+            c["market_address"].append(b58encode(trade.Market.MarketAddress))
+            c["buy_amount"].append(buy.Amount)
+            c["buy_mint"].append(b58encode(buy.Currency.MintAddress))
+            c["buy_decimals"].append(buy.Currency.Decimals)
+            c["buy_account"].append(b58encode(buy.Account.Address))
+            c["sell_amount"].append(sell.Amount)
+            c["sell_mint"].append(b58encode(sell.Currency.MintAddress))
+            c["sell_decimals"].append(sell.Currency.Decimals)
+            c["sell_account"].append(b58encode(sell.Account.Address))
+            c["fee"].append(trade.Fee)
+            c["royalty"].append(trade.Royalty)
+            c["received_at"].append(int(now * 1000))
+
+            if not self._rows:
+                self._batch_started = now
+            self._rows += 1
+            if self._rows >= self.batch_rows or now - self._batch_started >= self.batch_interval:
+                self._write_batch_locked()
+
+    def flush(self) -> None:
+        """Write any buffered rows as a record batch."""
+        with self._lock:
+            self._write_batch_locked()
+
+    def close(self) -> None:
+        """Flush buffered rows and finalize the current file."""
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            self._write_batch_locked()
+            self._close_file_locked()
+
+    def __enter__(self) -> "DexTradeParquetSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _write_batch_locked(self) -> None:
+        if not self._rows:
+            return
+        batch = self._pa.RecordBatch.from_pydict(self._columns, schema=self.schema)
+        self._columns = {name: [] for name, _ in DEX_TRADE_COLUMNS}
+        self._rows = 0
+
+        now = time.time()
+        if self._writer is not None and (
+            self._file_rows >= self.file_rows or now - self._file_started >= self.rotate_interval
+        ):
+            self._close_file_locked()
+        if self._writer is None:
+            self._open_file_locked(now)
+        self._writer.write_batch(batch)
+        self._file_rows += batch.num_rows
+
+    def _flush_periodically(self) -> None:
+        tick = max(0.05, min(self.batch_interval, self.rotate_interval) / 2)
+        while not self._closed.wait(tick):
+            with self._lock:
+                now = time.time()
+                if self._rows and now - self._batch_started >= self.batch_interval:
+                    self._write_batch_locked()
+                if self._writer is not None and now - self._file_started >= self.rotate_interval:
+                    self._close_file_locked()
+
+    def _open_file_locked(self, now: float) -> None:
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime(now))
+        self._file_seq += 1
+        self._file_path = os.path.join(self.directory, f"{self.prefix}-{stamp}-{self._file_seq:04d}.parquet")
+        self._writer = self._pq.ParquetWriter(
+            self._file_path + ".tmp", self.schema, compression=self.compression
+        )
+        self._file_rows = 0
+        self._file_started = now
+
+    def _close_file_locked(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self._file_path + ".tmp", self._file_path)
+        self.files_written.append(self._file_path)
+        self._writer = None
@@ -0,0 +1,171 @@
+"""
+Minimal protobuf wire-format reader for peeking at serialized stream messages.
+
+Used where decoding a whole message with FromString would be wasted work,
+e.g. to read ``Block.Slot`` from raw bytes for reconnect gap tracking, and
+for the varint length prefixes of a length-delimited message stream.
+"""
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LENGTH_DELIMITED = 2
+WIRE_FIXED32 = 5
+
+# Field numbers shared by every CoreCast stream message
+BLOCK_FIELD = 1  # BlockAttributes Block = 1
+SLOT_FIELD = 1  # uint64 Slot = 1 inside BlockAttributes
+TRANSACTION_FIELD = 2  # Transaction = 2 (TransactionAttributes or ParsedIdlTransaction)
+SIGNATURE_FIELD = 2  # bytes Signature = 2 inside the transaction
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def read_varint(buf: Buffer, pos: int) -> Tuple[int, int]:
+    """
+    Decode a base-128 varint.
+
+    Returns:
+        Tuple of (value, position after the varint)
+    """
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            raise ValueError("Malformed varint")
+
+
+def encode_varint(value: int) -> bytes:
+    """Encode a non-negative integer as a base-128 varint."""
+    if value < 0x80:
+        return _SINGLE_BYTES[value]
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+_SINGLE_BYTES = [bytes((value,)) for value in range(0x80)]
+
+
+def read_delimited(f: BinaryIO) -> Iterator[bytes]:
+    """
+    Yield the messages of a length-delimited stream until end of file.
+
+    Each message is preceded by its length as a varint, as written by
+    sinks.DelimitedOutput or Java's ``writeDelimitedTo``.
+    """
+    while True:
+        length = 0
+        shift = 0
+        while True:
+            byte = f.read(1)
+            if not byte:
+                if shift:
+                    raise EOFError("Truncated length prefix")
+                return
+            length |= (byte[0] & 0x7F) << shift
+            if not byte[0] & 0x80:
+                break
+            shift += 7
+        data = f.read(length)
+        if len(data) != length:
+            raise EOFError("Truncated message")
+        yield data
+
+
+def skip_field(buf: Buffer, pos: int, wire_type: int) -> int:
+    """Return the position just past a field value of the given wire type."""
+    if wire_type == WIRE_VARINT:
+        return read_varint(buf, pos)[1]
+    if wire_type == WIRE_FIXED64:
+        return pos + 8
+    if wire_type == WIRE_LENGTH_DELIMITED:
+        length, pos = read_varint(buf, pos)
+        return pos + length
+    if wire_type == WIRE_FIXED32:
+        return pos + 4
+    raise ValueError(f"Unsupported wire type: {wire_type}")
+
+
+def find_field(
+    buf: Buffer,
+    field_number: int,
+    start: int = 0,
+    end: Optional[int] = None
+) -> Optional[Tuple[int, int, int]]:
+    """
+    Locate the first occurrence of a field within buf[start:end].
+
+    Returns:
+        Tuple of (wire_type, value_start, value_end), where for
+        length-delimited fields the range covers the payload only, or None
+        if the field is absent
+    """
+    pos = start
+    end = len(buf) if end is None else end
+    while pos < end:
+        tag, pos = read_varint(buf, pos)
+        wire_type = tag & 0x07
+        if tag >> 3 == field_number:
+            if wire_type == WIRE_LENGTH_DELIMITED:
+                length, pos = read_varint(buf, pos)
+                return wire_type, pos, pos + length
+            return wire_type, pos, skip_field(buf, pos, wire_type)
+        pos = skip_field(buf, pos, wire_type)
+    return None
+
+
+def read_slot(data: Buffer) -> int:
+    """
+    Read ``Block.Slot`` from a serialized CoreCast stream message.
+
+    Returns:
+        The slot, or 0 if the message carries no block attributes
+    """
+    block = find_field(data, BLOCK_FIELD)
+    if block is None or block[0] != WIRE_LENGTH_DELIMITED:
+        return 0
+    slot = find_field(data, SLOT_FIELD, block[1], block[2])
+    if slot is None or slot[0] != WIRE_VARINT:
+        return 0
+    return read_varint(data, slot[1])[0]
+
+
+def find_signature(buf: Buffer, start: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """
+    Locate ``Transaction.Signature`` in a serialized stream message.
+
+    Returns:
+        Tuple of (start, end) of the signature bytes within buf, or None if
+        the message carries no signature
+    """
+    transaction = find_field(buf, TRANSACTION_FIELD, start, end)
+    if transaction is None or transaction[0] != WIRE_LENGTH_DELIMITED:
+        return None
+    signature = find_field(buf, SIGNATURE_FIELD, transaction[1], transaction[2])
+    if signature is None or signature[0] != WIRE_LENGTH_DELIMITED:
+        return None
+    return signature[1], signature[2]
+
+
+def read_signature(data: Buffer) -> bytes:
+    """
+    Read ``Transaction.Signature`` from a serialized CoreCast stream message.
+
+    Returns:
+        The signature, or b"" if the message carries none
+    """
+    span = find_signature(data)
+    if span is None:
+        return b""
+    return bytes(data[span[0]:span[1]])